@@ -0,0 +1,78 @@
+"""
+Statistical cross-check of the closed-form sampler against the Squidasm simulation.
+
+Every protocol is run with both engines on the same depolarising star network. For the message lengths and the simulation times, the difference of the means is compared to its standard error.
+A difference of more than max_sigma standard errors is flagged, which points at a mismatch between the closed-form statistics and the simulated protocol.
+
+Run from the root of the repository with:
+    python -m benchmarks.closed_form_crosscheck
+"""
+from time import perf_counter
+from statistics import mean, stdev
+
+from programs.EPR_based_trusted_server.functions import get_number_announced_bits as EPR_trusted_length
+from programs.EPR_based_untrusted_server.functions import get_number_announced_bits as EPR_untrusted_length
+from programs.GHZ_based_trusted_server.functions import get_number_announced_bits as GHZ_trusted_length
+from programs.GHZ_based_untrusted_server.functions import get_number_announced_bits as GHZ_untrusted_length
+
+from setup.configuration import star_network, link_cfg
+
+nr_clients = 4
+nr_rounds = int(2e3)
+
+# The Squidasm simulation is slow, so it is repeated fewer times than the closed-form sampler
+nr_runtimes_squidasm = 10
+nr_runtimes_closed_form = 1000
+
+max_sigma = 4
+
+## Lower fidelity than the default configuration, such that the error rates are well resolved
+cfg = dict(link_cfg, fidelity = 0.95)
+network_config = star_network(nr_clients = nr_clients, link_typ = 'depolarise', link_cfg = cfg)
+bip_network_config = star_network(nr_clients = 2, link_typ = 'depolarise', link_cfg = cfg)
+
+protocols = {
+    "EPR trusted": (EPR_trusted_length, {'nr_estimation_rounds': int(3e2), 'network_configuration': bip_network_config}, 'nr_runs'),
+    "EPR untrusted": (EPR_untrusted_length, {'nr_verification_rounds': int(3e2), 'nr_estimation_rounds': int(3e2), 'network_configuration': bip_network_config}, 'nr_runtimes'),
+    "GHZ trusted": (GHZ_trusted_length, {'nr_estimation_rounds': int(3e2), 'network_configuration': network_config}, 'nr_runtimes'),
+    "GHZ untrusted": (GHZ_untrusted_length, {'nr_verification_rounds': int(3e2), 'nr_estimation_rounds': int(3e2), 'network_configuration': network_config}, 'nr_runtimes'),
+}
+
+
+def compare(name: str, squidasm_values: list, closed_form_values: list) -> bool:
+    '''
+    Print the means of both samples, and whether they agree within max_sigma standard errors.
+    :returns: whether the samples agree.
+    '''
+    difference = mean(closed_form_values) - mean(squidasm_values)
+    standard_error = (stdev(squidasm_values)**2/len(squidasm_values) + stdev(closed_form_values)**2/len(closed_form_values))**(1/2)
+    agree = abs(difference) <= max_sigma*standard_error
+    print(f"\t {name:>16}: squidasm {mean(squidasm_values):12.2f}, closed form {mean(closed_form_values):12.2f}, "
+          f"difference {difference:10.2f} +- {standard_error:.2f} {'OK' if agree else 'MISMATCH'}")
+    return agree
+
+
+def flatten(values: list) -> list:
+    '''
+    The EPR-based protocols return a pair of values per run; only the first (simultaneous server) is compared.
+    '''
+    return [value[0] if isinstance(value, list) else value for value in values]
+
+
+if __name__ == '__main__':
+    all_agree = True
+    for name, (function, kwargs, runs_argument) in protocols.items():
+        print(f"{name}, {nr_rounds} rounds")
+        results = {}
+        for engine, nr_runtimes in [('squidasm', nr_runtimes_squidasm), ('closed_form', nr_runtimes_closed_form)]:
+            start = perf_counter()
+            message_lengths, run_times = function(nr_clients = nr_clients, nr_rounds = nr_rounds, engine = engine,
+                                                  **{runs_argument: nr_runtimes}, **kwargs)
+            wall_time = perf_counter() - start
+            print(f"\t {engine:>16}: {nr_runtimes} runs in {wall_time:.2f} s")
+            results[engine] = (flatten(message_lengths), flatten(run_times))
+
+        all_agree &= compare("message length", results['squidasm'][0], results['closed_form'][0])
+        all_agree &= compare("simulation time", results['squidasm'][1], results['closed_form'][1])
+
+    print("All protocols agree." if all_agree else "Some protocols do NOT agree.")
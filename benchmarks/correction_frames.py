@@ -0,0 +1,37 @@
+"""
+Benchmark of sending the corrections of the server in frames.
+
+By default the server sends a message to every client in every round with the outcome of its measurement for that client.
+With rounds_per_frame the outcomes of that many rounds are packed into a single message, with a header with the round range, so the number of classical messages drops by that factor.
+The trusted GHZ protocol is run with batches of rounds_per_flush = rounds_per_frame rounds, and for every frame size the number of messages, the wall time and the number of rounds per second are printed.
+
+Run from the root of the repository with:
+    python -m benchmarks.correction_frames
+"""
+from time import perf_counter
+
+from programs.GHZ_based_trusted_server.functions import simulate_rounds as GHZ_trusted_rounds
+
+from setup.configuration import star_network, link_cfg, link_typ
+
+nr_clients = 4
+nr_rounds = int(2e3)
+rounds_per_frame_list = [1, 10, 100, 1000]
+
+
+if __name__ == '__main__':
+    network_config = star_network(nr_clients = nr_clients,
+                                  link_typ = link_typ,
+                                  link_cfg = link_cfg)
+
+    print(f"GHZ trusted, {nr_clients} clients, {nr_rounds} rounds")
+    for rounds_per_frame in rounds_per_frame_list:
+        start = perf_counter()
+        GHZ_trusted_rounds(nr_clients = nr_clients,
+                           nr_rounds = nr_rounds,
+                           network_configuration = network_config,
+                           rounds_per_flush = rounds_per_frame,
+                           rounds_per_frame = rounds_per_frame)
+        wall_time = perf_counter() - start
+        nr_messages = nr_clients*(-(-nr_rounds//rounds_per_frame))
+        print(f"\t rounds_per_frame = {rounds_per_frame:5d}: {nr_messages:6d} messages, {wall_time:8.2f} s, {nr_rounds/wall_time:8.1f} rounds/s")
@@ -0,0 +1,49 @@
+"""
+Benchmark of the correction window of the clients.
+
+By default a client waits for the correction of the server after every round, before it requests the next EPR pair, so every round costs at least a classical round trip on top of the generation of the EPR pairs.
+With a correction_window of W the clients measure up to W rounds ahead and match the corrections that the server streams, tagged with their round number, to the stored outcomes, so the classical latency overlaps with the generation of the next pairs.
+The trusted EPR and GHZ protocols are run on star networks with classical links of several delays, and for every window the number of rounds per simulated second and the wall time are printed.
+
+Run from the root of the repository with:
+    python -m benchmarks.correction_window
+"""
+from time import perf_counter
+
+import numpy as np
+
+from squidasm.run.stack.config import DefaultCLinkConfig
+
+from programs.EPR_based_trusted_server.functions import simulate_rounds as EPR_trusted_rounds
+from programs.GHZ_based_trusted_server.functions import simulate_rounds as GHZ_trusted_rounds
+
+from setup.configuration import link_cfg, link_typ
+from utils.networkconfigurations import create_central_server_network
+
+nr_clients = 3
+nr_rounds = int(1e3)
+clink_delays = [1e3, 1e4, 1e5] # ns
+correction_windows = [0, 1, 4, 16, 64]
+
+
+if __name__ == '__main__':
+    for clink_delay in clink_delays:
+        for name, function, nr_nodes in [("EPR trusted", EPR_trusted_rounds, 2), ("GHZ trusted", GHZ_trusted_rounds, nr_clients)]:
+            network_config = create_central_server_network(client_names = [f"C{i}" for i in range(nr_nodes)],
+                                                           link_typ = link_typ,
+                                                           link_cfg = link_cfg,
+                                                           clink_typ = 'default',
+                                                           clink_cfg = DefaultCLinkConfig(delay = clink_delay))
+            kwargs = {'nr_clients': nr_nodes} if name.startswith("GHZ") else {}
+
+            print(f"{name}, {nr_rounds} rounds, clink delay {clink_delay:.0e} ns")
+            for correction_window in correction_windows:
+                start = perf_counter()
+                simulation = function(nr_rounds = nr_rounds,
+                                      network_configuration = network_config,
+                                      correction_window = correction_window,
+                                      **kwargs)
+                wall_time = perf_counter() - start
+                # The client programs finish after the server, when they received the last corrections, so the simulation time of the server is a lower bound
+                throughput = nr_rounds/(np.mean(simulation['simulation_times'])*1e-9)
+                print(f"\t correction_window = {correction_window:3d}: {throughput:10.1f} rounds/s simulated, {wall_time:8.2f} s wall time")
@@ -0,0 +1,50 @@
+"""
+Benchmark of the quantum state formalism for GHZ-based simulations with many clients.
+
+The server of the GHZ-based protocols holds an EPR half of every client and entangles them all, so in the KET and DM formalisms the cost of a round grows exponentially in the number of clients.
+The circuits only contain Clifford operations, so in the stabilizer formalism the cost grows polynomially.
+For every number of clients the wall time per round is printed for every formalism. KET and DM are only run up to max_clients_dense clients, beyond that they do not finish in reasonable time.
+
+Run from the root of the repository with:
+    python -m benchmarks.formalism_scaling
+"""
+from time import perf_counter
+
+from programs.GHZ_based_trusted_server.functions import simulate_rounds as GHZ_trusted_rounds
+from programs.GHZ_based_untrusted_server.functions import simulate_rounds as GHZ_untrusted_rounds
+
+from setup.configuration import star_network, link_cfg, link_typ
+
+nr_clients_list = [4, 8, 12, 16, 32, 64, 128]
+nr_rounds = 20
+formalisms = ['KET', 'DM', 'STAB']
+max_clients_dense = 12
+
+
+def benchmark(function, **kwargs):
+    '''
+    Time a single call of function with the given keyword arguments.
+    :returns: wall time in seconds.
+    '''
+    start = perf_counter()
+    function(**kwargs)
+    return perf_counter() - start
+
+
+if __name__ == '__main__':
+    for name, function in [("GHZ trusted", GHZ_trusted_rounds), ("GHZ untrusted", GHZ_untrusted_rounds)]:
+        print(f"{name}, {nr_rounds} rounds")
+        for nr_clients in nr_clients_list:
+            network_config = star_network(nr_clients = nr_clients,
+                                          link_typ = link_typ,
+                                          link_cfg = link_cfg)
+            for formalism in formalisms:
+                if formalism != 'STAB' and nr_clients > max_clients_dense:
+                    continue
+                wall_time = benchmark(function,
+                                      nr_clients = nr_clients,
+                                      nr_rounds = nr_rounds,
+                                      network_configuration = network_config,
+                                      formalism = formalism,
+                                      defer_corrections = True)
+                print(f"\t {nr_clients:4d} clients, {formalism:4s}: {wall_time:8.2f} s, {1e3*wall_time/nr_rounds:8.1f} ms/round")
@@ -0,0 +1,56 @@
+"""
+Benchmark of compiling the rounds of a batch into a single NetQASM loop in the GHZ-based programs.
+
+The programs are run with a flush every round, with batches of rounds_per_flush rounds whose instructions are repeated for every round, and with the same batches compiled into a loop (loop_rounds).
+For every setting the wall time, the number of rounds per second and the mean message length are printed.
+The message lengths should agree within statistical fluctuations, since the programs execute the same instructions in all settings.
+
+Run from the root of the repository with:
+    python -m benchmarks.loop_rounds
+"""
+from time import perf_counter
+from statistics import mean
+
+from programs.GHZ_based_trusted_server.functions import get_number_announced_bits as GHZ_trusted_length
+from programs.GHZ_based_untrusted_server.functions import get_number_announced_bits as GHZ_untrusted_length
+
+from setup.configuration import star_network, link_cfg, link_typ
+
+nr_clients = 4
+nr_rounds = int(2e3)
+nr_runtimes = 2
+# rounds_per_flush, loop_rounds
+settings = [(1, False), (100, False), (100, True), (1000, False), (1000, True)]
+
+
+def benchmark(function, **kwargs):
+    '''
+    Time a single call of function with the given keyword arguments.
+    :returns: wall time in seconds, and the list of message lengths.
+    '''
+    start = perf_counter()
+    message_lengths, _ = function(**kwargs)
+    return perf_counter() - start, message_lengths
+
+
+if __name__ == '__main__':
+    network_config = star_network(nr_clients = nr_clients,
+                                  link_typ = link_typ,
+                                  link_cfg = link_cfg)
+
+    for name, function, kwargs in [
+            ("GHZ trusted", GHZ_trusted_length, {'nr_estimation_rounds': int(3e2)}),
+            ("GHZ untrusted", GHZ_untrusted_length, {'nr_verification_rounds': int(3e2), 'nr_estimation_rounds': int(3e2)}),
+            ]:
+        print(f"{name}, {nr_clients} clients, {nr_rounds} rounds, {nr_runtimes} runs")
+        for rounds_per_flush, loop_rounds in settings:
+            wall_time, message_lengths = benchmark(function,
+                                                   nr_clients = nr_clients,
+                                                   nr_rounds = nr_rounds,
+                                                   network_configuration = network_config,
+                                                   nr_runtimes = nr_runtimes,
+                                                   rounds_per_flush = rounds_per_flush,
+                                                   loop_rounds = loop_rounds,
+                                                   **kwargs)
+            print(f"\t rounds_per_flush = {rounds_per_flush:5d}, loop_rounds = {str(loop_rounds):5s}: {wall_time:8.2f} s, "
+                  f"{nr_rounds*nr_runtimes/wall_time:8.1f} rounds/s, mean message length {mean(message_lengths):.1f}")
@@ -0,0 +1,155 @@
+"""
+Performance regression guard: compare the rounds per second and the peak memory of the benchmark suite against a committed baseline.
+
+The baseline is a results file of benchmarks.suite, committed as benchmarks/baseline.json. Create or update it on the machine that runs the guard with:
+    python -m benchmarks.suite
+    cp Results/benchmarks/suite_<commit>.json benchmarks/baseline.json
+A baseline only says something about the machine it was made on, so the guard warns if the machine differs.
+
+By default the guard runs the cases of the baseline again, with its fixed parameters and number of repetitions, and compares the results. Set current_path to compare an existing results file instead.
+Every case and metric is compared with Welch's t-test on the logarithm of the repetitions, i.e. on the ratio of current and baseline. A case regresses if it is both significantly worse at the given confidence and worse by more than the threshold, such that noise of the machine is not flagged, and neither are significant but negligible changes.
+The simulated time per round should not change at all with a fixed seed; if it does, the change altered the simulation itself, which is reported as well.
+
+The script exits with status 1 if any case regresses, and with status 2 if there is no baseline, such that it can guard e.g. a long sweep:
+    python -m benchmarks.regression && python calculate_mess_len_per_nr_rounds.py
+
+Run from the root of the repository with:
+    python -m benchmarks.regression
+"""
+from os import path
+from statistics import median
+import platform
+import sys
+
+import numpy as np
+
+from utils.compare import t_quantile
+
+baseline_path = "./benchmarks/baseline.json"
+## Results file of benchmarks.suite to compare, or None to run the cases of the baseline now
+current_path = None
+
+## Relative slowdown in rounds per second, and relative increase in peak memory, that are tolerated
+speed_threshold = 0.10
+memory_threshold = 0.10
+confidence = 0.95
+
+## Metrics that are compared, and whether higher values are better
+METRICS = {'rounds_per_sec': True, 'peak_rss_mb': False}
+
+
+def compare_metric(current, baseline, higher_is_better: bool = True, threshold: float = 0.1, confidence: float = 0.95) -> dict:
+    '''
+    Compare the repetitions of a metric with Welch's t-test on their logarithms.
+
+    :param current: list with the value of the metric in every repetition of the current run.
+    :param baseline: list with the value of the metric in every repetition of the baseline.
+    :param higher_is_better: whether a higher value of the metric is an improvement, such as for the rounds per second.
+    :param threshold: relative change in the bad direction that is tolerated.
+    :param confidence: confidence level of the one-sided test.
+    :returns: dict with the relative 'change' of the geometric mean, its two-sided confidence interval 'ci', whether the change is 'significant'ly worse, and whether it is a 'regression': significantly worse and worse by more than threshold.
+    '''
+    current = np.log(np.asarray(current, dtype = float))
+    baseline = np.log(np.asarray(baseline, dtype = float))
+    if len(current) < 2 or len(baseline) < 2:
+        raise ValueError('At least 2 repetitions of both the current run and the baseline are needed to estimate the noise.')
+
+    difference = current.mean() - baseline.mean()
+    current_variance = current.var(ddof = 1)/len(current)
+    baseline_variance = baseline.var(ddof = 1)/len(baseline)
+    std_error = np.sqrt(current_variance + baseline_variance)
+    # Welch-Satterthwaite degrees of freedom, the variances of the current run and the baseline need not be equal
+    if std_error > 0:
+        degrees_of_freedom = (current_variance + baseline_variance)**2/(current_variance**2/(len(current) - 1) + baseline_variance**2/(len(baseline) - 1))
+    else:
+        degrees_of_freedom = len(current) + len(baseline) - 2
+    half_width = t_quantile((1 + confidence)/2, degrees_of_freedom)*std_error
+
+    # Log of the ratio in the bad direction, positive if the current run is worse
+    worse = -difference if higher_is_better else difference
+    significant = worse - t_quantile(confidence, degrees_of_freedom)*std_error > 0
+    return {'change': np.exp(difference) - 1,
+            'ci': (np.exp(difference - half_width) - 1, np.exp(difference + half_width) - 1),
+            'significant': bool(significant),
+            'regression': bool(significant and np.expm1(worse) > threshold)}
+
+
+def compare_results(current: dict, baseline: dict, thresholds: dict = None, confidence: float = 0.95) -> dict:
+    '''
+    Compare every case that is in both results of benchmarks.suite.
+
+    :param thresholds: dict mapping the metrics of METRICS to their tolerated relative change, by default 0.1.
+    :returns: dict mapping the name of every case to a dict with the comparison of every metric (see compare_metric), and 'sim_time_changed': whether the median simulated time per round differs. Cases that are in only one of the results map to None.
+    '''
+    thresholds = thresholds or {}
+    comparison = {}
+    for name in dict.fromkeys(list(baseline['cases']) + list(current['cases'])):
+        if name not in baseline['cases'] or name not in current['cases']:
+            comparison[name] = None
+            continue
+        current_repetitions = current['cases'][name]['repetitions']
+        baseline_repetitions = baseline['cases'][name]['repetitions']
+
+        comparison[name] = {metric: compare_metric([m[metric] for m in current_repetitions],
+                                                   [m[metric] for m in baseline_repetitions],
+                                                   higher_is_better = higher_is_better,
+                                                   threshold = thresholds.get(metric, 0.1),
+                                                   confidence = confidence)
+                            for metric, higher_is_better in METRICS.items()}
+        comparison[name]['sim_time_changed'] = not np.isclose(median(m['sim_time_per_round'] for m in current_repetitions),
+                                                              median(m['sim_time_per_round'] for m in baseline_repetitions),
+                                                              rtol = 1e-9, atol = 0)
+    return comparison
+
+
+def print_regressions(comparison: dict, confidence: float = 0.95) -> int:
+    '''
+    Print the comparison of every case, see compare_results.
+    :returns: the number of cases that regress.
+    '''
+    nr_regressions = 0
+    for name, case in comparison.items():
+        if case is None:
+            print(f"\t {name:40s}: only in one of the results, skipped")
+            continue
+        regression = any(case[metric]['regression'] for metric in METRICS)
+        nr_regressions += regression
+        line = f"\t {name:40s}:"
+        for metric in METRICS:
+            low, high = case[metric]['ci']
+            line += f" {metric} {100*case[metric]['change']:+6.1f}% ({100*confidence:.0f}% CI {100*low:+.1f}% to {100*high:+.1f}%),"
+        line += " REGRESSION" if regression else " ok"
+        if case['sim_time_changed']:
+            line += ", simulated time per round changed"
+        print(line)
+    return nr_regressions
+
+
+if __name__ == '__main__':
+    if not path.exists(baseline_path):
+        print(f"There is no baseline at {baseline_path}. Create it on the machine that runs the guard, and commit it, with:\n"
+              f"\t python -m benchmarks.suite\n"
+              f"\t cp Results/benchmarks/suite_<commit>.json {baseline_path}")
+        sys.exit(2)
+
+    # Imported here, as the suite imports the protocols and thereby netsquid, which the comparison above does not need
+    from benchmarks import suite
+
+    baseline = suite.load_results(baseline_path)
+    if baseline['machine']['platform'] != platform.platform():
+        print(f"Warning: the baseline was made on {baseline['machine']['platform']}, the timings are only comparable on the same machine.")
+
+    if current_path is None:
+        points = [case['params'] for case in baseline['cases'].values()]
+        repetitions = len(next(iter(baseline['cases'].values()))['repetitions'])
+        print(f"Running the {len(points)} cases of the baseline of commit {baseline['commit']}, {repetitions} repetitions each.")
+        current = suite.run_suite(points, fixed = baseline['fixed'], repetitions = repetitions)
+        print(f"Results written to {suite.write_results(current)}")
+    else:
+        current = suite.load_results(current_path)
+
+    print(f"Comparison of commit {current['commit']} with the baseline of commit {baseline['commit']}:")
+    comparison = compare_results(current, baseline, thresholds = {'rounds_per_sec': speed_threshold, 'peak_rss_mb': memory_threshold}, confidence = confidence)
+    nr_regressions = print_regressions(comparison, confidence = confidence)
+    print(f"{nr_regressions} of {len(comparison)} cases regress.")
+    sys.exit(1 if nr_regressions else 0)
@@ -0,0 +1,53 @@
+"""
+Benchmark of batching multiple rounds per connection.flush() in the GHZ-based programs.
+
+For every value of rounds_per_flush the protocols are run on the same network configuration, and the wall time, the number of rounds per second and the mean message length are printed.
+The message lengths should agree within statistical fluctuations, since batching only changes how often the host and QNPU communicate.
+
+Run from the root of the repository with:
+    python -m benchmarks.rounds_per_flush
+"""
+from time import perf_counter
+from statistics import mean
+
+from programs.GHZ_based_trusted_server.functions import get_number_announced_bits as GHZ_trusted_length
+from programs.GHZ_based_untrusted_server.functions import get_number_announced_bits as GHZ_untrusted_length
+
+from setup.configuration import star_network, link_cfg, link_typ
+
+nr_clients = 4
+nr_rounds = int(2e3)
+nr_runtimes = 2
+rounds_per_flush_list = [1, 10, 100, 1000]
+
+
+def benchmark(function, **kwargs):
+    '''
+    Time a single call of function with the given keyword arguments.
+    :returns: wall time in seconds, and the list of message lengths.
+    '''
+    start = perf_counter()
+    message_lengths, _ = function(**kwargs)
+    return perf_counter() - start, message_lengths
+
+
+if __name__ == '__main__':
+    network_config = star_network(nr_clients = nr_clients,
+                                  link_typ = link_typ,
+                                  link_cfg = link_cfg)
+
+    for name, function, kwargs in [
+            ("GHZ trusted", GHZ_trusted_length, {'nr_estimation_rounds': int(3e2)}),
+            ("GHZ untrusted", GHZ_untrusted_length, {'nr_verification_rounds': int(3e2), 'nr_estimation_rounds': int(3e2)}),
+            ]:
+        print(f"{name}, {nr_clients} clients, {nr_rounds} rounds, {nr_runtimes} runs")
+        for rounds_per_flush in rounds_per_flush_list:
+            wall_time, message_lengths = benchmark(function,
+                                                   nr_clients = nr_clients,
+                                                   nr_rounds = nr_rounds,
+                                                   network_configuration = network_config,
+                                                   nr_runtimes = nr_runtimes,
+                                                   rounds_per_flush = rounds_per_flush,
+                                                   **kwargs)
+            print(f"\t rounds_per_flush = {rounds_per_flush:5d}: {wall_time:8.2f} s, "
+                  f"{nr_rounds*nr_runtimes/wall_time:8.1f} rounds/s, mean message length {mean(message_lengths):.1f}")
@@ -0,0 +1,55 @@
+"""
+Benchmark of sequential GHZ fusion on the server.
+
+By default the server of the GHZ-based protocols first generates an EPR pair with every client, and only then fuses them into a GHZ state, so the first qubits wait in memory for the later links.
+With sequential_fusion the server fuses every EPR pair right after generating it, so only 2 qubits are live at any time.
+Both modes are run on a star network where the server memory dephases (T2), and for every number of clients the wall time and the parity error rate of the X basis outcomes of the trusted GHZ protocol are printed.
+Without noise the parity of the outcomes is always even, so the error rate measures the infidelity of the distributed GHZ states.
+
+Run from the root of the repository with:
+    python -m benchmarks.sequential_fusion
+"""
+from time import perf_counter
+
+import numpy as np
+
+from squidasm.run.stack.config import GenericQDeviceConfig
+
+from programs.GHZ_based_trusted_server.functions import simulate_rounds as GHZ_trusted_rounds
+
+from setup.configuration import link_cfg, link_typ
+from utils.networkconfigurations import create_central_server_network
+from utils.postprocessing import parities
+
+nr_clients_list = [4, 8, 12]
+nr_rounds = int(1e3)
+server_T2 = 1e3 # ns
+
+
+def benchmark(**kwargs):
+    '''
+    Time a single simulation of the trusted GHZ protocol.
+    :returns: wall time in seconds, and the parity error rate of the outcomes.
+    '''
+    start = perf_counter()
+    simulation = GHZ_trusted_rounds(**kwargs)
+    return perf_counter() - start, np.mean(parities(simulation['outcomes']))
+
+
+if __name__ == '__main__':
+    server_qdevice_cfg = GenericQDeviceConfig.perfect_config()
+    server_qdevice_cfg.T2 = server_T2
+
+    print(f"GHZ trusted, {nr_rounds} rounds, server T2 = {server_T2} ns")
+    for nr_clients in nr_clients_list:
+        network_config = create_central_server_network(client_names = [f"C{i}" for i in range(nr_clients)],
+                                                       link_typ = link_typ,
+                                                       link_cfg = link_cfg,
+                                                       server_qdevice_cfg = server_qdevice_cfg)
+        for sequential_fusion in [False, True]:
+            wall_time, error_rate = benchmark(nr_clients = nr_clients,
+                                              nr_rounds = nr_rounds,
+                                              network_configuration = network_config,
+                                              defer_corrections = True,
+                                              sequential_fusion = sequential_fusion)
+            print(f"\t {nr_clients:3d} clients, sequential_fusion = {str(sequential_fusion):5s}: {wall_time:8.2f} s, parity error rate {error_rate:.4f}")
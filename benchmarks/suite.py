@@ -0,0 +1,148 @@
+"""
+Benchmark suite of the four protocol entry points, to tell whether a change made the simulations faster or slower.
+
+Every get_number_announced_bits (EPR trusted/untrusted, GHZ trusted/untrusted) is timed on a grid of numbers of rounds and clients, with a fixed seed such that every commit simulates exactly the same rounds.
+Every case is repeated a few times, every repetition in a fresh process, such that the peak memory of a case is not inflated by the cases before it, and the spread of the repetitions shows the noise of the machine.
+Per repetition the suite records:
+    rounds_per_sec:         Number of rounds simulated per second of wall time, including the setup of the network and the post-processing.
+    peak_rss_mb:            Peak resident memory of the process in MB, including the imports.
+    sim_time_per_round:     Simulated time per round in ns, as returned by the entry point. For the EPR protocols this is extrapolated to nr_clients clients with a simultaneous server.
+
+The results are written to a JSON file named after the current commit, such that the files of two commits can be compared, see benchmarks.regression.
+
+Run from the root of the repository with:
+    python -m benchmarks.suite
+"""
+from datetime import datetime
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count, makedirs, path
+from statistics import mean, median
+from time import perf_counter
+import json
+import platform
+import resource
+import subprocess
+import sys
+
+from utils.sweep import sweep_grid, point_name, point_arguments
+
+protocols = ['EPR_trusted', 'EPR_untrusted', 'GHZ_trusted', 'GHZ_untrusted_comPE']
+nr_rounds_list = [int(1e3), int(4e3)]
+nr_clients_list = [3, 6]
+points = sweep_grid({'protocol': protocols, 'nr_rounds': nr_rounds_list, 'nr_clients': nr_clients_list})
+
+## Parameters that are the same for all cases. The seed fixes the rounds that are simulated
+fixed = {
+    'nr_verification_rounds': int(2e2),
+    'nr_estimation_rounds': int(2e2),
+    'nr_runtimes': 1,
+    'seed': 1,
+}
+
+## Number of repetitions of every case, at least 2 for benchmarks.regression to estimate the noise
+repetitions = 5
+
+output_folder = "./Results/benchmarks/"
+
+
+def peak_rss_mb() -> float:
+    '''
+    Peak resident memory of the current process in MB. Linux reports ru_maxrss in kB, macOS in bytes.
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak/2**20 if sys.platform == 'darwin' else peak/2**10
+
+
+def measure(point: dict, fixed: dict = None) -> dict:
+    '''
+    Time a single call of the entry point of a case. This is the function executed in a fresh process for every repetition.
+    :returns: dict with the wall_time in s, the rounds_per_sec, the peak_rss_mb and the sim_time_per_round in ns.
+    '''
+    function, arguments, params = point_arguments(point, fixed)
+    nr_runs = arguments.get('nr_runs', arguments.get('nr_runtimes', 1))
+
+    start = perf_counter()
+    _, run_times = function(**arguments)
+    wall_time = perf_counter() - start
+
+    # The EPR protocols return the run times of a simultaneous and a non-simultaneous server, take the first
+    run_times = [run_time[0] if isinstance(run_time, list) else run_time for run_time in run_times]
+    return {
+        'wall_time': wall_time,
+        'rounds_per_sec': params['nr_rounds']*nr_runs/wall_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'sim_time_per_round': mean(run_times)/params['nr_rounds'],
+    }
+
+
+def current_commit() -> str:
+    '''
+    Short hash of the checked out commit, with a '+' if there are uncommitted changes, or None outside a git repository.
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True, check = True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+
+def run_suite(points: list, fixed: dict = None, repetitions: int = 5) -> dict:
+    '''
+    Run every case repetitions times, every repetition in a fresh process, and print the median of every case.
+
+    :param points: list of cases, as created by utils.sweep.sweep_grid.
+    :param fixed: dict with parameters that are the same for all cases, see utils.sweep.point_arguments.
+    :param repetitions: number of repetitions of every case.
+    :returns: dict with the 'machine' and 'commit' the suite ran on, and per case name a dict with its 'params' and the list of measurements of its 'repetitions', see measure.
+    '''
+    if repetitions < 1:
+        raise ValueError('The number of repetitions should be at least 1.')
+
+    results = {
+        'commit': current_commit(),
+        'date': datetime.now().isoformat(timespec = 'seconds'),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(), 'cpu_count': cpu_count()},
+        'fixed': fixed,
+        'cases': {},
+    }
+
+    context = get_context('spawn')
+    for point in points:
+        measurements = []
+        for _ in range(repetitions):
+            with ProcessPoolExecutor(max_workers = 1, mp_context = context) as executor:
+                measurements.append(executor.submit(measure, point, fixed).result())
+        results['cases'][point_name(point)] = {'params': point, 'repetitions': measurements}
+
+        print(f"\t {point_name(point):40s}: {median(m['rounds_per_sec'] for m in measurements):10.1f} rounds/s, "
+              f"{max(m['peak_rss_mb'] for m in measurements):8.1f} MB, {median(m['sim_time_per_round'] for m in measurements):.4g} ns/round")
+
+    return results
+
+
+def write_results(results: dict, folder: str = output_folder) -> str:
+    '''
+    Write the results of run_suite to folder/suite_<commit>.json.
+    :returns: the path of the file.
+    '''
+    makedirs(folder, exist_ok = True)
+    file_path = path.join(folder, f"suite_{results['commit'] or 'unknown'}.json")
+    with open(file_path, 'w') as file:
+        json.dump(results, file, indent = 1)
+    return file_path
+
+
+def load_results(file_path: str) -> dict:
+    '''
+    Load the results of run_suite that were written by write_results.
+    '''
+    with open(file_path) as file:
+        return json.load(file)
+
+
+if __name__ == '__main__':
+    print(f"Benchmark suite of {len(points)} cases, {repetitions} repetitions each.")
+    results = run_suite(points, fixed = fixed, repetitions = repetitions)
+    print(f"Results written to {write_results(results)}")
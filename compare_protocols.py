@@ -0,0 +1,52 @@
+from os import cpu_count
+
+from utils.sweep import sweep_grid, PROTOCOLS
+from utils.compare import compare_variants, print_comparison
+from utils.cache import ResultCache
+
+from setup.configuration import link_cfg, link_typ
+
+nr_clients = 6
+
+nr_rounds = int(1e4)
+nr_VER_rounds = int(5e2)
+nr_PE_rounds = int(5e2)
+
+## At least 2 runs are needed for the confidence intervals
+nr_runtimes = 20
+
+## Simulation engine, 'squidasm' or 'closed_form' to sample the depolarising links directly
+engine = 'squidasm'
+
+## Master seed shared by all protocols, such that run i of every protocol uses the same random numbers. Set to None for a fresh seed, which is printed with the results.
+seed = 1
+
+## The protocol the others are compared with, and the confidence level of the intervals
+reference = 'GHZ_untrusted_comPE'
+confidence = 0.95
+
+## Number of protocols that are run at the same time
+workers = cpu_count()
+
+## Points that were calculated before are taken from the cache. Set refresh to True to recalculate them anyway.
+cache = ResultCache("./Results/cache/")
+refresh = False
+
+## Setup the variants, with the network of setup.configuration (see also notes there!)
+points = sweep_grid({'protocol': list(PROTOCOLS)})
+
+fixed = {
+    "nr_clients": nr_clients,
+    "nr_rounds": nr_rounds,
+    "nr_verification_rounds": nr_VER_rounds,
+    "nr_estimation_rounds": nr_PE_rounds,
+    "link_typ": link_typ,
+    "link_cfg": link_cfg,
+    "nr_runtimes": nr_runtimes,
+    "engine": engine,
+}
+
+if __name__ == '__main__':
+    reference_index = [point['protocol'] for point in points].index(reference)
+    comparison = compare_variants(points, reference = reference_index, fixed = fixed, seed = seed, confidence = confidence, workers = workers, cache = cache, refresh = refresh)
+    print_comparison(points, comparison, reference = reference_index, confidence = confidence)
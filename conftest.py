@@ -0,0 +1 @@
+# Makes the root of the repository importable for the tests in tests/, the same way the scripts import programs and utils
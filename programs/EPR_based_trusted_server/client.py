@@ -2,12 +2,34 @@ import netsquid as ns
 
 from squidasm.squidasm.sim.stack.program import Program, ProgramContext, ProgramMeta
 
-from random import getrandbits
+from utils.bitarray import PackedBits
+from utils.timing import PhaseTimer
+from utils.corrections import CorrectionWindow
+
+def correct_outcome(client_number: int, outcome: int, m_server: int) -> int:
+    '''
+    Correct the Z basis measurement outcome of a client with the outcome m_server of the corresponding server measurement.
+    All clients i > 1 have to perform an X flip if the outcome of the server measurement s_i was 1, which flips the Z basis outcome.
+
+    :param client_number: number of the client, where client 0 is the client i = 1.
+    :param outcome: the measurement outcome of the client.
+    :param m_server: the measurement outcome of the server for this client.
+    :returns: the corrected outcome.
+    '''
+    if client_number != 0:
+        return outcome ^ m_server
+    return outcome
+
 
 class Client(Program):    
     def __init__(self,
                  client_number: int = None,
                  nr_rounds: int = None,
+                 defer_corrections: bool = False,
+                 correction_window: int = 0,
+                 rounds_per_frame: int = 1,
+                 instrument: bool = False,
+                 trace: bool = False,
                  ):
         
         if not nr_rounds:
@@ -17,6 +39,27 @@ class Client(Program):
         self.PEER = "Server"
         self.client_number = client_number
         self.nr_rounds = nr_rounds
+
+        # Whether to skip receiving the corrections from the server, and return the raw outcomes instead
+        self.defer_corrections = defer_corrections
+
+        # Number of rounds the client can measure ahead of the corrections of the server
+        if correction_window < 0:
+            print('The correction window should be at least 0.')
+            raise ValueError
+        self.correction_window = correction_window
+
+        # Number of rounds of which the server sends the corrections in a single message. Should match the server.
+        if rounds_per_frame < 1:
+            print('The number of rounds per frame should be at least 1.')
+            raise ValueError
+        self.rounds_per_frame = rounds_per_frame
+
+        # Whether to record the wall time, simulated time and netsquid events of every phase of the run, see utils.timing
+        self.instrument = instrument
+
+        # Whether to keep a span of every phase, to draw the timeline of the run, see utils.tracing
+        self.trace = trace
             
     @property
     def meta(self) -> ProgramMeta:
@@ -38,30 +81,41 @@ class Client(Program):
         # Setup complete, going into loop        
         ##### EPR Creation and measurement
         measurement_outcomes = []
+        # Raw outcomes that wait for the correction of the server
+        window = CorrectionWindow(csocket, self.correction_window, self.rounds_per_frame)
+        # Time spent building the subroutines, flushing them to the QNPU and waiting for the corrections
+        timer = PhaseTimer.for_netsquid(self.instrument or self.trace, trace = self.trace)
         for loop_nr in range(self.nr_rounds):
-            # Receive half of EPR pair with Server
-            qubit = epr_socket.recv_keep()[0]
+            with timer.phase('build'):
+                # Receive half of EPR pair with Server
+                qubit = epr_socket.recv_keep()[0]
              
             
-            # Perform the steps to obtain the proper GHZ state
-            # All clients i > 1 have to perform an X flip if the outcome of the server measurement s_i was 1.
-            # This can be done in post-processing
-            outcome = qubit.measure()
-            yield from connection.flush()
+                # Perform the steps to obtain the proper GHZ state
+                # All clients i > 1 have to perform an X flip if the outcome of the server measurement s_i was 1.
+                # This can be done in post-processing
+                outcome = qubit.measure()
+            with timer.phase('flush'):
+                yield from connection.flush()
 
             ## Quantum part done
-            # Receive the measurement outcome from the Server
-            m_server = yield from csocket.recv()
-            m_server = int(m_server)
-            assert m_server in [0,1], f"Outcome received from the server is not 0 or 1 but {m_server}"
-            
-            # When the client is not 1, do an X flip based on the m_{s_{i}} outcome.
-            # This X flip just flips the Z basis measurement
-            if self.client_number != 0:
-                outcome = outcome ^ m_server
+            # The corrections are applied in post-processing when they are deferred
+            if self.defer_corrections:
+                measurement_outcomes.append(int(outcome))
+                continue
 
-            # Flush the connection
-            yield from connection.flush()
-            
-            measurement_outcomes.append(int(outcome))
-        return {'outcomes' : measurement_outcomes}
\ No newline at end of file
+            # Receive the measurement outcomes from the Server, only waiting when more than correction_window rounds wait for theirs, and for all of them after the last round
+            window.add(loop_nr, outcome)
+            with timer.phase('receive'):
+                corrected = yield from window.receive(0 if loop_nr == self.nr_rounds - 1 else None)
+
+            for round_nr, outcome, m_server in corrected:
+                # When the client is not 1, do an X flip based on the m_{s_{i}} outcome.
+                # This X flip just flips the Z basis measurement
+                measurement_outcomes.append(correct_outcome(self.client_number, outcome, m_server))
+        results = {'outcomes' : PackedBits.from_bits(measurement_outcomes)}
+        if self.instrument:
+            results['phases'] = timer.metrics()
+        if self.trace:
+            results['trace'] = timer.spans
+        return results
\ No newline at end of file
@@ -0,0 +1,37 @@
+import numpy as np
+
+from utils.bitarray import PackedBits
+from utils.closedform import depolarise_link_parameters, sample_ghz_outcomes, sample_generation_time
+
+
+def sample_runs(
+        nr_rounds: int = int(1e3),
+        network_configuration = None,
+        nr_runs: int = 1,
+        rng: np.random.Generator = None,
+        ) -> list:
+    '''
+    Closed-form alternative for running the EPR-based trusted server protocol with Squidasm, for star networks with depolarising links.
+    Both clients measure in the Z basis. The corrected outcomes and simulation time are sampled directly from the link parameters.
+    The simulation time is the time the server spends generating the two EPR pairs one after the other; gates and classical communication are taken to be instantaneous.
+
+    :param nr_rounds: number of rounds to sample.
+    :param network_configuration: StackNetworkConfig of a star network with depolarising links.
+    :param nr_runs: number of independent runs to sample.
+    :param rng: numpy random generator. Defaults to a freshly seeded generator.
+    :returns: the results in the same layout as the output of squidasm's run, with the per-round results as PackedBits: a list with for the Server and then both clients a list of result dicts, one per run.
+    '''
+    fidelity, prob_success, t_cycle = depolarise_link_parameters(network_configuration)
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    out = [[] for _ in range(3)]
+    for run_nr in range(nr_runs):
+        outcomes = sample_ghz_outcomes(rng, nr_rounds, 2, fidelity)
+
+        out[0].append({'simulation_time': sample_generation_time(rng, nr_rounds*2, prob_success, t_cycle)})
+        for i in range(2):
+            out[i+1].append({'outcomes': PackedBits.from_bits(outcomes[:, i])})
+
+    return out
@@ -1,12 +1,22 @@
 import netsquid as ns
+import numpy as np
 
 from squidasm.squidasm.sim.stack.program import Program, ProgramContext, ProgramMeta
 
+from utils.bitarray import PackedBits
+from utils.corrections import CorrectionSender
+from utils.progress import Progress
+from utils.timing import PhaseTimer
+
 class CentralServerProgram(Program):
     def __init__(self,
                  client_names: list = None,
                  nr_rounds: int = None,
-                 print_loop_nrs: bool = False,
+                 progress: Progress = None,
+                 defer_corrections: bool = False,
+                 rounds_per_frame: int = 1,
+                 instrument: bool = False,
+                 trace: bool = False,
                  ):
         self.nr_clients = 2
 
@@ -19,7 +29,24 @@ class CentralServerProgram(Program):
             client_names = [f"C{nr}" for nr in range(self.nr_clients)]
         
         self.PEERS = client_names
-        self.print_loop_nrs = print_loop_nrs
+
+        # Progress of the rounds, reported after every round or batch, see utils.progress
+        self.progress = progress
+
+        # Whether to return the corrections at the end of the run instead of sending them every round
+        self.defer_corrections = defer_corrections
+
+        # Number of rounds of which the corrections are sent to the clients in a single message. Should match the clients.
+        if rounds_per_frame < 1:
+            print('The number of rounds per frame should be at least 1.')
+            raise ValueError
+        self.rounds_per_frame = rounds_per_frame
+
+        # Whether to record the wall time, simulated time and netsquid events of every phase of the run, see utils.timing
+        self.instrument = instrument
+
+        # Whether to keep a span of every phase, to draw the timeline of the run, see utils.tracing
+        self.trace = trace
 
     @property
     def meta(self) -> ProgramMeta:
@@ -40,47 +67,77 @@ class CentralServerProgram(Program):
         # get connection to quantum network processing unit
         connection = context.connection
 
+        # Corrections per client, only kept when they are deferred to the end of the run
+        corrections = [[] for _ in range(self.nr_clients)]
+
+        # Corrections per client that are sent in frames of rounds_per_frame rounds, when they are not deferred
+        correction_senders = [CorrectionSender(csockets_clients[nr], self.rounds_per_frame) for nr in range(self.nr_clients)]
+
+        # Simulated time of every round
+        round_durations = []
+
+        # Time spent building the subroutines, flushing them to the QNPU and sending the corrections
+        timer = PhaseTimer.for_netsquid(self.instrument or self.trace, trace = self.trace)
+
+        progress = self.progress
+        if progress is not None:
+            progress.start()
+
         # Distribute the EPR states
-        print(
-            f"\t\t{ns.sim_time()} ns: Server starts distributing {self.nr_rounds} EPR states."
-        )
         for loop_nr in range(self.nr_rounds):
-            if self.print_loop_nrs:
-                # Print info of rounds number
-                if self.nr_rounds >= 100:
-                    if (loop_nr - 1) % int(self.nr_rounds/100) == 0:
-                        print(f"At loop number {loop_nr} = {100*loop_nr/self.nr_rounds:.0f}%")
-
             # Initialize the outcomes for this round
             outcomes = [0]*self.nr_clients
 
-            # Generate an EPR pair with every client
-            epr_qubits = [epr_socket.create_keep()[0] for epr_socket in epr_sockets_clients]
+            round_start_time = ns.sim_time()
+
+            with timer.phase('build'):
+                # Generate an EPR pair with every client
+                epr_qubits = [epr_socket.create_keep()[0] for epr_socket in epr_sockets_clients]
             
-            ### ------- Distribute the GHZ state -------- ###
-            ## Loop through every client except first
-            for client_nr in range(1,self.nr_clients):
+                ### ------- Distribute the GHZ state -------- ###
+                ## Loop through every client except first
+                for client_nr in range(1,self.nr_clients):
 
-                # CX from first qubit to current qubit
-                epr_qubits[0].cnot(epr_qubits[client_nr])
+                    # CX from first qubit to current qubit
+                    epr_qubits[0].cnot(epr_qubits[client_nr])
 
-                # Z-basis measurement of qubit
-                outcomes[client_nr] = epr_qubits[client_nr].measure()
+                    # Z-basis measurement of qubit
+                    outcomes[client_nr] = epr_qubits[client_nr].measure()
                 
-            # Perform X-basis measurement of first qubit
-            epr_qubits[0].H()
-            outcomes[0] = epr_qubits[0].measure()
+                # Perform X-basis measurement of first qubit
+                epr_qubits[0].H()
+                outcomes[0] = epr_qubits[0].measure()
 
             # Flush the connection
-            yield from connection.flush()
+            with timer.phase('flush'):
+                yield from connection.flush()
+            round_durations.append(ns.sim_time() - round_start_time)
+            if progress is not None:
+                progress.advance(1, ns.sim_time())
 
-            ## Send the measurement outcomes
-            for client_nr in range(self.nr_clients):
-                # Send outcome to the client
-                csockets_clients[client_nr].send(str(outcomes[client_nr]))
-        
-        print(
-            f"\t\t{ns.sim_time()} ns: Server has distributed {self.nr_rounds} EPR states and has send the corrections"
-        )
+            with timer.phase('send'):
+                ## Send the measurement outcomes
+                for client_nr in range(self.nr_clients):
+                    if self.defer_corrections:
+                        # Keep the outcome, to be returned at the end of the run
+                        corrections[client_nr].append(int(outcomes[client_nr]))
+                    else:
+                        # Send outcome to the client, once the frame of this round is full
+                        correction_senders[client_nr].add(loop_nr, outcomes[client_nr])
+
+        # Send the last, partial, frame of corrections
+        with timer.phase('send'):
+            for correction_sender in correction_senders:
+                correction_sender.send()
+
+        if progress is not None:
+            progress.finish()
 
-        return {'simulation_time': ns.sim_time()}
\ No newline at end of file
+        results = {'simulation_time': ns.sim_time(), 'round_durations': np.array(round_durations)}
+        if self.defer_corrections:
+            results['corrections'] = [PackedBits.from_bits(client_corrections) for client_corrections in corrections]
+        if self.instrument:
+            results['phases'] = timer.metrics()
+        if self.trace:
+            results['trace'] = timer.spans
+        return results
\ No newline at end of file
@@ -1,53 +1,31 @@
 #%%
 from programs.EPR_based_untrusted_server.server import CentralServerProgram
 from programs.EPR_based_untrusted_server.client import Client as ClientProgram
-from squidasm.squidasm.run.stack.run import run
-
-from utils.messageencoding import binary_entropy, calculate_statistical_correction
-
-from random import sample
+from programs.EPR_based_untrusted_server.client import correct_outcome
+from programs.EPR_based_untrusted_server.sampler import sample_runs
+
+from utils.messageencoding import binary_entropy, binary_entropy_array, calculate_statistical_correction
+from utils.progress import Progress, forward
+from utils.timing import PhaseTimer
+from utils.tracing import write_chrome_trace
+from utils.parallel import run_round_chunks, split_evenly
+from utils.formalism import select_formalism
+from utils.seeding import master_seed, stream_rng
+from utils.bitarray import PackedBits
+from utils.cache import ResultCache
+from utils.roundplan import RoundPlan
+from utils.postprocessing import stack_client_results, parities, sample_selections
+
+import numpy as np
 from math import ceil
 
 ## Setup programs
-def get_number_announced_bits(
-                            nr_clients: int = 3,
-                            nr_rounds: int = int(1e3),
-                            nr_verification_rounds: int = int(3e2),
-                            perform_statcor_VER: bool = True,
-                            VER_tolerance: float = 1e-8,
-                            nr_estimation_rounds: int = int(3e2),
-                            perform_statcor_PE: bool = False,
-                            PE_tolerance: float = 1e-8,
-                            network_configuration = None,
-                            nr_runtimes: int = 1,
-                            Alice: str = None,
-                            print_loop_nrs: bool = False,
-                            ):
-    """ Get the number of announced bits for the given parameters in a trusted GHZ based setting.
-    nr_clients:             (default 3) Number of clients. Used for extrapolation.
-    nr_rounds:              (default 1e3) Number of rounds to run.
-    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
-    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
-    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
-    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
-    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
-    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
-    network_configuration:  (default None) Network configuration object from Squidasm.
-    nr_runtimes:            (default 1) Number of times to run the simulation.
-    Alice:                  (default None) Client that is Alice.
-    print_loop_nrs:         (default False) Print the loop number. Get's passed to the server program.
-    """
-    ## Print how often the simulation will be run
-    print(f"\t Simulation will repeat {nr_runtimes} times.")
-
-    ## Import Alice if not provided
-    if not Alice:
-        Alice = "C0"
-    
-    ## Setup programs
-    server_program = CentralServerProgram(nr_rounds = nr_rounds, print_loop_nrs = print_loop_nrs)
-
-    VER_rounds_selection = set(sample(range(nr_rounds), k = nr_verification_rounds)) # VER = verification
+def setup_programs(nr_clients: int, nr_rounds: int, round_plan: RoundPlan, Alice: str, progress: Progress = None, defer_corrections: bool = False, correction_window: int = 0, rounds_per_frame: int = 1, instrument: bool = False, trace: bool = False) -> dict:
+    '''
+    Setup the server and client programs for a simulation of nr_rounds rounds, with the verification rounds of round_plan.
+    :returns: dict mapping the network node labels to the programs to run on that node.
+    '''
+    server_program = CentralServerProgram(nr_rounds = nr_rounds, progress = progress, defer_corrections = defer_corrections, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace)
 
     programs = {"Server": server_program}
 
@@ -56,103 +34,332 @@ def get_number_announced_bits(
             node = ClientProgram(
                 client_number = i,
                 nr_rounds = nr_rounds,
-                VER_rounds_selection = VER_rounds_selection,
+                round_plan = round_plan,
+                defer_corrections = defer_corrections,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
                 )
         else:
             node = ClientProgram(
                 client_number = i,
                 nr_rounds = nr_rounds,
-                VER_rounds_selection = VER_rounds_selection,
+                round_plan = round_plan,
+                defer_corrections = defer_corrections,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
                 )
         programs[f'C{i}'] = node
+    return programs
+
+
+def simulate_rounds(
+                    nr_rounds: int = int(1e3),
+                    nr_verification_rounds: int = int(3e2),
+                    network_configuration = None,
+                    nr_runtimes: int = 1,
+                    Alice: str = None,
+                    print_loop_nrs: bool = False,
+                    progress: Progress = None,
+                    defer_corrections: bool = False,
+                    correction_window: int = 0,
+                    rounds_per_frame: int = 1,
+                    instrument: bool = False,
+                    trace: bool = False,
+                    engine: str = 'squidasm',
+                    workers: int = 1,
+                    seed: int = None,
+                    nr_chunks: int = 1,
+                    formalism: str = None,
+                    round_plan: RoundPlan = None,
+                    ) -> dict:
+    """ Simulate the rounds of the untrusted EPR based protocol between two clients, without any post-processing. The result can be analysed (many times) with analyse, and stored with utils.store_data.save_simulation.
+    The clients measure the verification rounds in a different basis, so their number is fixed here and can not be changed in the analysis.
+    nr_rounds:              (default 1e3) Number of rounds to run.
+    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
+    network_configuration:  (default None) Network configuration object from Squidasm.
+    nr_runtimes:            (default 1) Number of times to run the simulation.
+    Alice:                  (default None) Client that is Alice.
+    round_plan:             (default None) RoundPlan with the verification rounds, e.g. to reuse the plan of an earlier simulation. If None, a plan is drawn from seed.
+    The other arguments are the options of the simulation, see utils.options.
+
+    :returns:               dict with the (nr_runtimes, nr_rounds - nr_verification_rounds, 2) uint8 array 'outcomes' of the keygeneration rounds, the (nr_runtimes, nr_verification_rounds, 2) uint8 array 'verification', the RoundPlan 'round_plan' with the verification rounds, and the keys that all protocols share, see utils.options.
+    """
+    ## Report the progress of the rounds, see utils.progress
+    if progress is None and print_loop_nrs:
+        progress = Progress()
+
+    ## Import Alice if not provided
+    if not Alice:
+        Alice = "C0"
+    
+    if not 1 <= nr_chunks <= nr_rounds:
+        raise ValueError(f'The number of chunks should be between 1 and the number of rounds, not {nr_chunks}.')
+
+    ## Master seed of the simulation, which is returned with the results
+    seed = master_seed(seed)
+
+    ## The plan with the verification rounds (VER = verification), shared by all programs
+    if round_plan is None:
+        round_plan = RoundPlan.generate(nr_rounds = nr_rounds, nr_clients = 2, nr_verification_rounds = nr_verification_rounds, seed = seed)
+    if round_plan.nr_rounds != nr_rounds or len(round_plan.verification_rounds()) != nr_verification_rounds:
+        raise ValueError(f'The round plan should have {nr_rounds} rounds of which {nr_verification_rounds} verification rounds, not {round_plan}.')
+
+    if engine == 'closed_form':
+        ## Sample the corrected outcomes directly from the link parameters, without simulating the network
+        out = sample_runs(nr_rounds = nr_rounds, nr_verification_rounds = nr_verification_rounds, network_configuration = network_configuration, nr_runtimes = nr_runtimes, rng = stream_rng(seed, 'closed_form'), round_plan = round_plan)
+    elif engine == 'squidasm':
+        ## Report the progress of all chunks and runs in one display, combined over the workers
+        if progress is not None:
+            progress.expect(nr_rounds*nr_runtimes)
+        with forward(progress, workers) as shared:
+            ## Setup the programs for every chunk of rounds. Every chunk gets the verification rounds that fall in it, relative to the start of the chunk
+            ## The protocol runs between two clients; nr_clients is only used for extrapolation
+            programs_per_chunk = []
+            chunk_start = 0
+            for chunk_rounds in split_evenly(nr_rounds, nr_chunks):
+                programs_per_chunk.append(setup_programs(nr_clients = 2, nr_rounds = chunk_rounds, round_plan = round_plan.chunk(chunk_start, chunk_start + chunk_rounds), Alice = Alice, progress = shared, defer_corrections = defer_corrections, correction_window = correction_window, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace))
+                chunk_start += chunk_rounds
+
+            ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
+            ## The chunks are merged, so out looks like the output of a single simulation of all rounds
+            out = run_round_chunks(
+                config=network_configuration,
+                programs_per_chunk=programs_per_chunk,
+                num_times=nr_runtimes,
+                workers=workers,
+                seed=seed,
+                formalism=select_formalism(formalism, network_configuration),
+            )
+        if progress is not None:
+            progress.report()
+
+        ## Apply the corrections of the server in bulk, if they were deferred to the end of the run
+        if defer_corrections:
+            # The server corrections are ordered by round, the client outcomes are split in keygeneration and verification rounds
+            keygen_rounds = round_plan.keygen_rounds()
+            verification_rounds = round_plan.verification_rounds()
+            for run_nr in range(nr_runtimes):
+                corrections = out[0][run_nr]['corrections']
+                for i in range(2):
+                    client_results = out[i+1][run_nr]
+                    client_results['outcomes'] = PackedBits.from_bits([correct_outcome(i, outcome, corrections[i][round_nr], verification_round = False) for outcome, round_nr in zip(client_results['outcomes'], keygen_rounds)])
+                    client_results['verification'] = PackedBits.from_bits([correct_outcome(i, outcome, corrections[i][round_nr], verification_round = True) for outcome, round_nr in zip(client_results['verification'], verification_rounds)])
+    else:
+        raise ValueError(f"Unknown engine '{engine}', choose 'squidasm' or 'closed_form'.")
+
+    ## Group the outcomes of all runs in (runs, rounds, clients) arrays
+    simulation = {
+        'outcomes': stack_client_results(out, 'outcomes', 2, nr_runtimes),
+        'verification': stack_client_results(out, 'verification', 2, nr_runtimes),
+        'simulation_times': np.array([out[0][run_nr]['simulation_time'] for run_nr in range(nr_runtimes)]),
+        'seed': seed,
+        'round_plan': round_plan,
+    }
+
+    ## Simulated time of every round, which is only known when the network is simulated
+    if engine == 'squidasm':
+        simulation['round_durations'] = np.array([out[0][run_nr]['round_durations'] for run_nr in range(nr_runtimes)])
+        node_names = ['Server'] + [f"C{i}" for i in range(2)]
+        if instrument:
+            ## Metrics of the phases of every run, per node
+            simulation['phases'] = {name: [out[node_nr][run_nr]['phases'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
+        if trace:
+            ## Spans of the phases of every run, per node
+            simulation['trace'] = {name: [out[node_nr][run_nr]['trace'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
+
+    return simulation
+
+
+def analyse(
+            simulation: dict = None,
+            nr_clients: int = 3,
+            perform_statcor_VER: bool = True,
+            VER_tolerance: float = 1e-8,
+            nr_estimation_rounds: int = int(3e2),
+            perform_statcor_PE: bool = False,
+            PE_tolerance: float = 1e-8,
+            nr_selections: int = 1,
+            rng: np.random.Generator = None,
+            ) -> tuple:
+    """ Calculate the message lengths of a simulation of the untrusted EPR based protocol, for nr_selections random choices of the estimation rounds per run, extrapolated to nr_clients clients.
+    simulation:             (default None) Output of simulate_rounds.
+    nr_clients:             (default 3) Number of clients. Used for extrapolation.
+    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
+    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    nr_selections:          (default 1) Number of random choices of the estimation rounds per run.
+    rng:                    (default None) Numpy random generator for the choice of the rounds.
+
+    :returns:               message_lengths, run_times pair of a (nr_runtimes, nr_selections, 2) array and a (nr_runtimes, 2) array. The last axis holds the values with a simultaneous server, and with a subsequent server.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
 
+    nr_runtimes, nr_keygen_rounds, _ = simulation['outcomes'].shape
+    nr_verification_rounds = simulation['verification'].shape[1]
+    nr_rounds = nr_keygen_rounds + nr_verification_rounds
 
+    ## Obtain the parity of every round
+    outcome_parities = parities(simulation['outcomes'])
+    verification_round_parities = parities(simulation['verification'])
 
-    ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
-    out = run(
-        config=network_configuration,
-        programs=programs,
-        num_times=nr_runtimes,
-    )
+    # Perform statistical correction on estimation of error rates
+    if perform_statcor_VER:
+        verification_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_verification_rounds, tolerance = VER_tolerance)
+    else:
+        verification_statistical_correction = 0
 
-    #%% Post-processing
-    message_lengths = []
-    run_times = []
+    if perform_statcor_PE:
+        PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_estimation_rounds, tolerance = PE_tolerance)
+    else:
+        PE_statistical_correction = 0
 
-    # Loop through every run separately
-    for run_nr in range(nr_runtimes):
-        results = {"simulation_time" : out[0][run_nr]['simulation_time']}
+    ## Extrapolate the overall message length from the bi-partite rate.
+    scaling_factor_simul = 2*2*int(ceil(nr_clients/2)) # If nr_clients is odd then this should just be 2*nr_clients, if nr_clients is even it should be 2*(nr_clients - 1).
+    scaling_factor_sub = (1/2)*nr_clients*(nr_clients - 1)
+    scaling_factors = np.array([scaling_factor_simul, scaling_factor_sub])
 
-        for i in range(2):
-            results[f"C{i}"] = out[i+1]
+    preshared_key_length = binary_entropy(nr_verification_rounds/nr_rounds) * nr_rounds
 
-        ## For simulation purposes, its easier to group the outcomes by round
-        outcomes = [[results[f"C{i}"][run_nr]['outcomes'][round_nr] for i in range(2)] for round_nr in range(nr_rounds - nr_verification_rounds)]
-        verification = [[results[f"C{i}"][run_nr]['verification'][round_nr] for i in range(2)] for round_nr in range(nr_verification_rounds)]
+    message_lengths = np.zeros((nr_runtimes, nr_selections, 2))
 
+    # Loop through every run separately, and handle all selections of a run at once
+    for run_nr in range(nr_runtimes):
         #%% Simulate the first step now: verification of the results
         ###### Verification step ########
         ## Obtain error rate
-        verification_parities = []
-        for round_nr in range(nr_verification_rounds):
-            verification_parities.append(sum(verification[round_nr]) % 2)
-        
-        verification_error_rate = sum(verification_parities)/len(verification_parities)
-
-        # Perform statistical correction on estimation of error rate
-        if perform_statcor_VER:
-            verification_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_verification_rounds, tolerance = VER_tolerance)
-        else:
-            verification_statistical_correction = 0
+        verification_error_rate = np.count_nonzero(verification_round_parities[run_nr])/nr_verification_rounds
 
         ## Make random choice of estimation rounds 
-        PE_rounds_selection = sample(range(nr_rounds - nr_verification_rounds), k = nr_estimation_rounds) # PE = Parameter Estimation
+        PE_rounds = sample_selections(rng, nr_keygen_rounds, nr_estimation_rounds, nr_selections) # PE = Parameter Estimation
 
         ## Perform the parameter estimation
-        estimation_parities = []
-        for round_nr in PE_rounds_selection:
-            estimation_parities.append(sum(outcomes[round_nr]) % 2)
+        estimation_parities = outcome_parities[run_nr, PE_rounds]
 
         # Calcualte the error rate
-        PE_error_rate = sum(estimation_parities)/len(estimation_parities)
-
-        # Perform statistical correction on estimation of error rate
-        if perform_statcor_PE:
-            PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_estimation_rounds, tolerance = PE_tolerance)
-        else:
-            PE_statistical_correction = 0
+        PE_error_rate = np.count_nonzero(estimation_parities, axis = 1)/nr_estimation_rounds
 
         ## Calculate the binary entropies of both the error rates, potentially including the statistical correction. Subsequently calculate the message size.
-        try:
-            # Calculate verification penalty
-            bin_entropy_VER = binary_entropy(verification_error_rate + verification_statistical_correction)
+        # Calculate verification penalty
+        bin_entropy_VER = binary_entropy_array(verification_error_rate + verification_statistical_correction)
+
+        # Calculate estimation penalty
+        bin_entropy_EST = binary_entropy_array(PE_error_rate + PE_statistical_correction)
 
-            # Calculate estimation penalty
-            bin_entropy_EST = binary_entropy(PE_error_rate + PE_statistical_correction)
+        # Combined penalty, which also includes a subtraction for arranging the verification rounds.
+        # Set to zero if negative keyrate.
+        penalty = np.maximum(1 - bin_entropy_VER - bin_entropy_EST, 0)
 
-            # Combined penalty, which also includes a subtraction for arranging the verification rounds.
-            penalty = (1 - bin_entropy_VER - bin_entropy_EST)
+        message_size = penalty*(nr_rounds - nr_estimation_rounds - nr_verification_rounds) # See explanation ipynb notebook
 
-            # Set to zero if negative keyrate.
-            if penalty <= 0:
-                penalty = 0
+        # The message length is 0 where the (statistically corrected) error rates are too large for the binary entropy
+        too_large = np.isnan(bin_entropy_VER) | np.isnan(bin_entropy_EST)
+        if too_large.any():
+            print(f"The (statistically corrected) error rates are too large in {np.count_nonzero(too_large)} of {nr_selections} selection(s) of run {run_nr}.")
+        message_lengths[run_nr] = np.where(too_large, 0, message_size)[:, None] * scaling_factors - preshared_key_length
 
-            message_size = penalty*(nr_rounds - nr_estimation_rounds - nr_verification_rounds) # See explanation ipynb notebook
-        except ValueError:
-            print(f"The (statistically corrected) error rates are too large:\n\t VER:{verification_error_rate:.2f} + ({verification_statistical_correction:.3f})\n\t  PE:{PE_error_rate:.2f} + ({PE_statistical_correction:.3f})")
-            message_size = 0
+    # Return the message lengths and run times
+    return message_lengths, simulation['simulation_times'][:, None] * scaling_factors
 
-        scaling_factor_simul = 2*2*int(ceil(nr_clients/2)) # If nr_clients is odd then this should just be 2*nr_clients, if nr_clients is even it should be 2*(nr_clients - 1).
-        scaling_factor_sub = (1/2)*nr_clients*(nr_clients - 1)
 
-        preshared_key_length = binary_entropy(nr_verification_rounds/nr_rounds) * nr_rounds
+def get_number_announced_bits(
+                            nr_clients: int = 3,
+                            nr_rounds: int = int(1e3),
+                            nr_verification_rounds: int = int(3e2),
+                            perform_statcor_VER: bool = True,
+                            VER_tolerance: float = 1e-8,
+                            nr_estimation_rounds: int = int(3e2),
+                            perform_statcor_PE: bool = False,
+                            PE_tolerance: float = 1e-8,
+                            network_configuration = None,
+                            nr_runtimes: int = 1,
+                            Alice: str = None,
+                            print_loop_nrs: bool = False,
+                            progress: Progress = None,
+                            defer_corrections: bool = False,
+                            correction_window: int = 0,
+                            rounds_per_frame: int = 1,
+                            instrument: bool = False,
+                            trace_path: str = None,
+                            engine: str = 'squidasm',
+                            workers: int = 1,
+                            seed: int = None,
+                            nr_chunks: int = 1,
+                            formalism: str = None,
+                            round_plan: RoundPlan = None,
+                            cache: ResultCache = None,
+                            refresh: bool = False,
+                            ):
+    """ Simulate the untrusted EPR based protocol and calculate the message length of every run. Outputs for both a 'simultaneous server' and a 'non-simultaneous server'. Combines simulate_rounds and analyse.
+    nr_clients:             (default 3) Number of clients. Used for extrapolation.
+    nr_rounds:              (default 1e3) Number of rounds to run.
+    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
+    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
+    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    network_configuration:  (default None) Network configuration object from Squidasm.
+    nr_runtimes:            (default 1) Number of times to run the simulation.
+    Alice:                  (default None) Client that is Alice.
+    The other arguments are the options of the simulation, see utils.options, and the round_plan of simulate_rounds.
+    """
+    # Take the result of an identical earlier call from the cache. Writing a trace is a side effect, so those calls always run
+    if cache is not None and trace_path is None:
+        arguments = {name: value for name, value in locals().items() if name not in ['cache', 'refresh']}
+        return cache.call(get_number_announced_bits, refresh = refresh, **arguments)
+
+    # Time spent simulating and analysing the rounds
+    timer = PhaseTimer(instrument or trace_path is not None, trace = trace_path is not None)
+
+    with timer.phase('simulate'):
+        simulation = simulate_rounds(
+                                nr_rounds = nr_rounds,
+                                nr_verification_rounds = nr_verification_rounds,
+                                network_configuration = network_configuration,
+                                nr_runtimes = nr_runtimes,
+                                Alice = Alice,
+                                print_loop_nrs = print_loop_nrs,
+                                progress = progress,
+                                defer_corrections = defer_corrections,
+                                correction_window = correction_window,
+                                rounds_per_frame = rounds_per_frame,
+                                instrument = instrument,
+                                trace = trace_path is not None,
+                                engine = engine,
+                                workers = workers,
+                                seed = seed,
+                                nr_chunks = nr_chunks,
+                                formalism = formalism,
+                                round_plan = round_plan,
+                                )
+
+    #%% Post-processing
+    with timer.phase('analyse'):
+        message_lengths, run_times = analyse(
+                                simulation,
+                                nr_clients = nr_clients,
+                                perform_statcor_VER = perform_statcor_VER,
+                                VER_tolerance = VER_tolerance,
+                                nr_estimation_rounds = nr_estimation_rounds,
+                                perform_statcor_PE = perform_statcor_PE,
+                                PE_tolerance = PE_tolerance,
+                                rng = stream_rng(simulation['seed'], 'selection'),
+                                )
 
-        ## Append the message length and run times to the lists
-        message_lengths.append([message_size * scaling_factor_simul - preshared_key_length, message_size * scaling_factor_sub - preshared_key_length])
-        run_times.append([results['simulation_time'] * scaling_factor_simul, results['simulation_time'] * scaling_factor_sub])
+    if trace_path is not None:
+        write_chrome_trace(trace_path, simulation.get('trace', {}), extra_tracks = {'main': timer.spans})
 
-    # Return the list of message lengths and run times
-    return message_lengths, run_times
+    # Return the list of message lengths and run times, and the metrics of the phases
+    if instrument:
+        return message_lengths[:, 0].tolist(), run_times.tolist(), {'phases': timer.metrics(), 'nodes': simulation.get('phases', {})}
+    return message_lengths[:, 0].tolist(), run_times.tolist()
     
 if __name__ == '__main__':
 
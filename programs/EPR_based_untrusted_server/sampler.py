@@ -0,0 +1,47 @@
+import numpy as np
+
+from utils.bitarray import PackedBits
+from utils.closedform import depolarise_link_parameters, sample_ghz_outcomes, sample_generation_time
+from utils.roundplan import RoundPlan
+
+
+def sample_runs(
+        nr_rounds: int = int(1e3),
+        nr_verification_rounds: int = int(3e2),
+        network_configuration = None,
+        nr_runtimes: int = 1,
+        rng: np.random.Generator = None,
+        round_plan: RoundPlan = None,
+        ) -> list:
+    '''
+    Closed-form alternative for running the EPR-based untrusted server protocol with Squidasm, for star networks with depolarising links.
+    Both clients measure in the Z basis in the keygeneration rounds and in the X basis in the verification rounds. The corrected outcomes and simulation time are sampled directly from the link parameters.
+    The simulation time is the time the server spends generating the two EPR pairs one after the other; gates and classical communication are taken to be instantaneous.
+
+    :param nr_rounds: number of rounds to sample.
+    :param nr_verification_rounds: number of the rounds that are verification rounds. Only used without a round_plan.
+    :param network_configuration: StackNetworkConfig of a star network with depolarising links.
+    :param nr_runtimes: number of independent runs to sample.
+    :param rng: numpy random generator. Defaults to a freshly seeded generator.
+    :param round_plan: RoundPlan with the verification rounds, shared with the analysis. If None, a plan with nr_verification_rounds random verification rounds is drawn from rng.
+    :returns: the results in the same layout as the output of squidasm's run, with the per-round results as PackedBits: a list with for the Server and then both clients a list of result dicts, one per run.
+    '''
+    fidelity, prob_success, t_cycle = depolarise_link_parameters(network_configuration)
+
+    if rng is None:
+        rng = np.random.default_rng()
+    if round_plan is None:
+        round_plan = RoundPlan.generate(nr_rounds = nr_rounds, nr_clients = 2, nr_verification_rounds = nr_verification_rounds, seed = int(rng.integers(2**32)))
+    keygen_rounds = round_plan.keygen_rounds()
+    verification_rounds = round_plan.verification_rounds()
+
+    out = [[] for _ in range(3)]
+    for run_nr in range(nr_runtimes):
+        # The X and Z basis outcomes have the same statistics, so they can be sampled together
+        outcomes = sample_ghz_outcomes(rng, nr_rounds, 2, fidelity)
+
+        out[0].append({'simulation_time': sample_generation_time(rng, nr_rounds*2, prob_success, t_cycle)})
+        for i in range(2):
+            out[i+1].append({'outcomes': PackedBits.from_bits(outcomes[keygen_rounds, i]), 'verification': PackedBits.from_bits(outcomes[verification_rounds, i])})
+
+    return out
@@ -8,45 +8,30 @@ Created on Thu Dec  5 14:44:29 2024
 #%%
 from programs.GHZ_based_trusted_server.server import CentralServerProgram
 from programs.GHZ_based_trusted_server.client import Client as ClientProgram
-from squidasm.squidasm.run.stack.run import run
+from programs.GHZ_based_trusted_server.client import correct_outcome
+from programs.GHZ_based_trusted_server.sampler import sample_runs
 
-from utils.messageencoding import binary_entropy, calculate_statistical_correction
+from utils.messageencoding import binary_entropy_array, calculate_statistical_correction
+from utils.progress import Progress, forward
+from utils.timing import PhaseTimer
+from utils.tracing import write_chrome_trace
+from utils.parallel import run_round_chunks, split_evenly
+from utils.formalism import select_formalism
+from utils.seeding import master_seed, stream_rng
+from utils.bitarray import PackedBits
+from utils.cache import ResultCache
+from utils.postprocessing import stack_client_results, parities, sample_selections
 
-from random import sample
+import numpy as np
 
 
 ## Setup programs
-def get_number_announced_bits(
-                            nr_clients: int = 3,
-                            nr_rounds: int = int(1e3),
-                            nr_estimation_rounds: int = int(3e2),
-                            perform_statcor_PE: bool = False,
-                            PE_tolerance: float = 1e-8,
-                            network_configuration = None,
-                            nr_runtimes: int = 1,
-                            Alice: str = None,
-                            print_loop_nrs: bool = False,
-                            ):
-    """ Get the number of announced bits for the given parameters in a trusted GHZ based setting.
-    nr_clients:             (default 3) Number of clients.
-    nr_rounds:              (default 1e3) Number of rounds to run.
-    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
-    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
-    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
-    network_configuration:  (default None) Network configuration object from Squidasm.
-    nr_runtimes:            (default 1) Number of times to run the simulation.
-    Alice:                  (default None) Client that is Alice.
-    print_loop_nrs:         (default False) Print the loop number. Get's passed to the server program.
-    """
-    ## Print how often the simulation will be run
-    print(f"\t Simulation will repeat {nr_runtimes} times.")
-
-    ## Import Alice if not provided
-    if not Alice:
-        Alice = "C0"
-    
-    ## Setup programs
-    server_program = CentralServerProgram(nr_clients = nr_clients, nr_rounds = nr_rounds, print_loop_nrs = print_loop_nrs)
+def setup_programs(nr_clients: int, nr_rounds: int, Alice: str, progress: Progress = None, rounds_per_flush: int = 1, defer_corrections: bool = False, sequential_fusion: bool = False, loop_rounds: bool = False, correction_window: int = 0, rounds_per_frame: int = 1, instrument: bool = False, trace: bool = False) -> dict:
+    '''
+    Setup the server and client programs for a simulation of nr_rounds rounds.
+    :returns: dict mapping the network node labels to the programs to run on that node.
+    '''
+    server_program = CentralServerProgram(nr_clients = nr_clients, nr_rounds = nr_rounds, progress = progress, rounds_per_flush = rounds_per_flush, defer_corrections = defer_corrections, sequential_fusion = sequential_fusion, loop_rounds = loop_rounds, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace)
 
     programs = {"Server": server_program}
 
@@ -54,72 +39,279 @@ def get_number_announced_bits(
         if f"C{i}" == Alice:
             node = ClientProgram(
                 client_number = i,
-                nr_rounds = nr_rounds
+                nr_rounds = nr_rounds,
+                rounds_per_flush = rounds_per_flush,
+                defer_corrections = defer_corrections,
+                loop_rounds = loop_rounds,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
                 )
         else:
             node = ClientProgram(
                 client_number = i,
-                nr_rounds = nr_rounds
+                nr_rounds = nr_rounds,
+                rounds_per_flush = rounds_per_flush,
+                defer_corrections = defer_corrections,
+                loop_rounds = loop_rounds,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
                 )
         programs[f'C{i}'] = node
+    return programs
 
 
+def simulate_rounds(
+                    nr_clients: int = 3,
+                    nr_rounds: int = int(1e3),
+                    network_configuration = None,
+                    nr_runtimes: int = 1,
+                    Alice: str = None,
+                    print_loop_nrs: bool = False,
+                    progress: Progress = None,
+                    rounds_per_flush: int = 1,
+                    defer_corrections: bool = False,
+                    sequential_fusion: bool = False,
+                    loop_rounds: bool = False,
+                    correction_window: int = 0,
+                    rounds_per_frame: int = 1,
+                    instrument: bool = False,
+                    trace: bool = False,
+                    engine: str = 'squidasm',
+                    workers: int = 1,
+                    seed: int = None,
+                    nr_chunks: int = 1,
+                    formalism: str = None,
+                    ) -> dict:
+    """ Simulate the rounds of the trusted GHZ based protocol, without any post-processing. The result can be analysed (many times) with analyse, and stored with utils.store_data.save_simulation.
+    nr_clients:             (default 3) Number of clients.
+    nr_rounds:              (default 1e3) Number of rounds to run.
+    network_configuration:  (default None) Network configuration object from Squidasm.
+    nr_runtimes:            (default 1) Number of times to run the simulation.
+    Alice:                  (default None) Client that is Alice.
+    The other arguments are the options of the simulation, see utils.options.
 
-    ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
-    out = run(
-        config=network_configuration,
-        programs=programs,
-        num_times=nr_runtimes,
-    )
+    :returns:               dict with the (nr_runtimes, nr_rounds, nr_clients) uint8 array 'outcomes', and the keys that all protocols share, see utils.options.
+    """
+    ## Report the progress of the rounds, see utils.progress
+    if progress is None and print_loop_nrs:
+        progress = Progress()
 
-    #%% Post-processing
-    message_lengths = []
-    run_times = []
-    # Loop through every run separately
-    for run_nr in range(nr_runtimes):
-        results = {"simulation_time" : out[0][run_nr]['simulation_time']}
+    ## Import Alice if not provided
+    if not Alice:
+        Alice = "C0"
+    
+    if not 1 <= nr_chunks <= nr_rounds:
+        raise ValueError(f'The number of chunks should be between 1 and the number of rounds, not {nr_chunks}.')
+
+    ## Master seed of the simulation, which is returned with the results
+    seed = master_seed(seed)
+
+    if engine == 'closed_form':
+        ## Sample the corrected outcomes directly from the link parameters, without simulating the network
+        out = sample_runs(nr_clients = nr_clients, nr_rounds = nr_rounds, network_configuration = network_configuration, nr_runtimes = nr_runtimes, rng = stream_rng(seed, 'closed_form'))
+    elif engine == 'squidasm':
+        ## Report the progress of all chunks and runs in one display, combined over the workers
+        if progress is not None:
+            progress.expect(nr_rounds*nr_runtimes)
+        with forward(progress, workers) as shared:
+            ## Setup the programs for every chunk of rounds
+            programs_per_chunk = [setup_programs(nr_clients = nr_clients, nr_rounds = chunk_rounds, Alice = Alice, progress = shared, rounds_per_flush = rounds_per_flush, defer_corrections = defer_corrections, sequential_fusion = sequential_fusion, loop_rounds = loop_rounds, correction_window = correction_window, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace)
+                                  for chunk_rounds in split_evenly(nr_rounds, nr_chunks)]
 
-        for i in range(nr_clients):
-            results[f"C{i}"] = out[i+1]
+            ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
+            ## The chunks are merged, so out looks like the output of a single simulation of all rounds
+            out = run_round_chunks(
+                config=network_configuration,
+                programs_per_chunk=programs_per_chunk,
+                num_times=nr_runtimes,
+                workers=workers,
+                seed=seed,
+                formalism=select_formalism(formalism, network_configuration),
+            )
+        if progress is not None:
+            progress.report()
 
+        ## Apply the corrections of the server in bulk, if they were deferred to the end of the run
+        if defer_corrections:
+            for run_nr in range(nr_runtimes):
+                corrections = out[0][run_nr]['corrections']
+                for i in range(nr_clients):
+                    client_results = out[i+1][run_nr]
+                    client_results['outcomes'] = PackedBits.from_bits([correct_outcome(i, outcome, m_server) for outcome, m_server in zip(client_results['outcomes'], corrections[i])])
+    else:
+        raise ValueError(f"Unknown engine '{engine}', choose 'squidasm' or 'closed_form'.")
 
+    ## Group the outcomes of all runs in a (runs, rounds, clients) array
+    simulation = {
+        'outcomes': stack_client_results(out, 'outcomes', nr_clients, nr_runtimes),
+        'simulation_times': np.array([out[0][run_nr]['simulation_time'] for run_nr in range(nr_runtimes)]),
+        'seed': seed,
+    }
 
-        ## For simulation purposes, its easier to group the outcomes by round
-        outcomes = [[results[f"C{i}"][run_nr]['outcomes'][round_nr] for i in range(nr_clients)] for round_nr in range(nr_rounds)]
+    ## Simulated time of every round, which is only known when the network is simulated
+    if engine == 'squidasm':
+        simulation['round_durations'] = np.array([out[0][run_nr]['round_durations'] for run_nr in range(nr_runtimes)])
+        node_names = ['Server'] + [f"C{i}" for i in range(nr_clients)]
+        if instrument:
+            ## Metrics of the phases of every run, per node
+            simulation['phases'] = {name: [out[node_nr][run_nr]['phases'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
+        if trace:
+            ## Spans of the phases of every run, per node
+            simulation['trace'] = {name: [out[node_nr][run_nr]['trace'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
 
+    return simulation
+
+
+def analyse(
+            simulation: dict = None,
+            nr_estimation_rounds: int = int(3e2),
+            perform_statcor_PE: bool = False,
+            PE_tolerance: float = 1e-8,
+            nr_selections: int = 1,
+            rng: np.random.Generator = None,
+            ) -> tuple:
+    """ Calculate the message lengths of a simulation of the trusted GHZ based protocol, for nr_selections random choices of the estimation rounds per run.
+    simulation:             (default None) Output of simulate_rounds.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    nr_selections:          (default 1) Number of random choices of the estimation rounds per run.
+    rng:                    (default None) Numpy random generator for the choice of the rounds.
+
+    :returns:               message_lengths, run_times pair of a (nr_runtimes, nr_selections) array and a (nr_runtimes,) array.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    nr_runtimes, nr_rounds, _ = simulation['outcomes'].shape
+
+    ## Obtain the parity of every round
+    round_parities = parities(simulation['outcomes'])
+
+    # Perform statistical correction on estimation of error rate
+    if perform_statcor_PE:
+        statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_estimation_rounds, tolerance = PE_tolerance)
+    else:
+        statistical_correction = 0
+
+    message_lengths = np.zeros((nr_runtimes, nr_selections))
+
+    # Loop through every run separately, and handle all selections of a run at once
+    for run_nr in range(nr_runtimes):
         ## Make random choice of estimation rounds 
-        PE_rounds_selection = sample(range(nr_rounds), k = nr_estimation_rounds) # PE = Parameter Estimation
+        PE_rounds = sample_selections(rng, nr_rounds, nr_estimation_rounds, nr_selections) # PE = Parameter Estimation
 
         ## Perform the parameter estimation
-        estimation_parities = []
-        for round_nr in PE_rounds_selection:
-            estimation_parities.append(sum(outcomes[round_nr]) % 2)
+        estimation_parities = round_parities[run_nr, PE_rounds]
 
         # Calcualte the error rate
-        error_rate = sum(estimation_parities)/len(estimation_parities)
-
-        # Perform statistical correction on estimation of error rate
-        if perform_statcor_PE:
-            statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_estimation_rounds, tolerance = PE_tolerance)
-        else:
-            statistical_correction = 0
+        error_rate = np.count_nonzero(estimation_parities, axis = 1)/nr_estimation_rounds
 
         ## Calculate the binary entropy, potentially including the statistical correction. Subsequently calculate the message size.
-        try:
-            # Get the binary entropy
-            bin_entropy = binary_entropy(error_rate + statistical_correction)
-            # Calculate the total number of bits
-            message_size = (1 - bin_entropy) * (nr_rounds - nr_estimation_rounds)
-        except ValueError:
-            print(f"The (statistically corrected) error rate is too large: {error_rate:.2f} + ({statistical_correction:.3f})")
-            message_size = 0
-        
-        ## Append the message length and run times to the lists
-        message_lengths.append(message_size)
-        run_times.append(results['simulation_time'])
-
-    # Return the list of message lengths and run times
-    return message_lengths, run_times
+        bin_entropy = binary_entropy_array(error_rate + statistical_correction)
+        message_size = (1 - bin_entropy) * (nr_rounds - nr_estimation_rounds)
+
+        # The message length is 0 where the (statistically corrected) error rate is too large for the binary entropy
+        too_large = np.isnan(bin_entropy)
+        if too_large.any():
+            print(f"The (statistically corrected) error rate is too large in {np.count_nonzero(too_large)} of {nr_selections} selection(s) of run {run_nr}.")
+        message_lengths[run_nr] = np.where(too_large, 0, message_size)
+
+    # Return the message lengths and run times
+    return message_lengths, simulation['simulation_times']
+
+
+def get_number_announced_bits(
+                            nr_clients: int = 3,
+                            nr_rounds: int = int(1e3),
+                            nr_estimation_rounds: int = int(3e2),
+                            perform_statcor_PE: bool = False,
+                            PE_tolerance: float = 1e-8,
+                            network_configuration = None,
+                            nr_runtimes: int = 1,
+                            Alice: str = None,
+                            print_loop_nrs: bool = False,
+                            progress: Progress = None,
+                            rounds_per_flush: int = 1,
+                            defer_corrections: bool = False,
+                            sequential_fusion: bool = False,
+                            loop_rounds: bool = False,
+                            correction_window: int = 0,
+                            rounds_per_frame: int = 1,
+                            instrument: bool = False,
+                            trace_path: str = None,
+                            engine: str = 'squidasm',
+                            workers: int = 1,
+                            seed: int = None,
+                            nr_chunks: int = 1,
+                            formalism: str = None,
+                            cache: ResultCache = None,
+                            refresh: bool = False,
+                            ):
+    """ Simulate the trusted GHZ based protocol and calculate the message length of every run. Combines simulate_rounds and analyse.
+    nr_clients:             (default 3) Number of clients.
+    nr_rounds:              (default 1e3) Number of rounds to run.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    network_configuration:  (default None) Network configuration object from Squidasm.
+    nr_runtimes:            (default 1) Number of times to run the simulation.
+    Alice:                  (default None) Client that is Alice.
+    The other arguments are the options of the simulation, see utils.options.
+    """
+    # Take the result of an identical earlier call from the cache. Writing a trace is a side effect, so those calls always run
+    if cache is not None and trace_path is None:
+        arguments = {name: value for name, value in locals().items() if name not in ['cache', 'refresh']}
+        return cache.call(get_number_announced_bits, refresh = refresh, **arguments)
+
+    # Time spent simulating and analysing the rounds
+    timer = PhaseTimer(instrument or trace_path is not None, trace = trace_path is not None)
+
+    with timer.phase('simulate'):
+        simulation = simulate_rounds(
+                                nr_clients = nr_clients,
+                                nr_rounds = nr_rounds,
+                                network_configuration = network_configuration,
+                                nr_runtimes = nr_runtimes,
+                                Alice = Alice,
+                                print_loop_nrs = print_loop_nrs,
+                                progress = progress,
+                                rounds_per_flush = rounds_per_flush,
+                                defer_corrections = defer_corrections,
+                                sequential_fusion = sequential_fusion,
+                                loop_rounds = loop_rounds,
+                                correction_window = correction_window,
+                                rounds_per_frame = rounds_per_frame,
+                                instrument = instrument,
+                                trace = trace_path is not None,
+                                engine = engine,
+                                workers = workers,
+                                seed = seed,
+                                nr_chunks = nr_chunks,
+                                formalism = formalism,
+                                )
+
+    #%% Post-processing
+    with timer.phase('analyse'):
+        message_lengths, run_times = analyse(
+                                simulation,
+                                nr_estimation_rounds = nr_estimation_rounds,
+                                perform_statcor_PE = perform_statcor_PE,
+                                PE_tolerance = PE_tolerance,
+                                rng = stream_rng(simulation['seed'], 'selection'),
+                                )
+
+    if trace_path is not None:
+        write_chrome_trace(trace_path, simulation.get('trace', {}), extra_tracks = {'main': timer.spans})
+
+    # Return the list of message lengths and run times, and the metrics of the phases
+    if instrument:
+        return message_lengths[:, 0].tolist(), run_times.tolist(), {'phases': timer.metrics(), 'nodes': simulation.get('phases', {})}
+    return message_lengths[:, 0].tolist(), run_times.tolist()
     
     
 if __name__ == '__main__':
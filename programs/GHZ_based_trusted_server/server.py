@@ -1,13 +1,27 @@
 import netsquid as ns
+import numpy as np
 
 from squidasm.squidasm.sim.stack.program import Program, ProgramContext, ProgramMeta
 
+from utils.bitarray import PackedBits
+from utils.corrections import CorrectionSender
+from utils.progress import Progress
+from utils.timing import PhaseTimer
+from utils.netqasmtools import loop_epr_keep
+
 class CentralServerProgram(Program):
     def __init__(self,
                  nr_clients: int = None,
                  client_names: list = None,
                  nr_rounds: int = None,
-                 print_loop_nrs: bool = False,
+                 progress: Progress = None,
+                 rounds_per_flush: int = 1,
+                 defer_corrections: bool = False,
+                 sequential_fusion: bool = False,
+                 loop_rounds: bool = False,
+                 rounds_per_frame: int = 1,
+                 instrument: bool = False,
+                 trace: bool = False,
                  ):
         if not nr_clients:
             print("Please provide a number of clients.")
@@ -22,7 +36,36 @@ class CentralServerProgram(Program):
         if not client_names:
             client_names = [f"C{nr}" for nr in range(self.nr_clients)]
         self.PEERS = client_names
-        self.print_loop_nrs = print_loop_nrs
+
+        # Progress of the rounds, reported after every round or batch, see utils.progress
+        self.progress = progress
+
+        # Number of rounds that are queued in a single subroutine before flushing
+        if rounds_per_flush < 1:
+            print('The number of rounds per flush should be at least 1.')
+            raise ValueError
+        self.rounds_per_flush = rounds_per_flush
+
+        # Whether to return the corrections at the end of the run instead of sending them every round
+        self.defer_corrections = defer_corrections
+
+        # Whether to fuse every EPR pair into the GHZ state as soon as it is generated, such that only 2 qubits are needed instead of nr_clients
+        self.sequential_fusion = sequential_fusion
+
+        # Whether to compile the rounds of a batch into a single NetQASM loop, instead of repeating the instructions for every round
+        self.loop_rounds = loop_rounds
+
+        # Number of rounds of which the corrections are sent to the clients in a single message. Should match the clients.
+        if rounds_per_frame < 1:
+            print('The number of rounds per frame should be at least 1.')
+            raise ValueError
+        self.rounds_per_frame = rounds_per_frame
+
+        # Whether to record the wall time, simulated time and netsquid events of every phase of the run, see utils.timing
+        self.instrument = instrument
+
+        # Whether to keep a span of every phase, to draw the timeline of the run, see utils.tracing
+        self.trace = trace
 
     @property
     def meta(self) -> ProgramMeta:
@@ -30,9 +73,61 @@ class CentralServerProgram(Program):
             name="GHZdist",
             csockets=[self.PEERS[nr] for nr in range(self.nr_clients)],
             epr_sockets=[self.PEERS[nr] for nr in range(self.nr_clients)],
-            max_qubits=self.nr_clients,
+            max_qubits=2 if self.sequential_fusion else self.nr_clients,
         )
     
+    def distribute_ghz_state(self, connection, epr_sockets_clients: list, outcome_futures: list = None) -> list:
+        '''
+        Add the instructions of a single round to the connection: generate the EPR pairs with the clients, fuse them into a GHZ state and measure the qubits of the server.
+        :param outcome_futures: futures to store the measurement outcomes in, one per client. Only given when the round is the body of a NetQASM loop, see loop_rounds.
+        :returns: list of the futures of the measurement outcomes, one per client.
+        '''
+        # Inside a loop the EPR results array has to be reset every iteration
+        if outcome_futures is None:
+            outcome_futures = [None]*self.nr_clients
+            epr_keep = lambda epr_socket: epr_socket.create_keep()[0]
+        else:
+            epr_keep = lambda epr_socket: loop_epr_keep(epr_socket, create = True)
+
+        # Initialize the outcomes for this round
+        outcomes = [0]*self.nr_clients
+
+        if self.sequential_fusion:
+            ### ------- Distribute the GHZ state, one client at a time -------- ###
+            # Generate an EPR pair with the first client, this qubit is kept for the whole round
+            first_qubit = epr_keep(epr_sockets_clients[0])
+
+            ## Loop through every client except first
+            for client_nr in range(1,self.nr_clients):
+                # Generate an EPR pair with the current client only now
+                epr_qubit = epr_keep(epr_sockets_clients[client_nr])
+
+                # CX from first qubit to current qubit
+                first_qubit.cnot(epr_qubit)
+
+                # Z-basis measurement of qubit, which frees it for the next client
+                outcomes[client_nr] = epr_qubit.measure(future = outcome_futures[client_nr])
+        else:
+            # Generate an EPR pair with every client
+            epr_qubits = [epr_keep(epr_socket) for epr_socket in epr_sockets_clients]
+            first_qubit = epr_qubits[0]
+
+            ### ------- Distribute the GHZ state -------- ###
+            ## Loop through every client except first
+            for client_nr in range(1,self.nr_clients):
+
+                # CX from first qubit to current qubit
+                first_qubit.cnot(epr_qubits[client_nr])
+
+                # Z-basis measurement of qubit
+                outcomes[client_nr] = epr_qubits[client_nr].measure(future = outcome_futures[client_nr])
+            
+        # Perform X-basis measurement of first qubit
+        first_qubit.H()
+        outcomes[0] = first_qubit.measure(future = outcome_futures[0])
+
+        return outcomes
+
     def run(self, context: ProgramContext):
         # get classical sockets
         csockets_clients = [context.csockets[self.PEERS[nr]] for nr in range(self.nr_clients)]
@@ -43,47 +138,75 @@ class CentralServerProgram(Program):
         # get connection to quantum network processing unit
         connection = context.connection
 
-        # List of the first qubit measurement outcome
-        first_outcomes = []
+        # Corrections per client, only kept when they are deferred to the end of the run
+        corrections = [[] for _ in range(self.nr_clients)]
 
-        # Distribute the GHZ states
-        for loop_nr in range(self.nr_rounds):
-            if self.print_loop_nrs:
-                # Print info of rounds number
-                if self.nr_rounds >= 100:
-                    if (loop_nr - 1) % int(self.nr_rounds/100) == 0:
-                        print(f"At loop number {loop_nr} = {100*loop_nr/self.nr_rounds:.0f}%")
+        # Corrections per client that are sent in frames of rounds_per_frame rounds, when they are not deferred
+        correction_senders = [CorrectionSender(csockets_clients[nr], self.rounds_per_frame) for nr in range(self.nr_clients)]
 
-            # Initialize the outcomes for this round
-            outcomes = [0]*self.nr_clients
+        # Simulated time of every round. All rounds of a batch are executed together, so they get an equal share of the time of the batch
+        round_durations = []
+        batch_start_time = ns.sim_time()
 
-            # Generate an EPR pair with every client
-            epr_qubits = [epr_socket.create_keep()[0] for epr_socket in epr_sockets_clients]
-            
-            ### ------- Distribute the GHZ state -------- ###
-            ## Loop through every client except first
-            for client_nr in range(1,self.nr_clients):
+        # Time spent building the subroutines, flushing them to the QNPU and sending the corrections
+        timer = PhaseTimer.for_netsquid(self.instrument or self.trace, trace = self.trace)
 
-                # CX from first qubit to current qubit
-                epr_qubits[0].cnot(epr_qubits[client_nr])
+        progress = self.progress
+        if progress is not None:
+            progress.start()
 
-                # Z-basis measurement of qubit
-                outcomes[client_nr] = epr_qubits[client_nr].measure()
-                
-            # Perform X-basis measurement of first qubit
-            epr_qubits[0].H()
-            outcomes[0] = epr_qubits[0].measure()
-
-            # Flush the connection
-            yield from connection.flush()
-
-            ## Send the measurement outcomes
-            for client_nr in range(self.nr_clients):
-                # Send outcome to the client
-                csockets_clients[client_nr].send(str(outcomes[client_nr]))
-        
-        print(
-            f"\t\t{ns.sim_time()} ns: Server has distributed {self.nr_rounds} GHZ states and has send the corrections"
-        )
+        # Distribute the GHZ states, in batches of rounds_per_flush rounds per flush
+        for batch_start in range(0, self.nr_rounds, self.rounds_per_flush):
+            batch = range(batch_start, min(batch_start + self.rounds_per_flush, self.nr_rounds))
+
+            # Outcomes of every round in this batch
+            batch_outcomes = []
+
+            with timer.phase('build'):
+                if self.loop_rounds:
+                    # The outcomes of the loop are stored in an array per client, indexed by the loop register
+                    outcome_arrays = [connection.new_array(length = len(batch)) for _ in range(self.nr_clients)]
+                    with connection.loop(len(batch)) as loop_register:
+                        self.distribute_ghz_state(connection, epr_sockets_clients, [outcome_array.get_future_index(loop_register) for outcome_array in outcome_arrays])
+                else:
+                    for loop_nr in batch:
+                        # All qubits of this round are measured, so the next round can reuse them
+                        batch_outcomes.append(self.distribute_ghz_state(connection, epr_sockets_clients))
+
+            # Flush the connection, executing all rounds of the batch at once
+            with timer.phase('flush'):
+                yield from connection.flush()
+            if self.loop_rounds:
+                batch_outcomes = list(zip(*[outcome_array.get_future_slice(slice(0, len(batch))) for outcome_array in outcome_arrays]))
+            round_durations.extend([(ns.sim_time() - batch_start_time)/len(batch)]*len(batch))
+            batch_start_time = ns.sim_time()
+            if progress is not None:
+                progress.advance(len(batch), batch_start_time)
+
+            with timer.phase('send'):
+                ## Send the measurement outcomes, round by round
+                for loop_nr, outcomes in zip(batch, batch_outcomes):
+                    for client_nr in range(self.nr_clients):
+                        if self.defer_corrections:
+                            # Keep the outcome, to be returned at the end of the run
+                            corrections[client_nr].append(int(outcomes[client_nr]))
+                        else:
+                            # Send outcome to the client, once the frame of this round is full
+                            correction_senders[client_nr].add(loop_nr, outcomes[client_nr])
+
+        # Send the last, partial, frame of corrections
+        with timer.phase('send'):
+            for correction_sender in correction_senders:
+                correction_sender.send()
+
+        if progress is not None:
+            progress.finish()
 
-        return {'simulation_time': ns.sim_time()}
\ No newline at end of file
+        results = {'simulation_time': ns.sim_time(), 'round_durations': np.array(round_durations)}
+        if self.defer_corrections:
+            results['corrections'] = [PackedBits.from_bits(client_corrections) for client_corrections in corrections]
+        if self.instrument:
+            results['phases'] = timer.metrics()
+        if self.trace:
+            results['trace'] = timer.spans
+        return results
\ No newline at end of file
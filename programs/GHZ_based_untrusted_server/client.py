@@ -2,9 +2,12 @@ import netsquid as ns
 
 from squidasm.squidasm.sim.stack.program import Program, ProgramContext, ProgramMeta
 
-from random import getrandbits
-
 from utils.messageencoding import encode_message_to_bits
+from utils.bitarray import PackedBits
+from utils.netqasmtools import loop_epr_keep
+from utils.timing import PhaseTimer
+from utils.corrections import CorrectionWindow
+from utils.roundplan import RoundPlan
 
 # class Alice(Program):
 #     def __init__(self,
@@ -105,10 +108,46 @@ from utils.messageencoding import encode_message_to_bits
 #         return {'outcomes' : measurement_outcomes, 'bases' : self.bases}
 
 
+def correct_outcome(client_number: int, outcome: int, m_server: int, basis: int) -> int:
+    '''
+    Correct the measurement outcome of a client with the outcome m_server of the corresponding server measurement.
+    All clients i > 1 have to perform an X flip if the outcome of the server measurement s_i was 1.
+    The client i = 1 has to do a Z flip if the outcome of server measurement s_1 was 1
+    In the case of a Y measurement, both these flips just flip the measurement outcome
+
+    :param client_number: number of the client, where client 0 is the client i = 1.
+    :param outcome: the measurement outcome of the client.
+    :param m_server: the measurement outcome of the server for this client.
+    :param basis: the measurement basis of the client, 0 for X and 1 for Y.
+    :returns: the corrected outcome.
+    '''
+    # Option X basis
+    if basis == 0:
+        # When the client is 1, do an Z flip based on the m_{s_{1}} outcome.
+        # This Z flip just flips the X basis measurement outcome
+        if client_number == 0:
+            return outcome ^ m_server
+        return outcome
+
+    # Option Y basis
+    # When the client is 1, do an Z flip based on the m_{s_{1}} outcome.
+    # When the client is i>1, do an X flip based on the m_{s_{i}} outcome
+    # Both these just flip the outcomes
+    return outcome ^ m_server
+
+
 class Client(Program):    
     def __init__(self,
                  client_number: int = None,
                  nr_rounds: int = None,
+                 rounds_per_flush: int = 1,
+                 defer_corrections: bool = False,
+                 loop_rounds: bool = False,
+                 correction_window: int = 0,
+                 rounds_per_frame: int = 1,
+                 instrument: bool = False,
+                 trace: bool = False,
+                 round_plan: RoundPlan = None,
                  ):
         
         if not nr_rounds:
@@ -119,8 +158,41 @@ class Client(Program):
         self.client_number = client_number
         self.nr_rounds = nr_rounds
 
-        # self.bases = [int(b) for b in bin(getrandbits(self.nr_rounds))[2:].zfill(self.nr_rounds)]
-        self.bases = [int(b) for b in bin(getrandbits(self.nr_rounds))[2:].zfill(self.nr_rounds)]
+        # Number of rounds that are measured in a single subroutine before flushing. Should match the server.
+        if rounds_per_flush < 1:
+            print('The number of rounds per flush should be at least 1.')
+            raise ValueError
+        self.rounds_per_flush = rounds_per_flush
+
+        # Whether to skip receiving the corrections from the server, and return the raw outcomes instead
+        self.defer_corrections = defer_corrections
+
+        # Whether to compile the rounds of a batch into a single NetQASM loop. Should match the server.
+        self.loop_rounds = loop_rounds
+
+        # Number of rounds the client can measure ahead of the corrections of the server
+        if correction_window < 0:
+            print('The correction window should be at least 0.')
+            raise ValueError
+        self.correction_window = correction_window
+
+        # Number of rounds of which the server sends the corrections in a single message. Should match the server.
+        if rounds_per_frame < 1:
+            print('The number of rounds per frame should be at least 1.')
+            raise ValueError
+        self.rounds_per_frame = rounds_per_frame
+
+        # Whether to record the wall time, simulated time and netsquid events of every phase of the run, see utils.timing
+        self.instrument = instrument
+
+        # Whether to keep a span of every phase, to draw the timeline of the run, see utils.tracing
+        self.trace = trace
+
+        # Bases of this client in every round, 0 for X and 1 for Y, from the plan that is shared with the other programs
+        if round_plan is None or round_plan.nr_rounds != nr_rounds:
+            print('Please provide a round plan with the bases of every round.')
+            raise ValueError
+        self.bases = round_plan.client_bases(client_number)
 
             
     @property
@@ -143,55 +215,71 @@ class Client(Program):
         # Setup complete, going into loop       
         ##### GHZ creation and measurement
         measurement_outcomes = []
-        for loop_nr, basis in zip(range(self.nr_rounds),self.bases):
-            # Receive half of EPR pair with Server
-            qubit = epr_socket.recv_keep()[0]
-             
-
-            # All clients i > 1 have to perform an X flip if the outcome of the server measurement s_i was 1.
-            # The client i = 1 has to do a Z flip if the outcome of server measurement s_1 was 1
-            # In the case of a Y measurement, both these flips just flip the measurement outcome
-            
-            # Option X basis
-            if basis == 0:
-                qubit.H()
-                outcome = qubit.measure()
-                yield from connection.flush()
+        # Raw outcomes that wait for the correction of the server
+        window = CorrectionWindow(csocket, self.correction_window, self.rounds_per_frame)
+        # Time spent building the subroutines, flushing them to the QNPU and waiting for the corrections
+        timer = PhaseTimer.for_netsquid(self.instrument or self.trace, trace = self.trace)
+        for batch_start in range(0, self.nr_rounds, self.rounds_per_flush):
+            batch = range(batch_start, min(batch_start + self.rounds_per_flush, self.nr_rounds))
 
-                ## Quantum part done
-                # Receive the measurement outcome from the Server
-                m_server = yield from csocket.recv()
-                m_server = int(m_server)
-                assert m_server in [0,1], f"Outcome received from the server is not 0 or 1 but {m_server}"
-            
-                # When the client is 1, do an Z flip based on the m_{s_{1}} outcome.
-                # This Z flip just flips the X basis measurement outcome
-                if self.client_number == 0:
-                    outcome = outcome ^ m_server
-            
-            # Option Y basis
-            elif basis == 1:
-                qubit.rot_Z(1,1)
-                qubit.H()
-                outcome = qubit.measure()
-                yield from connection.flush()
+            # Measurement outcomes of the rounds in this batch, available after the flush
+            batch_outcomes = []
+
+            with timer.phase('build'):
+                if self.loop_rounds:
+                    # Measure all rounds of the batch in a single loop, with the bases in an array and the outcomes stored in an array, both indexed by the loop register
+                    bases_array = connection.new_array(init_values = self.bases[batch.start:batch.stop].tolist())
+                    outcome_array = connection.new_array(length = len(batch))
+                    with connection.loop(len(batch)) as loop_register:
+                        # Receive half of EPR pair with Server
+                        qubit = loop_epr_keep(epr_socket, create = False)
+
+                        # Option Y basis, which only differs from the X basis by a rotation
+                        connection.if_nz(bases_array.get_future_index(loop_register), lambda conn: qubit.rot_Z(1,1))
+                        qubit.H()
+                        qubit.measure(future = outcome_array.get_future_index(loop_register))
+                    batch_outcomes = outcome_array.get_future_slice(slice(0, len(batch)))
+                else:
+                    for loop_nr in batch:
+                        basis = self.bases[loop_nr]
 
-                ## Quantum part done
+                        # Receive half of EPR pair with Server
+                        qubit = epr_socket.recv_keep()[0]
 
-                # Receive the measurement outcome from the Server
-                m_server = yield from csocket.recv()
-                m_server = int(m_server)
-                assert m_server in [0,1], f"Outcome received from the server is not 0 or 1 but {m_server}"
+                        # Option X basis
+                        if basis == 0:
+                            qubit.H()
                 
-                # When the client is 1, do an Z flip based on the m_{s_{1}} outcome.
-                # When the client is i>1, do an X flip based on the m_{s_{i}} outcome
-                # Both these just flip the outcomes
-                outcome = outcome ^ m_server
+                        # Option Y basis
+                        elif basis == 1:
+                            qubit.rot_Z(1,1)
+                            qubit.H()
 
-                # Flush the connection
+                        # The measurement frees the qubit for the next round in the batch
+                        batch_outcomes.append(qubit.measure())
+
+            with timer.phase('flush'):
                 yield from connection.flush()
 
-            # Append the outcomes to the list
-            measurement_outcomes.append(int(outcome))
+            ## Quantum part done
+            # The corrections are applied in post-processing when they are deferred
+            if self.defer_corrections:
+                measurement_outcomes.extend(int(outcome) for outcome in batch_outcomes)
+                continue
+
+            # Receive the measurement outcomes from the Server, only waiting when more than correction_window rounds wait for theirs, and for all of them after the last batch
+            for loop_nr, outcome in zip(batch, batch_outcomes):
+                window.add(loop_nr, outcome)
+            with timer.phase('receive'):
+                corrected = yield from window.receive(0 if batch.stop == self.nr_rounds else None)
+
+            # Append the corrected outcomes to the list
+            for round_nr, outcome, m_server in corrected:
+                measurement_outcomes.append(correct_outcome(self.client_number, outcome, m_server, self.bases[round_nr]))
 
-        return {'outcomes' : measurement_outcomes, 'bases' : self.bases}
\ No newline at end of file
+        results = {'outcomes' : PackedBits.from_bits(measurement_outcomes), 'bases' : PackedBits.from_bits(self.bases)}
+        if self.instrument:
+            results['phases'] = timer.metrics()
+        if self.trace:
+            results['trace'] = timer.spans
+        return results
\ No newline at end of file
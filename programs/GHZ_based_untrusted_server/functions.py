@@ -8,48 +8,99 @@ Created on Thu Dec  5 14:44:29 2024
 #%%
 from programs.GHZ_based_untrusted_server.server import CentralServerProgram
 from programs.GHZ_based_untrusted_server.client import Client as ClientProgram
-from squidasm.squidasm.run.stack.run import run
-
-from utils.messageencoding import binary_entropy, calculate_statistical_correction
-
-from random import sample
-from math import ceil, log
-
-
-def get_number_announced_bits(
-                            nr_clients: int = 3,
-                            nr_rounds: int = int(1e3),
-                            nr_verification_rounds: int = int(3e2),
-                            perform_statcor_VER: bool = True,
-                            VER_tolerance: float = 1e-8,
-                            perform_separate_PE: bool = True,
-                            nr_estimation_rounds: int = int(3e2),
-                            perform_statcor_PE: bool = False,
-                            PE_tolerance: float = 1e-8,
-                            network_configuration = None,
-                            nr_runtimes = 1,
-                            Alice: str = None,
-                            print_loop_nrs: bool = False,
-                            anon_tolerance: float = 1e-8,
-                            ):
-    """
+from programs.GHZ_based_untrusted_server.client import correct_outcome
+from programs.GHZ_based_untrusted_server.sampler import sample_runs
+
+from utils.messageencoding import binary_entropy_array, calculate_statistical_correction
+from utils.progress import Progress, forward
+from utils.timing import PhaseTimer
+from utils.tracing import write_chrome_trace
+from utils.parallel import run_round_chunks, split_evenly
+from utils.formalism import select_formalism
+from utils.seeding import master_seed, stream_rng
+from utils.bitarray import PackedBits
+from utils.cache import ResultCache
+from utils.roundplan import RoundPlan
+from utils.postprocessing import stack_client_results, ghz_basis_errors, sample_selections
+
+import numpy as np
+
+
+def setup_programs(nr_clients: int, nr_rounds: int, Alice: str, progress: Progress = None, rounds_per_flush: int = 1, defer_corrections: bool = False, sequential_fusion: bool = False, loop_rounds: bool = False, correction_window: int = 0, rounds_per_frame: int = 1, round_plan: RoundPlan = None, instrument: bool = False, trace: bool = False) -> dict:
+    '''
+    Setup the server and client programs for a simulation of nr_rounds rounds, in which the clients measure in the bases of round_plan.
+    :returns: dict mapping the network node labels to the programs to run on that node.
+    '''
+    server_program = CentralServerProgram(nr_clients = nr_clients, nr_rounds = nr_rounds, progress = progress, rounds_per_flush = rounds_per_flush, defer_corrections = defer_corrections, sequential_fusion = sequential_fusion, loop_rounds = loop_rounds, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace)
+    programs = {"Server": server_program}
+    for i in range(nr_clients):
+        if f"C{i}" == Alice:
+            node = ClientProgram(
+                client_number = i,
+                nr_rounds = nr_rounds,
+                rounds_per_flush = rounds_per_flush,
+                defer_corrections = defer_corrections,
+                loop_rounds = loop_rounds,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
+                round_plan = round_plan,
+                )
+        else:
+            node = ClientProgram(
+                client_number = i,
+                nr_rounds = nr_rounds,
+                rounds_per_flush = rounds_per_flush,
+                defer_corrections = defer_corrections,
+                loop_rounds = loop_rounds,
+                correction_window = correction_window,
+                rounds_per_frame = rounds_per_frame,
+                instrument = instrument,
+                trace = trace,
+                round_plan = round_plan,
+                )
+        programs[f'C{i}'] = node
+    return programs
+
+
+def simulate_rounds(
+                    nr_clients: int = 3,
+                    nr_rounds: int = int(1e3),
+                    network_configuration = None,
+                    nr_runtimes: int = 1,
+                    Alice: str = None,
+                    print_loop_nrs: bool = False,
+                    progress: Progress = None,
+                    rounds_per_flush: int = 1,
+                    defer_corrections: bool = False,
+                    sequential_fusion: bool = False,
+                    loop_rounds: bool = False,
+                    correction_window: int = 0,
+                    rounds_per_frame: int = 1,
+                    instrument: bool = False,
+                    trace: bool = False,
+                    engine: str = 'squidasm',
+                    workers: int = 1,
+                    seed: int = None,
+                    nr_chunks: int = 1,
+                    formalism: str = None,
+                    round_plan: RoundPlan = None,
+                    ) -> dict:
+    """ Simulate the rounds of the untrusted GHZ based protocol, without any post-processing. The result can be analysed (many times) with analyse, and stored with utils.store_data.save_simulation.
     nr_clients:             (default 3) Number of clients.
     nr_rounds:              (default 1e3) Number of rounds to run.
-    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
-    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
-    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
-    perform_separate_PE:    (default True) Whether to perform PE separately from VER, instead of inferring it from VER.
-    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
-    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
-    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
     network_configuration:  (default None) Network configuration object from Squidasm.
     nr_runtimes:            (default 1) Number of times to run the simulation.
     Alice:                  (default None) Client that is Alice.
-    print_loop_nrs:         (default False) Print the loop number. Get's passed to the server program.
-    anon_tolerance:         (default 1e-8) Level of anonymity; see keyrate calculations.
+    round_plan:             (default None) RoundPlan with the bases of the clients in every round, e.g. to reuse the plan of an earlier simulation. If None, a plan with uniformly random bases is drawn from seed.
+    The other arguments are the options of the simulation, see utils.options.
+
+    :returns:               dict with the (nr_runtimes, nr_rounds, nr_clients) uint8 arrays 'outcomes' and 'bases', the RoundPlan 'round_plan' with the bases, and the keys that all protocols share, see utils.options.
     """
-    ## Print how often the simulation will be run
-    print(f"\t Simulation will repeat {nr_runtimes} times.")
+    ## Report the progress of the rounds, see utils.progress
+    if progress is None and print_loop_nrs:
+        progress = Progress()
 
     ## Import Alice if not provided
     if not Alice:
@@ -57,132 +108,292 @@ def get_number_announced_bits(
 
     if not network_configuration:
         raise ValueError('Please provide a network configuration.')
-    ## Setup programs
-    server_program = CentralServerProgram(nr_clients = nr_clients, nr_rounds = nr_rounds, print_loop_nrs = print_loop_nrs)
-    programs = {"Server": server_program}
-    for i in range(nr_clients):
-        if f"C{i}" == Alice:
-            node = ClientProgram(
-                client_number = i,
-                nr_rounds = nr_rounds
-                )
-        else:
-            node = ClientProgram(
-                client_number = i,
-                nr_rounds = nr_rounds
-                )
-        programs[f'C{i}'] = node
-
 
+    if not 1 <= nr_chunks <= nr_rounds:
+        raise ValueError(f'The number of chunks should be between 1 and the number of rounds, not {nr_chunks}.')
+
+    ## Master seed of the simulation, which is returned with the results
+    seed = master_seed(seed)
+
+    ## The plan with the bases of the clients, shared by all programs and runs
+    if round_plan is None:
+        round_plan = RoundPlan.generate(nr_rounds = nr_rounds, nr_clients = nr_clients, random_bases = True, seed = seed)
+    if round_plan.nr_rounds != nr_rounds or round_plan.nr_clients != nr_clients:
+        raise ValueError(f'The round plan should have {nr_rounds} rounds and {nr_clients} clients, not {round_plan}.')
+
+    if engine == 'closed_form':
+        ## Sample the corrected outcomes directly from the link parameters, without simulating the network
+        out = sample_runs(nr_clients = nr_clients, nr_rounds = nr_rounds, network_configuration = network_configuration, nr_runtimes = nr_runtimes, rng = stream_rng(seed, 'closed_form'), bases = round_plan.bases)
+    elif engine == 'squidasm':
+        ## Report the progress of all chunks and runs in one display, combined over the workers
+        if progress is not None:
+            progress.expect(nr_rounds*nr_runtimes)
+        with forward(progress, workers) as shared:
+            ## Setup the programs for every chunk of rounds, every chunk with its part of the plan
+            chunk_starts = np.cumsum([0] + split_evenly(nr_rounds, nr_chunks))
+            programs_per_chunk = [setup_programs(nr_clients = nr_clients, nr_rounds = chunk_rounds, round_plan = round_plan.chunk(chunk_start, chunk_start + chunk_rounds), Alice = Alice, progress = shared, rounds_per_flush = rounds_per_flush, defer_corrections = defer_corrections, sequential_fusion = sequential_fusion, loop_rounds = loop_rounds, correction_window = correction_window, rounds_per_frame = rounds_per_frame, instrument = instrument, trace = trace)
+                                  for chunk_start, chunk_rounds in zip(chunk_starts, split_evenly(nr_rounds, nr_chunks))]
+
+            ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
+            ## The chunks are merged, so out looks like the output of a single simulation of all rounds
+            out = run_round_chunks(
+                config=network_configuration,
+                programs_per_chunk=programs_per_chunk,
+                num_times=nr_runtimes,
+                workers=workers,
+                seed=seed,
+                formalism=select_formalism(formalism, network_configuration),
+            )
+        if progress is not None:
+            progress.report()
+
+        ## Apply the corrections of the server in bulk, if they were deferred to the end of the run
+        if defer_corrections:
+            for run_nr in range(nr_runtimes):
+                corrections = out[0][run_nr]['corrections']
+                for i in range(nr_clients):
+                    client_results = out[i+1][run_nr]
+                    client_results['outcomes'] = PackedBits.from_bits([correct_outcome(i, outcome, m_server, basis) for outcome, m_server, basis in zip(client_results['outcomes'], corrections[i], client_results['bases'])])
+    else:
+        raise ValueError(f"Unknown engine '{engine}', choose 'squidasm' or 'closed_form'.")
+
+    ## Group the outcomes and bases of all runs in (runs, rounds, clients) arrays
+    simulation = {
+        'outcomes': stack_client_results(out, 'outcomes', nr_clients, nr_runtimes),
+        'bases': stack_client_results(out, 'bases', nr_clients, nr_runtimes),
+        'simulation_times': np.array([out[0][run_nr]['simulation_time'] for run_nr in range(nr_runtimes)]),
+        'seed': seed,
+        'round_plan': round_plan,
+    }
+
+    ## Simulated time of every round, which is only known when the network is simulated
+    if engine == 'squidasm':
+        simulation['round_durations'] = np.array([out[0][run_nr]['round_durations'] for run_nr in range(nr_runtimes)])
+        node_names = ['Server'] + [f"C{i}" for i in range(nr_clients)]
+        if instrument:
+            ## Metrics of the phases of every run, per node
+            simulation['phases'] = {name: [out[node_nr][run_nr]['phases'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
+        if trace:
+            ## Spans of the phases of every run, per node
+            simulation['trace'] = {name: [out[node_nr][run_nr]['trace'] for run_nr in range(nr_runtimes)] for node_nr, name in enumerate(node_names)}
+
+    return simulation
+
+
+def analyse(
+            simulation: dict = None,
+            nr_verification_rounds: int = int(3e2),
+            perform_statcor_VER: bool = True,
+            VER_tolerance: float = 1e-8,
+            perform_separate_PE: bool = True,
+            nr_estimation_rounds: int = int(3e2),
+            perform_statcor_PE: bool = False,
+            PE_tolerance: float = 1e-8,
+            anon_tolerance: float = 1e-8,
+            nr_selections: int = 1,
+            rng: np.random.Generator = None,
+            ) -> tuple:
+    """ Calculate the message lengths of a simulation of the untrusted GHZ based protocol, for nr_selections random choices of the verification and estimation rounds per run.
+    simulation:             (default None) Output of simulate_rounds.
+    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
+    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
+    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
+    perform_separate_PE:    (default True) Whether to perform PE separately from VER, instead of inferring it from VER.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    anon_tolerance:         (default 1e-8) Level of anonymity; see keyrate calculations.
+    nr_selections:          (default 1) Number of random choices of the verification and estimation rounds per run.
+    rng:                    (default None) Numpy random generator for the choice of the rounds. This would be a public source of randomness.
 
-    ## Run the simulation. Programs argument is a mapping of network node labels to programs to run on that node
-    out = run(
-        config=network_configuration,
-        programs=programs,
-        num_times=nr_runtimes,
-    )
+    :returns:               message_lengths, run_times pair of a (nr_runtimes, nr_selections) array and a (nr_runtimes,) array.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
 
-    #%% Post-processing
-    message_lengths = []
-    run_times = []
-    
-    # Loop through every run separately
-    for run_nr in range(nr_runtimes):
-        results = {"simulation_time" : out[0][run_nr]['simulation_time']}
+    nr_runtimes, nr_rounds, _ = simulation['outcomes'].shape
 
-        for i in range(nr_clients):
-            results[f"C{i}"] = out[i+1]
+    # No extra rounds are used for parameter estimation if it is inferred from the verification rounds
+    if not perform_separate_PE:
+        nr_estimation_rounds = 0
 
-        # bases = []
-        # announcements = []
+    # Error of every round, and whether the round can be used at all (an even number of Y measurements)
+    round_errors, round_valid = ghz_basis_errors(simulation['outcomes'], simulation['bases'])
 
-        # for i in range(nr_clients):
-        #     announcements.append(list(results[f"C{i}"][run_nr]['outcomes']))
-        #     bases.append(list(results[f"C{i}"][run_nr]['bases']))
-        
-        #%% For simulation purposes, its easier to group the outcomes and bases by round
-        outcomes = [[results[f"C{i}"][run_nr]['outcomes'][round_nr] for i in range(nr_clients)] for round_nr in range(nr_rounds)]
-        bases = [[results[f"C{i}"][run_nr]['bases'][round_nr] for i in range(nr_clients)] for round_nr in range(nr_rounds)]
+    message_lengths = np.zeros((nr_runtimes, nr_selections))
 
+    # Loop through every run separately, and handle all selections of a run at once
+    for run_nr in range(nr_runtimes):
         #%% Make random choice of verification and estimation rounds
         # This would be a public source of randomness
-        VER_rounds_selection = set(sample(range(nr_rounds), k = nr_verification_rounds)) # VER = verification
-
-        PE_rounds_selection = set(sample(sorted(set(range(nr_rounds)) - VER_rounds_selection), k = nr_estimation_rounds)) # PE = Parameter Estimation
-
-        # broadcasting_rounds_selection = set(range(nr_rounds)) - VER_rounds_selection - PE_rounds_selection # Rest of the rounds, used for anonymous broadcasting
-
-        #%% Simulate the first step now: verification of the results
-        ###### Verification step ########
-        ## Obtain error rate
-        verification_parities = []
-        for round_nr in VER_rounds_selection:
-            bases_sum = sum(bases[round_nr])
-            if (bases_sum % 4) == 0:
-                verification_parities.append(sum(outcomes[round_nr]) % 2)
-            elif (bases_sum % 4) == 2:
-                verification_parities.append((sum(outcomes[round_nr]) + 1) % 2)
-        
-        verification_error_rate = sum(verification_parities)/len(verification_parities)
-
-        # Perform statistical correction on estimation of error rate
-        if perform_statcor_VER:
-            verification_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=len(verification_parities), tolerance = VER_tolerance)
-        else:
-            verification_statistical_correction = 0
-        
-        ###### Parameter estimation step ########
-        if perform_separate_PE:
-            ## Obtain error rate
-            estimation_parities = []
-            for round_nr in PE_rounds_selection:
-                bases_sum = sum(bases[round_nr])
-                if (bases_sum % 4) == 0:
-                    estimation_parities.append(sum(outcomes[round_nr]) % 2)
-                elif (bases_sum % 4) == 2:
-                    estimation_parities.append((sum(outcomes[round_nr]) + 1) % 2)
-            
-            PE_error_rate = sum(estimation_parities)/len(estimation_parities)
+        selections = sample_selections(rng, nr_rounds, nr_verification_rounds + nr_estimation_rounds, nr_selections)
+        VER_rounds = selections[:, :nr_verification_rounds] # VER = verification
+        PE_rounds = selections[:, nr_verification_rounds:] # PE = Parameter Estimation
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            #%% Simulate the first step now: verification of the results
+            ###### Verification step ########
+            ## Obtain error rate over the verification rounds with an even number of Y measurements
+            nr_verification_parities = np.count_nonzero(round_valid[run_nr, VER_rounds], axis = 1)
+            nr_verification_errors = np.count_nonzero(round_errors[run_nr, VER_rounds] & round_valid[run_nr, VER_rounds], axis = 1)
+
+            verification_error_rate = nr_verification_errors/nr_verification_parities
 
             # Perform statistical correction on estimation of error rate
-            if perform_statcor_PE:
-                PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=len(estimation_parities), tolerance = PE_tolerance)
+            if perform_statcor_VER:
+                verification_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_verification_parities, tolerance = VER_tolerance)
             else:
-                PE_statistical_correction = 0
-        else:
-            # No extra rounds are used for parameter estimation now. The PE_error rate becomes the verification error rate.
-            # The statistical correction, if applicable, also becomes that of the VER rounds.
-            PE_rounds_selection = {}
-            nr_estimation_rounds = 0
-            PE_error_rate = verification_error_rate
-
-            if perform_statcor_PE:
-                PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=len(verification_parities), tolerance = PE_tolerance)
+                verification_statistical_correction = 0
+
+            ###### Parameter estimation step ########
+            if perform_separate_PE:
+                ## Obtain error rate over the estimation rounds with an even number of Y measurements
+                nr_estimation_parities = np.count_nonzero(round_valid[run_nr, PE_rounds], axis = 1)
+                nr_estimation_errors = np.count_nonzero(round_errors[run_nr, PE_rounds] & round_valid[run_nr, PE_rounds], axis = 1)
+
+                PE_error_rate = nr_estimation_errors/nr_estimation_parities
+
+                # Perform statistical correction on estimation of error rate
+                if perform_statcor_PE:
+                    PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_estimation_parities, tolerance = PE_tolerance)
+                else:
+                    PE_statistical_correction = 0
             else:
-                PE_statistical_correction = 0
+                # The PE_error rate becomes the verification error rate.
+                # The statistical correction, if applicable, also becomes that of the VER rounds.
+                PE_error_rate = verification_error_rate
 
+                if perform_statcor_PE:
+                    PE_statistical_correction = calculate_statistical_correction(nr_total_rounds=nr_rounds, nr_est_rounds=nr_verification_parities, tolerance = PE_tolerance)
+                else:
+                    PE_statistical_correction = 0
 
+            ##### Calculate message length
+            VER_rate = verification_error_rate + verification_statistical_correction
 
-        ##### Calculate message length
-        try:
             # Calculate verification penalty
-            penalty_VER = 1/(ceil(log(anon_tolerance)/log(verification_error_rate + verification_statistical_correction))) ##  See explanation ipynb notebook
+            penalty_VER = 1/(np.ceil(np.log(anon_tolerance)/np.log(VER_rate))) ##  See explanation ipynb notebook
 
             # Calculate estimation penalty
-            bin_entropy_EST = binary_entropy(PE_error_rate + PE_statistical_correction)
+            bin_entropy_EST = binary_entropy_array(PE_error_rate + PE_statistical_correction)
             penalty_EST = (1/2)*(1 - bin_entropy_EST) # See explanation ipynb notebook
 
             message_size = penalty_VER * penalty_EST * (nr_rounds - nr_estimation_rounds - nr_verification_rounds) # See explanation ipynb notebook
-        except ValueError:
-            print(f"The (statistically corrected) error rates are too large:\n\t VER:{verification_error_rate:.2f} + ({verification_statistical_correction:.3f})\n\t  PE:{PE_error_rate:.2f} + ({PE_statistical_correction:.3f})")
-            message_size = 0
 
-        ## Append the message length and run times to the lists
-        message_lengths.append(message_size)
-        run_times.append(results['simulation_time'])
+        # The message length is 0 where the (statistically corrected) error rates are too large for the logarithm and binary entropy
+        too_large = ~np.isfinite(message_size) | (VER_rate <= 0) | (VER_rate == 1)
+        if too_large.any():
+            print(f"The (statistically corrected) error rates are too large in {np.count_nonzero(too_large)} of {nr_selections} selection(s) of run {run_nr}.")
+        message_lengths[run_nr] = np.where(too_large, 0, message_size)
+
+    # Return the message lengths and run times
+    return message_lengths, simulation['simulation_times']
+
 
-    # Return the list of message lengths and run times
-    return message_lengths, run_times
+def get_number_announced_bits(
+                            nr_clients: int = 3,
+                            nr_rounds: int = int(1e3),
+                            nr_verification_rounds: int = int(3e2),
+                            perform_statcor_VER: bool = True,
+                            VER_tolerance: float = 1e-8,
+                            perform_separate_PE: bool = True,
+                            nr_estimation_rounds: int = int(3e2),
+                            perform_statcor_PE: bool = False,
+                            PE_tolerance: float = 1e-8,
+                            network_configuration = None,
+                            nr_runtimes = 1,
+                            Alice: str = None,
+                            print_loop_nrs: bool = False,
+                            progress: Progress = None,
+                            anon_tolerance: float = 1e-8,
+                            rounds_per_flush: int = 1,
+                            defer_corrections: bool = False,
+                            sequential_fusion: bool = False,
+                            loop_rounds: bool = False,
+                            correction_window: int = 0,
+                            rounds_per_frame: int = 1,
+                            instrument: bool = False,
+                            trace_path: str = None,
+                            engine: str = 'squidasm',
+                            workers: int = 1,
+                            seed: int = None,
+                            nr_chunks: int = 1,
+                            formalism: str = None,
+                            round_plan: RoundPlan = None,
+                            cache: ResultCache = None,
+                            refresh: bool = False,
+                            ):
+    """ Simulate the untrusted GHZ based protocol and calculate the message length of every run. Combines simulate_rounds and analyse.
+    nr_clients:             (default 3) Number of clients.
+    nr_rounds:              (default 1e3) Number of rounds to run.
+    nr_verification_rounds: (default 3e2) Number of rounds to consume to perform verification.
+    perform_statcor_VER:    (default True) Whether to perform statistical correction to verification error rate.
+    VER_tolerance:          (default 1e-8) Tolerance for statistical correction of VER.
+    perform_separate_PE:    (default True) Whether to perform PE separately from VER, instead of inferring it from VER.
+    nr_estimation_rounds:   (default 3e2) Number of rounds to consume to estimate the error rate.
+    perform_statcor_PE:     (default False) Whether to perform statistical correction to PE ereror rate.
+    PE_tolerance:           (default 1e-8) Tolerance for statistical correction of PE.
+    network_configuration:  (default None) Network configuration object from Squidasm.
+    nr_runtimes:            (default 1) Number of times to run the simulation.
+    Alice:                  (default None) Client that is Alice.
+    anon_tolerance:         (default 1e-8) Level of anonymity; see keyrate calculations.
+    The other arguments are the options of the simulation, see utils.options, and the round_plan of simulate_rounds.
+    """
+    # Take the result of an identical earlier call from the cache. Writing a trace is a side effect, so those calls always run
+    if cache is not None and trace_path is None:
+        arguments = {name: value for name, value in locals().items() if name not in ['cache', 'refresh']}
+        return cache.call(get_number_announced_bits, refresh = refresh, **arguments)
+
+    # Time spent simulating and analysing the rounds
+    timer = PhaseTimer(instrument or trace_path is not None, trace = trace_path is not None)
+
+    with timer.phase('simulate'):
+        simulation = simulate_rounds(
+                                nr_clients = nr_clients,
+                                nr_rounds = nr_rounds,
+                                network_configuration = network_configuration,
+                                nr_runtimes = nr_runtimes,
+                                Alice = Alice,
+                                print_loop_nrs = print_loop_nrs,
+                                progress = progress,
+                                rounds_per_flush = rounds_per_flush,
+                                defer_corrections = defer_corrections,
+                                sequential_fusion = sequential_fusion,
+                                loop_rounds = loop_rounds,
+                                correction_window = correction_window,
+                                rounds_per_frame = rounds_per_frame,
+                                instrument = instrument,
+                                trace = trace_path is not None,
+                                engine = engine,
+                                workers = workers,
+                                seed = seed,
+                                nr_chunks = nr_chunks,
+                                formalism = formalism,
+                                round_plan = round_plan,
+                                )
+
+    #%% Post-processing
+    with timer.phase('analyse'):
+        message_lengths, run_times = analyse(
+                                simulation,
+                                nr_verification_rounds = nr_verification_rounds,
+                                perform_statcor_VER = perform_statcor_VER,
+                                VER_tolerance = VER_tolerance,
+                                perform_separate_PE = perform_separate_PE,
+                                nr_estimation_rounds = nr_estimation_rounds,
+                                perform_statcor_PE = perform_statcor_PE,
+                                PE_tolerance = PE_tolerance,
+                                anon_tolerance = anon_tolerance,
+                                rng = stream_rng(simulation['seed'], 'selection'),
+                                )
+
+    if trace_path is not None:
+        write_chrome_trace(trace_path, simulation.get('trace', {}), extra_tracks = {'main': timer.spans})
+
+    # Return the list of message lengths and run times, and the metrics of the phases
+    if instrument:
+        return message_lengths[:, 0].tolist(), run_times.tolist(), {'phases': timer.metrics(), 'nodes': simulation.get('phases', {})}
+    return message_lengths[:, 0].tolist(), run_times.tolist()
 
 
 # %%
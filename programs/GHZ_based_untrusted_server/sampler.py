@@ -0,0 +1,42 @@
+import numpy as np
+
+from utils.bitarray import PackedBits
+from utils.closedform import depolarise_link_parameters, sample_ghz_outcomes, sample_generation_time
+
+
+def sample_runs(
+        nr_clients: int = 3,
+        nr_rounds: int = int(1e3),
+        network_configuration = None,
+        nr_runtimes: int = 1,
+        rng: np.random.Generator = None,
+        bases: np.ndarray = None,
+        ) -> list:
+    '''
+    Closed-form alternative for running the GHZ-based untrusted server protocol with Squidasm, for star networks with depolarising links.
+    Every client measures in a uniformly random X or Y basis, unless the bases are given. The bases, corrected outcomes and simulation time are sampled directly from the link parameters.
+    The simulation time is the time the server spends generating the EPR pairs one client after the other; gates and classical communication are taken to be instantaneous.
+
+    :param nr_clients: number of clients.
+    :param nr_rounds: number of rounds to sample.
+    :param network_configuration: StackNetworkConfig of a star network with depolarising links.
+    :param nr_runtimes: number of independent runs to sample.
+    :param rng: numpy random generator. Defaults to a freshly seeded generator.
+    :param bases: optional (nr_rounds, nr_clients) array with the bases of the clients in every run, e.g. those of a RoundPlan. If None, the bases are drawn for every run.
+    :returns: the results in the same layout as the output of squidasm's run, with the per-round results as PackedBits: a list with for the Server and then every client a list of result dicts, one per run.
+    '''
+    fidelity, prob_success, t_cycle = depolarise_link_parameters(network_configuration)
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    out = [[] for _ in range(nr_clients + 1)]
+    for run_nr in range(nr_runtimes):
+        run_bases = bases if bases is not None else rng.integers(0, 2, size = (nr_rounds, nr_clients), dtype = np.uint8)
+        outcomes = sample_ghz_outcomes(rng, nr_rounds, nr_clients, fidelity, bases = run_bases)
+
+        out[0].append({'simulation_time': sample_generation_time(rng, nr_rounds*nr_clients, prob_success, t_cycle)})
+        for i in range(nr_clients):
+            out[i+1].append({'outcomes': PackedBits.from_bits(outcomes[:, i]), 'bases': PackedBits.from_bits(run_bases[:, i])})
+
+    return out
@@ -0,0 +1,17 @@
+from types import SimpleNamespace
+
+import pytest
+
+
+def star_network_config(nr_clients: int, fidelity: float = 0.99):
+    '''
+    Minimal stand-in of a StackNetworkConfig of a star network with depolarising links and noiseless devices, as read by utils.closedform.
+    '''
+    link_cfg = {'fidelity': fidelity, 'prob_success': 0.9, 't_cycle': 10}
+    return SimpleNamespace(links = [SimpleNamespace(typ = 'depolarise', cfg = link_cfg) for _ in range(nr_clients)],
+                           stacks = [SimpleNamespace(name = name, qdevice_cfg = {}) for name in ['Server'] + [f"C{i}" for i in range(nr_clients)]])
+
+
+@pytest.fixture
+def depolarise_network():
+    return star_network_config
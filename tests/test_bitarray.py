@@ -0,0 +1,64 @@
+import pickle
+from random import Random
+
+import numpy as np
+import pytest
+
+from utils.bitarray import PackedBits
+
+
+def random_bits(length: int, seed: int = 1) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 2, size = length, dtype = np.uint8)
+
+
+@pytest.mark.parametrize('length', [0, 1, 7, 8, 9, 15, 16, 17, 1001])
+def test_from_bits_round_trip(length):
+    bits = random_bits(length)
+    packed = PackedBits.from_bits(bits)
+    assert len(packed) == length
+    assert packed.nbytes == (length + 7)//8
+    np.testing.assert_array_equal(packed.unpack(), bits)
+    np.testing.assert_array_equal(np.asarray(packed), bits)
+    assert list(packed) == bits.tolist()
+    assert PackedBits.from_bits(bits.tolist()) == packed
+
+
+def test_indexing():
+    bits = random_bits(21)
+    packed = PackedBits.from_bits(bits)
+    assert [packed[i] for i in range(21)] == bits.tolist()
+    assert packed[-1] == bits[-1] and packed[-21] == bits[0]
+    assert packed[3:19] == PackedBits.from_bits(bits[3:19])
+    assert packed[::2] == PackedBits.from_bits(bits[::2])
+    for index in [21, -22]:
+        with pytest.raises(IndexError):
+            packed[index]
+
+
+def test_from_int_matches_the_binary_representation():
+    rng = Random(1)
+    for length in [1, 5, 8, 13, 64, 100]:
+        value = rng.getrandbits(length)
+        assert list(PackedBits.from_int(value, length)) == [int(b) for b in bin(value)[2:].zfill(length)]
+
+
+def test_concatenate_unaligned_parts():
+    parts = [random_bits(length, seed) for seed, length in enumerate([3, 8, 13, 0, 5])]
+    packed = PackedBits.concatenate([PackedBits.from_bits(part) for part in parts])
+    np.testing.assert_array_equal(packed.unpack(), np.concatenate(parts))
+    assert PackedBits.concatenate([]) == PackedBits()
+
+
+def test_xor_and_pickle():
+    a, b = random_bits(19, 1), random_bits(19, 2)
+    assert PackedBits.from_bits(a) ^ PackedBits.from_bits(b) == PackedBits.from_bits(a ^ b)
+    with pytest.raises(ValueError):
+        PackedBits.from_bits(a) ^ PackedBits.from_bits(b[:-1])
+
+    packed = PackedBits.from_bits(a)
+    assert pickle.loads(pickle.dumps(packed)) == packed
+
+
+def test_data_should_hold_exactly_length_bits():
+    with pytest.raises(ValueError):
+        PackedBits(np.zeros(2, dtype = np.uint8), 17)
@@ -0,0 +1,94 @@
+from os import listdir, path
+
+import pytest
+
+from utils.cache import ResultCache, cache_key, code_version
+
+
+def simulate(nr_rounds: int = 10, seed: int = None):
+    return [nr_rounds, seed]
+
+
+def test_results_are_cached(tmp_path):
+    cache = ResultCache(str(tmp_path), code = 'v1')
+    assert cache.call(simulate, nr_rounds = 5, seed = 1) == [5, 1]
+    assert cache.get(simulate, {'nr_rounds': 5, 'seed': 1}) == (True, [5, 1])
+    assert cache.get(simulate, {'nr_rounds': 6, 'seed': 1}) == (False, None)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_results_of_other_code_are_not_returned(tmp_path):
+    ResultCache(str(tmp_path), code = 'v1').put(simulate, {'nr_rounds': 5, 'seed': 1}, 'old result')
+    assert ResultCache(str(tmp_path), code = 'v2').get(simulate, {'nr_rounds': 5, 'seed': 1}) == (False, None)
+    assert cache_key(simulate, {'nr_rounds': 5, 'seed': 1}, 'v1') != cache_key(simulate, {'nr_rounds': 5, 'seed': 1}, 'v2')
+
+
+def test_code_version_follows_the_source(tmp_path):
+    (tmp_path / 'programs').mkdir()
+    source = tmp_path / 'programs' / 'server.py'
+    source.write_text('nr_qubits = 2\n')
+    before = code_version.__wrapped__(str(tmp_path), ('programs',))
+    assert code_version.__wrapped__(str(tmp_path), ('programs',)) == before
+    source.write_text('nr_qubits = 3\n')
+    assert code_version.__wrapped__(str(tmp_path), ('programs',)) != before
+
+
+@pytest.mark.parametrize('content', [b'', b'\x80\x05\x95', b'not a pickle at all'])
+def test_corrupt_results_are_a_miss(tmp_path, content):
+    cache = ResultCache(str(tmp_path), code = 'v1')
+    cache.put(simulate, {'nr_rounds': 5, 'seed': 1}, [5, 1])
+    filepath = cache._call_path(simulate, {'nr_rounds': 5, 'seed': 1})
+    with open(filepath, 'wb') as fh:
+        fh.write(content)
+
+    assert cache.get(simulate, {'nr_rounds': 5, 'seed': 1}) == (False, None)
+    assert not path.exists(filepath)
+    # The next call runs the function again and stores a valid result
+    assert cache.call(simulate, nr_rounds = 5, seed = 1) == [5, 1]
+    assert cache.get(simulate, {'nr_rounds': 5, 'seed': 1}) == (True, [5, 1])
+
+
+def test_put_never_evicts_the_new_result(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size = 1, code = 'v1')
+    cache.put(simulate, {'nr_rounds': 1, 'seed': 1}, list(range(100)))
+    cache.put(simulate, {'nr_rounds': 2, 'seed': 1}, list(range(100)))
+
+    # The result is larger than the cache on its own, but it is kept until the next result is stored
+    assert cache.get(simulate, {'nr_rounds': 2, 'seed': 1}) == (True, list(range(100)))
+    assert cache.get(simulate, {'nr_rounds': 1, 'seed': 1}) == (False, None)
+    assert len(listdir(tmp_path)) == 1
+    assert cache.evictions == 1
+
+
+def test_calls_without_a_seed_bypass_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path), code = 'v1')
+    assert cache.call(simulate, nr_rounds = 5) == [5, None]
+    cache.put(simulate, {'nr_rounds': 5}, [5, None])
+    assert cache.get(simulate, {'nr_rounds': 5}) == (False, None)
+
+    assert listdir(tmp_path) == []
+    assert (cache.hits, cache.misses, cache.bypasses) == (0, 0, 2)
+
+
+def test_printing_arguments_do_not_change_the_key():
+    assert cache_key(simulate, {'nr_rounds': 5, 'seed': 1, 'print_loop_nrs': True, 'progress': object()}) == cache_key(simulate, {'nr_rounds': 5, 'seed': 1})
+
+
+def test_entry_point_takes_seeded_calls_from_the_cache(tmp_path, monkeypatch):
+    pytest.importorskip('netsquid')
+    from programs.GHZ_based_untrusted_server import functions
+    from setup.configuration import star_network
+
+    cache = ResultCache(str(tmp_path))
+    arguments = dict(nr_clients = 3, nr_rounds = 1000, network_configuration = star_network(nr_clients = 3), engine = 'closed_form', cache = cache)
+    first = functions.get_number_announced_bits(seed = 1, **arguments)
+
+    # A cached call does not simulate again
+    monkeypatch.setattr(functions, 'simulate_rounds', None)
+    assert functions.get_number_announced_bits(seed = 1, print_loop_nrs = True, **arguments) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Without a seed it simulates again, which fails now
+    with pytest.raises(TypeError):
+        functions.get_number_announced_bits(seed = None, **arguments)
+    assert cache.bypasses == 1
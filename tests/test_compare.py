@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.compare import compare_variants, message_length_columns, paired_difference, print_comparison, SERVER_COLUMNS
+
+
+def test_paired_difference_of_identical_runs_is_zero():
+    difference = paired_difference([3., 5., 4.], [3., 5., 4.])
+    assert difference['mean'] == 0
+    assert difference['ci'] == (0, 0)
+
+
+def test_paired_difference_rejects_columns():
+    with pytest.raises(ValueError):
+        paired_difference([[1, 2], [3, 4], [5, 7]], [1, 2, 3])
+
+
+def test_message_length_columns_splits_the_servers():
+    columns = message_length_columns([[1, 2], [3, 4], [5, 7]])
+    assert list(columns) == SERVER_COLUMNS
+    np.testing.assert_array_equal(columns['subsequent'], [2, 4, 7])
+    assert list(message_length_columns([1, 2, 3])) == ['']
+
+
+def test_compare_protocols_driver_with_the_closed_form_engine(capsys):
+    pytest.importorskip('netsquid')
+    import compare_protocols
+
+    fixed = dict(compare_protocols.fixed, engine = 'closed_form', nr_clients = 3, nr_rounds = 2000, nr_verification_rounds = 200, nr_estimation_rounds = 200, nr_runtimes = 3)
+    reference = [point['protocol'] for point in compare_protocols.points].index(compare_protocols.reference)
+    comparison = compare_variants(compare_protocols.points, reference = reference, fixed = fixed, seed = 1)
+    print_comparison(compare_protocols.points, comparison, reference = reference)
+
+    for index, (params, columns, differences) in enumerate(comparison):
+        assert list(columns) == (SERVER_COLUMNS if params['protocol'].startswith('EPR') else [''])
+        if index == reference:
+            assert differences is None
+        else:
+            assert set(differences) == set(columns)
+            assert all(difference['nr_runs'] == 3 for _, difference in differences.values())
+    assert 'EPR_trusted (simultaneous)' in capsys.readouterr().out
@@ -0,0 +1,115 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from utils.corrections import CorrectionSender, CorrectionWindow, decode_corrections, encode_corrections
+
+
+class Socket:
+    '''
+    Classical socket that delivers the sent messages in order, with the generator interface of the programs.
+    '''
+    def __init__(self):
+        self.messages = deque()
+        self.nr_received = 0
+
+    def send(self, message: str):
+        self.messages.append(message)
+
+    def recv(self):
+        self.nr_received += 1
+        return self.messages.popleft()
+        yield
+
+
+def run(generator):
+    try:
+        while True:
+            next(generator)
+    except StopIteration as stop:
+        return stop.value
+
+
+@pytest.mark.parametrize('nr_rounds', [0, 1, 7, 8, 9, 100])
+def test_frame_round_trip(nr_rounds):
+    outcomes = np.random.default_rng(nr_rounds).integers(0, 2, size = nr_rounds)
+    first_round, decoded = decode_corrections(encode_corrections(16, outcomes))
+    assert first_round == 16
+    np.testing.assert_array_equal(decoded, outcomes)
+
+
+def test_frame_format():
+    assert encode_corrections(16, [1, 0, 1, 0, 0, 1, 0, 1]) == '16:8:a5'
+    assert encode_corrections(3, [1, 1]) == '3:2:c0'
+
+
+def test_sender_sends_full_frames_and_the_last_partial_frame():
+    socket = Socket()
+    sender = CorrectionSender(socket, rounds_per_frame = 3)
+    for round_nr in range(7):
+        sender.add(round_nr, round_nr % 2)
+    assert [message.split(':')[:2] for message in socket.messages] == [['0', '3'], ['3', '3']]
+    sender.send()
+    sender.send()
+    assert [message.split(':')[:2] for message in socket.messages] == [['0', '3'], ['3', '3'], ['6', '1']]
+
+
+def test_window_of_zero_receives_every_round():
+    socket = Socket()
+    window = CorrectionWindow(socket, window = 0)
+    for round_nr in range(3):
+        socket.send(encode_corrections(round_nr, [1]))
+        window.add(round_nr, 0)
+        assert run(window.receive()) == [(round_nr, 0, 1)]
+
+
+def test_window_only_receives_when_it_is_exceeded():
+    socket = Socket()
+    sender = CorrectionSender(socket)
+    window = CorrectionWindow(socket, window = 2)
+    for round_nr in range(2):
+        sender.add(round_nr, 1)
+        window.add(round_nr, round_nr)
+        assert run(window.receive()) == []
+    assert socket.nr_received == 0
+
+    sender.add(2, 0)
+    window.add(2, 1)
+    # One round more than the window, so only the oldest round is corrected
+    assert run(window.receive()) == [(0, 0, 1)]
+    assert len(window.pending) == 2
+
+    # At the end of the run all remaining rounds are corrected
+    assert run(window.receive(max_pending = 0)) == [(1, 1, 1), (2, 1, 0)]
+    assert not window.pending and not socket.messages
+
+
+def test_window_covers_the_frames():
+    socket = Socket()
+    sender = CorrectionSender(socket, rounds_per_frame = 4)
+    window = CorrectionWindow(socket, window = 0, rounds_per_frame = 4)
+    assert window.window == 3
+
+    corrected = []
+    for round_nr in range(10):
+        sender.add(round_nr, round_nr % 2)
+        window.add(round_nr, 0)
+        corrected += run(window.receive())
+    assert [round_nr for round_nr, _, _ in corrected] == list(range(8))
+
+    sender.send()
+    corrected += run(window.receive(max_pending = 0))
+    assert corrected == [(round_nr, 0, round_nr % 2) for round_nr in range(10)]
+
+
+def test_window_rejects_corrections_of_other_rounds():
+    socket = Socket()
+    window = CorrectionWindow(socket)
+    window.add(5, 0)
+    socket.send(encode_corrections(6, [1]))
+    with pytest.raises(ValueError):
+        run(window.receive())
+
+    with pytest.raises(ValueError):
+        CorrectionWindow(socket, window = -1)
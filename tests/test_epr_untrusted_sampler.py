@@ -0,0 +1,23 @@
+import numpy as np
+
+from programs.EPR_based_untrusted_server.sampler import sample_runs
+from utils.closedform import sample_ghz_outcomes
+from utils.roundplan import RoundPlan
+
+
+def test_sample_runs_splits_the_rounds_by_the_plan(depolarise_network):
+    plan = RoundPlan.generate(nr_rounds = 200, nr_clients = 2, nr_verification_rounds = 30, seed = 1)
+    out = sample_runs(nr_rounds = 200, nr_verification_rounds = 30, network_configuration = depolarise_network(2), rng = np.random.default_rng(1), round_plan = plan)
+
+    # The same generator gives the outcomes of all rounds, in order
+    outcomes = sample_ghz_outcomes(np.random.default_rng(1), 200, 2, 0.99)
+    for client_nr in range(2):
+        np.testing.assert_array_equal(out[client_nr + 1][0]['verification'].unpack(), outcomes[plan.verification_rounds(), client_nr])
+        np.testing.assert_array_equal(out[client_nr + 1][0]['outcomes'].unpack(), outcomes[plan.keygen_rounds(), client_nr])
+
+
+def test_sample_runs_without_a_plan(depolarise_network):
+    out = sample_runs(nr_rounds = 200, nr_verification_rounds = 30, network_configuration = depolarise_network(2), nr_runtimes = 2, rng = np.random.default_rng(1))
+    for client_results in out[1:]:
+        for run in client_results:
+            assert (len(run['verification']), len(run['outcomes'])) == (30, 170)
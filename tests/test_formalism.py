@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('netsquid')
+
+from utils.formalism import select_formalism
+
+
+def network(link_typ: str = 'depolarise', qdevice_cfg: dict = None):
+    return SimpleNamespace(links = [SimpleNamespace(typ = link_typ, cfg = {})],
+                           stacks = [SimpleNamespace(name = 'Server', qdevice_cfg = qdevice_cfg or {})])
+
+
+def test_default_keeps_the_current_formalism():
+    assert select_formalism(None, network()) is None
+
+
+def test_auto_is_opt_in():
+    assert select_formalism('auto', network()) == 'STAB'
+    assert select_formalism('auto', network(link_typ = 'heralded')) == 'KET'
+    assert select_formalism('auto', network(qdevice_cfg = {'T1': 1e6})) == 'KET'
+
+
+def test_stabilizer_formalism_is_checked():
+    with pytest.raises(ValueError):
+        select_formalism('STAB', network(link_typ = 'heralded'))
+    with pytest.raises(ValueError):
+        select_formalism('CLIFFORD')
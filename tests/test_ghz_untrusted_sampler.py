@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from programs.GHZ_based_untrusted_server.sampler import sample_runs
+from utils.roundplan import RoundPlan
+
+
+def test_sample_runs_uses_the_bases_of_the_plan(depolarise_network):
+    plan = RoundPlan.generate(nr_rounds = 50, nr_clients = 3, random_bases = True, seed = 1)
+    out = sample_runs(nr_clients = 3, nr_rounds = 50, network_configuration = depolarise_network(3), nr_runtimes = 2, rng = np.random.default_rng(1), bases = plan.bases)
+
+    for client_nr in range(3):
+        for run in out[client_nr + 1]:
+            np.testing.assert_array_equal(run['bases'].unpack(), plan.client_bases(client_nr))
+            assert len(run['outcomes']) == 50
+
+
+def test_sample_runs_draws_bases_without_a_plan(depolarise_network):
+    out = sample_runs(nr_clients = 3, nr_rounds = 200, network_configuration = depolarise_network(3), nr_runtimes = 2, rng = np.random.default_rng(1))
+
+    bases = [np.stack([out[client_nr + 1][run_nr]['bases'].unpack() for client_nr in range(3)], axis = 1) for run_nr in range(2)]
+    # Every run draws its own bases
+    assert not np.array_equal(bases[0], bases[1])
+
+
+def test_closed_form_engine_returns_the_bases_of_the_plan():
+    pytest.importorskip('netsquid')
+    from programs.GHZ_based_untrusted_server.functions import simulate_rounds, get_number_announced_bits
+    from setup.configuration import star_network
+
+    network_configuration = star_network(nr_clients = 3)
+    plan = RoundPlan.generate(nr_rounds = 100, nr_clients = 3, random_bases = True, seed = 2)
+    simulation = simulate_rounds(nr_clients = 3, nr_rounds = 100, network_configuration = network_configuration, nr_runtimes = 2, engine = 'closed_form', seed = 1, round_plan = plan)
+    for run_nr in range(2):
+        np.testing.assert_array_equal(simulation['bases'][run_nr], plan.bases)
+
+    message_lengths, _ = get_number_announced_bits(nr_clients = 3, nr_rounds = 1000, network_configuration = network_configuration, engine = 'closed_form', seed = 1)
+    assert len(message_lengths) == 1
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('netsquid')
+pytest.importorskip('netqasm')
+
+from netqasm.sdk.connection import DebugConnection
+from netqasm.sdk.epr_socket import EPRSocket
+
+from programs.GHZ_based_untrusted_server.client import Client
+from programs.GHZ_based_untrusted_server.server import CentralServerProgram
+from utils.roundplan import RoundPlan
+
+
+class CompilingConnection(DebugConnection):
+    '''
+    Connection that compiles every flushed subroutine with netqasm's builder and keeps it, instead of executing it.
+    '''
+    def __init__(self, *args, **kwargs):
+        self.subroutines = []
+        super().__init__(*args, **kwargs)
+
+    def flush(self, block: bool = True, callback = None):
+        self.subroutines.append(self.compile())
+        yield
+
+
+def first_subroutine(program, node: str, peers: list) -> list:
+    '''
+    Run a program up to its first flush, and return the mnemonics of the instructions of the subroutine it flushes.
+    '''
+    DebugConnection.node_ids = {name: nr for nr, name in enumerate(['Server', 'C0', 'C1', 'C2'])}
+    epr_sockets = {peer: EPRSocket(peer) for peer in peers}
+    connection = CompilingConnection(node, epr_sockets = list(epr_sockets.values()))
+    next(program.run(SimpleNamespace(csockets = {peer: None for peer in peers}, epr_sockets = epr_sockets, connection = connection)))
+    return [instruction.mnemonic for instruction in connection.subroutines[0].instructions]
+
+
+@pytest.fixture
+def plan():
+    return RoundPlan.generate(nr_rounds = 8, nr_clients = 3, nr_verification_rounds = 2, seed = 1)
+
+
+@pytest.mark.parametrize('loop_rounds', [False, True])
+def test_client_batch(plan, loop_rounds):
+    client = Client(client_number = 0, nr_rounds = 8, rounds_per_flush = 8, loop_rounds = loop_rounds, round_plan = plan)
+    mnemonics = first_subroutine(client, 'C0', ['Server'])
+
+    if loop_rounds:
+        # The body is compiled once, resets the results array of the EPR pair, and rotates into the Y basis depending on the bases array
+        assert mnemonics.count('recv_epr') == 1
+        assert mnemonics.index('undef') < mnemonics.index('recv_epr')
+        assert mnemonics.index('recv_epr') < mnemonics.index('bez') < mnemonics.index('rot_z')
+    else:
+        assert mnemonics.count('recv_epr') == 8
+        assert mnemonics.count('rot_z') == list(plan.client_bases(0)).count(1)
+
+
+@pytest.mark.parametrize('loop_rounds', [False, True])
+def test_server_batch(loop_rounds):
+    server = CentralServerProgram(nr_clients = 3, nr_rounds = 8, rounds_per_flush = 8, loop_rounds = loop_rounds)
+    mnemonics = first_subroutine(server, 'Server', ['C0', 'C1', 'C2'])
+
+    requests = [mnemonic for mnemonic in mnemonics if mnemonic in ['undef', 'create_epr', 'wait_all']]
+    if loop_rounds:
+        # The body is compiled once, and every request resets its results array before waiting on it
+        assert requests == ['undef', 'create_epr', 'wait_all']*3
+    else:
+        assert requests == ['create_epr', 'wait_all']*24
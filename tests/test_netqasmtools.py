@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip('netqasm')
+
+from netqasm.sdk.connection import DebugConnection
+from netqasm.sdk.epr_socket import EPRSocket
+
+from utils import netqasmtools
+from utils.netqasmtools import loop_epr_keep, require_builder_method, require_netqasm_version
+
+
+@pytest.fixture
+def connection():
+    DebugConnection.node_ids = {'Server': 0, 'C0': 1, 'C1': 2, 'C2': 3}
+    epr_sockets = [EPRSocket(f"C{nr}") for nr in range(3)]
+    return DebugConnection('Server', epr_sockets = epr_sockets), epr_sockets
+
+
+def instructions(connection) -> list:
+    return [instruction.mnemonic for instruction in connection.compile().instructions]
+
+
+def test_loop_epr_keep_resets_the_results_array(connection):
+    connection, epr_sockets = connection
+    with connection.loop(10):
+        loop_epr_keep(epr_sockets[0]).measure()
+
+    commands = instructions(connection)
+    assert 'create_epr' in commands
+    assert commands.index('undef') < commands.index('create_epr')
+
+
+def test_unsupported_builder_raises_a_clear_error():
+    class OldBuilder:
+        def sdk_epr_keep(self, role, params):
+            pass
+
+    with pytest.raises(RuntimeError, match = 'reset_results_array'):
+        require_builder_method(OldBuilder(), 'sdk_epr_keep', 'reset_results_array', feature = 'loop_epr_keep')
+
+
+def test_other_netqasm_version_raises_a_clear_error(monkeypatch):
+    monkeypatch.setattr(netqasmtools, 'installed_netqasm_version', lambda: '3.0.0')
+    with pytest.raises(RuntimeError, match = 'pinned to netqasm'):
+        require_netqasm_version(feature = 'loop_epr_keep')
+
+    monkeypatch.setattr(netqasmtools, 'installed_netqasm_version', lambda: netqasmtools.NETQASM_VERSION + '.9')
+    require_netqasm_version()
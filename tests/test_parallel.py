@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('netsquid')
+
+from utils.parallel import merge_round_chunks
+
+
+def chunk(simulation_time: float, round_starts: list) -> list:
+    '''
+    Output of a single repetition of a chunk with a server and a client, the client does not report the simulation time.
+    '''
+    spans = [('round', (0., start, 0), (0., start + 5, 1)) for start in round_starts] + [('setup', (0., None, None), (0., None, None))]
+    return [[{'simulation_time': simulation_time, 'round_durations': np.full(len(round_starts), 5.), 'trace': spans}],
+            [{'trace': list(spans)}]]
+
+
+def test_merged_traces_continue_in_simulated_time():
+    merged = merge_round_chunks([chunk(20., [0, 10]), chunk(30., [0, 10, 20]), chunk(10., [0])])
+    server, client = merged[0][0], merged[1][0]
+
+    assert server['simulation_time'] == 60.
+    assert len(server['round_durations']) == 6
+    for trace in [server['trace'], client['trace']]:
+        assert [start[1] for name, start, _ in trace if name == 'round'] == [0, 10, 20, 30, 40, 50]
+        assert [end[1] - start[1] for name, start, end in trace if name == 'round'] == [5]*6
+        # Spans without simulated time stay without it
+        assert all(start[1] is None for name, start, _ in trace if name == 'setup')
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from benchmarks.regression import compare_metric
+
+
+def test_clear_slowdown_is_a_regression():
+    baseline = [100., 102., 98., 101., 99.]
+    current = [80., 82., 79., 81., 80.]
+    comparison = compare_metric(current, baseline, higher_is_better = True, threshold = 0.1)
+    assert comparison['significant'] and comparison['regression']
+    assert comparison['change'] == pytest.approx(-0.2, abs = 0.01)
+
+
+def test_noisy_but_equal_samples_are_not_a_regression():
+    rng = np.random.default_rng(1)
+    baseline = 100*np.exp(rng.normal(0, 0.2, size = 5))
+    current = 100*np.exp(rng.normal(0, 0.2, size = 5))
+    comparison = compare_metric(current, baseline, higher_is_better = True, threshold = 0.1)
+    assert not comparison['regression']
+    low, high = comparison['ci']
+    assert low < 0 < high
+
+
+def test_significant_change_below_the_threshold_is_not_a_regression():
+    baseline = [100., 100.5, 99.5, 100.2, 99.8]
+    current = [95., 95.5, 94.5, 95.2, 94.8]
+    comparison = compare_metric(current, baseline, higher_is_better = True, threshold = 0.1)
+    assert comparison['significant'] and not comparison['regression']
+
+
+def test_memory_increase_is_a_regression():
+    comparison = compare_metric([130., 131., 130.], [100., 100., 101.], higher_is_better = False, threshold = 0.1)
+    assert comparison['regression']
+    # A decrease in memory is an improvement
+    assert not compare_metric([70., 71., 70.], [100., 100., 101.], higher_is_better = False)['significant']
@@ -0,0 +1,53 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from utils.seeding import STREAMS, master_seed, run_seeds, simulation_seed, stream_rng, stream_seed
+
+
+def test_streams_are_reproducible():
+    for name in STREAMS:
+        np.testing.assert_array_equal(stream_rng(1, name, 2, 3).random(100), stream_rng(1, name, 2, 3).random(100))
+        assert stream_seed(1, name) == stream_seed(1, name)
+
+
+def test_streams_are_independent():
+    nr_samples = 100000
+    samples = {(seed, name, index): stream_rng(seed, name, index).standard_normal(nr_samples)
+               for seed in [1, 2] for name in STREAMS for index in [0, 1]}
+    for (key, a), (other_key, b) in combinations(samples.items(), 2):
+        assert not np.array_equal(a, b), (key, other_key)
+        # The correlation of independent normal samples is about N(0, 1/nr_samples)
+        assert abs(np.corrcoef(a, b)[0, 1]) < 5/np.sqrt(nr_samples), (key, other_key)
+
+
+def test_run_seeds_do_not_depend_on_the_split_of_the_runs():
+    seeds = run_seeds(1, 10)
+    assert run_seeds(1, 4) == seeds[:4]
+    assert len(set(seeds)) == 10
+    assert not set(seeds) & set(run_seeds(1, 10, chunk_nr = 1))
+
+
+def test_master_seed():
+    assert master_seed(7) == 7
+    seed = master_seed()
+    assert isinstance(seed, int)
+    # A drawn seed replays the experiment like a given one
+    assert stream_seed(seed, 'selection') == stream_seed(master_seed(seed), 'selection')
+
+
+def test_simulation_seed():
+    assert simulation_seed({'seed': 7}) == 7
+    assert simulation_seed({}) is None
+    # As loaded by load_simulation, with the seed of every run
+    assert simulation_seed({'seed': np.full(4, 7, dtype = np.uint64)}) == 7
+    with pytest.raises(ValueError):
+        simulation_seed({'seed': np.array([7, 7, 8], dtype = np.uint64)})
+
+
+def test_invalid_streams():
+    with pytest.raises(ValueError):
+        stream_rng(1, 'unknown')
+    with pytest.raises(ValueError):
+        stream_rng(None, 'netsquid')
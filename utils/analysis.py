@@ -0,0 +1,39 @@
+from utils.seeding import master_seed, simulation_seed, stream_rng
+from utils.sweep import sweep_grid
+
+
+def analyse_grid(
+        analyse = None,
+        simulation: dict = None,
+        axes: dict = None,
+        nr_selections: int = 1,
+        seed: int = None,
+        ) -> list:
+    '''
+    Analyse a single simulation for every point of a grid of analysis parameters, e.g. the number of verification rounds and the tolerances, without simulating again.
+    Every point starts from the same seed, so the points are compared on the same random selections of rounds as far as possible.
+
+    Example:
+        simulation = simulate_rounds(nr_clients = 4, nr_rounds = 10000, network_configuration = network_config, nr_runtimes = 10)
+        analyse_grid(analyse, simulation,
+                     axes = {('nr_verification_rounds', 'nr_estimation_rounds'): [(500, 500), (1000, 1000)],
+                             'VER_tolerance': [1e-8, 1e-10]},
+                     nr_selections = 100)
+    gives 4 points, each with a (10, 100) array of message lengths.
+
+    :param analyse: the analyse function of a protocol, e.g. programs.GHZ_based_untrusted_server.functions.analyse.
+    :param simulation: output of the simulate_rounds function of the same protocol, or of utils.store_data.load_simulation.
+    :param axes: dict mapping the names of the arguments of analyse to the lists of values, see utils.sweep.sweep_grid.
+    :param nr_selections: number of random selections of the rounds per run.
+    :param seed: master seed of the random selections, which use its 'selection' stream (see utils.seeding). Defaults to the seed of the simulation, raises a ValueError if its runs have different seeds.
+    :returns: list of (point, message_lengths, run_times) triples, one per point of the grid.
+    '''
+    if seed is None:
+        seed = simulation_seed(simulation)
+    seed = master_seed(seed)
+
+    results = []
+    for point in sweep_grid(axes):
+        message_lengths, run_times = analyse(simulation, nr_selections = nr_selections, rng = stream_rng(seed, 'selection'), **point)
+        results.append((point, message_lengths, run_times))
+    return results
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class PackedBits:
+    '''
+    Compact container of a sequence of bits, such as the measurement outcomes or bases of a client, stored with 8 bits per byte.
+    The bits are packed with np.packbits (most significant bit first), so a million rounds take 125 kB instead of the 8 MB of a list of ints.
+
+    PackedBits behaves like a read-only sequence of ints: it has a length, can be indexed and iterated over, and np.asarray turns it into a uint8 array of 0s and 1s.
+    '''
+    __slots__ = ('data', 'length')
+
+    def __init__(self, data: np.ndarray = None, length: int = 0):
+        '''
+        :param data: uint8 array with the packed bits, as returned by np.packbits.
+        :param length: number of bits.
+        '''
+        if data is None:
+            data = np.zeros(0, dtype = np.uint8)
+        data = np.asarray(data, dtype = np.uint8)
+        if len(data) != (length + 7)//8:
+            raise ValueError(f"{len(data)} bytes can not hold exactly {length} bits.")
+        self.data = data
+        self.length = length
+
+    @classmethod
+    def from_bits(cls, bits) -> 'PackedBits':
+        '''
+        Pack a sequence of 0s and 1s, e.g. a list of ints or a uint8 array.
+        '''
+        bits = np.asarray(bits, dtype = np.uint8)
+        return cls(np.packbits(bits), len(bits))
+
+    @classmethod
+    def from_int(cls, value: int, length: int) -> 'PackedBits':
+        '''
+        Pack the length least significant bits of value, most significant bit first.
+        This gives the same bits as [int(b) for b in bin(value)[2:].zfill(length)], e.g. for value = getrandbits(length).
+        '''
+        nr_bytes = (length + 7)//8
+        # Align the bits with the start of the first byte
+        data = np.frombuffer((value << (8*nr_bytes - length)).to_bytes(nr_bytes, 'big'), dtype = np.uint8).copy()
+        return cls(data, length)
+
+    @classmethod
+    def concatenate(cls, parts: list) -> 'PackedBits':
+        '''
+        Concatenate several PackedBits into one.
+        '''
+        if all(part.length % 8 == 0 for part in parts[:-1]):
+            return cls(np.concatenate([part.data for part in parts]) if parts else None, sum(part.length for part in parts))
+        return cls.from_bits(np.concatenate([part.unpack() for part in parts]))
+
+    def unpack(self) -> np.ndarray:
+        '''
+        :returns: uint8 array with the bits.
+        '''
+        return np.unpackbits(self.data, count = self.length)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PackedBits.from_bits(self.unpack()[index])
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(f"Bit {index} out of range for {self.length} bits.")
+        return int(self.data[index >> 3] >> (7 - (index & 7))) & 1
+
+    def __iter__(self):
+        return iter(self.unpack().tolist())
+
+    def __array__(self, dtype = None, copy = None):
+        bits = self.unpack()
+        return bits if dtype is None else bits.astype(dtype, copy = False)
+
+    def __xor__(self, other: 'PackedBits') -> 'PackedBits':
+        if len(other) != self.length:
+            raise ValueError(f"Can not XOR {self.length} bits with {len(other)} bits.")
+        return PackedBits(self.data ^ other.data, self.length)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PackedBits):
+            return NotImplemented
+        return self.length == other.length and np.array_equal(self.data, other.data)
+
+    def __getstate__(self):
+        return self.data.tobytes(), self.length
+
+    def __setstate__(self, state):
+        data, self.length = state
+        self.data = np.frombuffer(data, dtype = np.uint8).copy()
+
+    def __repr__(self) -> str:
+        shown = ''.join(str(bit) for bit in self.unpack()[:32])
+        return f"PackedBits({shown}{'...' if self.length > 32 else ''}, length = {self.length})"
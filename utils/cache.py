@@ -0,0 +1,251 @@
+from functools import lru_cache, wraps
+from hashlib import sha256
+from json import dumps
+from os import makedirs, listdir, remove, replace, utime, walk, path as osp
+from pickle import dump, load, HIGHEST_PROTOCOL
+
+import numpy as np
+
+# Root of the repository, and the directories with the code of the simulations. A change to any of their python files changes all keys of the cache
+REPOSITORY_ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+CODE_DIRECTORIES = ['programs', 'utils', 'setup']
+
+# Arguments that only change what is printed during a call, not its result, so they are left out of the key
+UNKEYED_ARGUMENTS = ['progress', 'print_loop_nrs']
+
+
+def _canonical(obj):
+    '''
+    Convert an argument of a protocol function to a JSON serialisable object that only depends on its contents.
+    Pydantic configurations (such as StackNetworkConfig and the link configurations) and objects with a to_dict method (such as RoundPlan) are converted to dicts, numpy scalars and arrays to python numbers and lists.
+    '''
+    if isinstance(obj, dict):
+        return {str(key): _canonical(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(value) for value in obj]
+    if isinstance(obj, (set, frozenset)):
+        return sorted(_canonical(value) for value in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if hasattr(obj, 'to_dict'):
+        return _canonical(obj.to_dict())
+    if hasattr(obj, 'model_dump'):
+        return _canonical(obj.model_dump())
+    if hasattr(obj, 'dict'):
+        return _canonical(obj.dict())
+    if hasattr(obj, '__dict__'):
+        return {'__class__': type(obj).__qualname__, **_canonical(vars(obj))}
+    return repr(obj)
+
+
+@lru_cache
+def code_version(root: str = REPOSITORY_ROOT, directories: tuple = tuple(CODE_DIRECTORIES)) -> str:
+    '''
+    Hash of the source of the simulations: the paths and contents of all python files in the directories of root.
+    It is computed once per process, so changes to the code during a session are only picked up by a new session.
+    '''
+    digest = sha256()
+    for directory in directories:
+        for dirpath, dirnames, filenames in walk(osp.join(root, directory)):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(".py"):
+                    filepath = osp.join(dirpath, filename)
+                    digest.update(osp.relpath(filepath, root).encode())
+                    with open(filepath, 'rb') as fh:
+                        digest.update(sha256(fh.read()).digest())
+    return digest.hexdigest()
+
+
+def cache_key(function, kwargs: dict, code: str = '') -> str:
+    '''
+    Stable hash of a call of function with the keyword arguments kwargs, with version code of the code, see code_version.
+    The function is identified by its module and name, so the key does not change between sessions or processes. The arguments of UNKEYED_ARGUMENTS are ignored.
+    '''
+    kwargs = {name: value for name, value in kwargs.items() if name not in UNKEYED_ARGUMENTS}
+    description = {'function': f"{function.__module__}.{function.__qualname__}", 'kwargs': _canonical(kwargs), 'code': code}
+    return sha256(dumps(description, sort_keys = True).encode()).hexdigest()
+
+
+class ResultCache:
+    '''
+    Persistent on-disk cache of the results of the protocol functions, such as get_number_announced_bits.
+    Every result is stored in its own pickle file, named after the hash of the function and its arguments (including the network configuration and the seed), and of the version of the code of the simulations.
+    Results of an earlier version of the code are therefore never returned; they are evicted once the cache is full.
+    A call without a seed draws a fresh sample every time, so it bypasses the cache: it is never looked up nor stored.
+
+    When the total size of the cache exceeds max_size, the least recently used results are evicted.
+
+    Example:
+        cache = ResultCache("./Results/cache/")
+        message_lengths, run_times = cache.call(GHZ_untrusted_length, nr_clients = 4, network_configuration = network_config, seed = 1)
+    '''
+    def __init__(self, basepath: str = "./Results/cache/", max_size: int = 2**30, code: str = None):
+        '''
+        :param basepath: directory where the results are stored.
+        :param max_size: maximum total size of the stored results in bytes.
+        :param code: version of the code the results belong to. If None, the hash of the source of the simulations, see code_version.
+        '''
+        if max_size <= 0:
+            raise ValueError(f"The maximum size of the cache should be positive, not {max_size}.")
+
+        self.basepath = basepath
+        self.max_size = max_size
+        self.code = code_version() if code is None else code
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+        makedirs(basepath, exist_ok = True)
+
+    @staticmethod
+    def cacheable(kwargs: dict) -> bool:
+        '''
+        Whether a call with the keyword arguments kwargs is reproducible, i.e. has a seed, such that its result can be cached.
+        '''
+        return kwargs.get('seed') is not None
+
+    def _path(self, key: str) -> str:
+        return osp.join(self.basepath, key + ".pickle")
+
+    def _call_path(self, function, kwargs: dict) -> str:
+        return self._path(cache_key(function, kwargs, self.code))
+
+    def get(self, function, kwargs: dict):
+        '''
+        Look up the result of a call in the cache, and count it as a hit or a miss, or as a bypass if the call has no seed.
+        A result that can not be loaded, e.g. a truncated or corrupt file, counts as a miss and is removed.
+        :returns: found, result pair. If the call is not in the cache, result is None.
+        '''
+        if not self.cacheable(kwargs):
+            self.bypasses += 1
+            return False, None
+
+        filepath = self._call_path(function, kwargs)
+        try:
+            with open(filepath, 'rb') as fh:
+                result = load(fh)
+        except FileNotFoundError:
+            self.misses += 1
+            return False, None
+        except Exception:
+            # Unpickling garbage can raise almost any exception, e.g. UnpicklingError, EOFError or ValueError
+            remove(filepath)
+            self.misses += 1
+            return False, None
+
+        # Mark the result as recently used
+        utime(filepath)
+        self.hits += 1
+        return True, result
+
+    def put(self, function, kwargs: dict, result):
+        '''
+        Store the result of a call in the cache, and evict the least recently used other results if the cache is too large. Calls without a seed are not stored.
+        '''
+        if not self.cacheable(kwargs):
+            return
+
+        filepath = self._call_path(function, kwargs)
+
+        # Write to a temporary file first, such that an interrupted write never leaves a corrupt result behind
+        with open(filepath + ".tmp", 'wb') as fh:
+            dump(result, fh, protocol = HIGHEST_PROTOCOL)
+        replace(filepath + ".tmp", filepath)
+
+        self.evict(keep = filepath)
+
+    def call(self, function, refresh: bool = False, **kwargs):
+        '''
+        Call function with kwargs, or return the cached result of an identical earlier call.
+        :param refresh: if True, ignore (and overwrite) the cached result.
+        '''
+        if not self.cacheable(kwargs):
+            self.bypasses += 1
+            return function(**kwargs)
+
+        if not refresh:
+            found, result = self.get(function, kwargs)
+            if found:
+                return result
+        else:
+            self.misses += 1
+
+        result = function(**kwargs)
+        self.put(function, kwargs, result)
+        return result
+
+    def wrap(self, function):
+        '''
+        Wrap function such that all its calls go through the cache. The wrapped function takes the extra keyword argument refresh.
+        Only keyword arguments are supported, which is how the protocol functions are called anyway.
+        '''
+        @wraps(function)
+        def cached_function(refresh: bool = False, **kwargs):
+            return self.call(function, refresh = refresh, **kwargs)
+        return cached_function
+
+    def invalidate(self, function, **kwargs) -> bool:
+        '''
+        Remove the cached result of a call.
+        :returns: whether there was a cached result.
+        '''
+        try:
+            remove(self._call_path(function, kwargs))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _entries(self) -> list:
+        '''
+        :returns: list of (last use, size, filepath) triples of all stored results.
+        '''
+        entries = []
+        for filename in listdir(self.basepath):
+            if filename.endswith(".pickle"):
+                filepath = osp.join(self.basepath, filename)
+                entries.append((osp.getmtime(filepath), osp.getsize(filepath), filepath))
+        return entries
+
+    def evict(self, keep: str = None):
+        '''
+        Remove the least recently used results until the total size is at most max_size.
+        :param keep: path of a result that is never removed, such as the one that was just stored. It still counts towards the total size.
+        '''
+        entries = sorted(self._entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filepath in entries:
+            if total_size <= self.max_size:
+                break
+            if filepath == keep:
+                continue
+            remove(filepath)
+            total_size -= size
+            self.evictions += 1
+
+    def clear(self):
+        '''
+        Remove all stored results.
+        '''
+        for _, _, filepath in self._entries():
+            remove(filepath)
+
+    def stats(self) -> dict:
+        '''
+        :returns: dict with the number of hits, misses, bypasses and evictions of this cache object, and the number and total size of the stored results.
+        '''
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'evictions': self.evictions,
+            'nr_entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Noise parameters of the quantum devices that should all be zero for the closed-form statistics to be exact
+QDEVICE_NOISE_PARAMETERS = ['T1', 'T2', 'single_qubit_gate_depolar_prob', 'two_qubit_gate_depolar_prob']
+
+
+def _get_parameter(cfg, name: str, default = None):
+    '''
+    Get a parameter from a configuration, which can either be a dict or a configuration object from Squidasm.
+    '''
+    if isinstance(cfg, dict):
+        return cfg.get(name, default)
+    return getattr(cfg, name, default)
+
+
+def depolarise_link_parameters(network_configuration) -> tuple:
+    '''
+    Obtain the parameters of the depolarising links in a star network, as created by create_central_server_network.
+    The closed-form sampler assumes that all links are of the 'depolarise' type with the same parameters, and that the quantum devices are noiseless.
+    Throws a ValueError if this is not the case.
+
+    :param network_configuration: StackNetworkConfig object with a network.
+    :returns: fidelity, prob_success, t_cycle triple of the links.
+    '''
+    if not network_configuration:
+        raise ValueError('Please provide a network configuration.')
+
+    parameters = set()
+    for link in network_configuration.links:
+        if link.typ != 'depolarise':
+            raise ValueError(f"The closed-form sampler only supports 'depolarise' links, not '{link.typ}'.")
+        parameters.add((
+            float(_get_parameter(link.cfg, 'fidelity')),
+            float(_get_parameter(link.cfg, 'prob_success')),
+            float(_get_parameter(link.cfg, 't_cycle')),
+        ))
+
+    if len(parameters) != 1:
+        raise ValueError("The closed-form sampler requires all links to have the same configuration.")
+
+    for stack in network_configuration.stacks:
+        for name in QDEVICE_NOISE_PARAMETERS:
+            if _get_parameter(stack.qdevice_cfg, name, 0):
+                raise ValueError(f"The closed-form sampler requires noiseless quantum devices, but {stack.name} has {name} = {_get_parameter(stack.qdevice_cfg, name)}.")
+
+    return parameters.pop()
+
+
+def flip_probability(fidelity: float) -> float:
+    '''
+    Probability that the outcome of a single-qubit measurement on one half of a depolarised EPR pair is flipped.
+    A depolarised EPR pair with fidelity F is the ideal pair where, with total probability 1 - F, one of the X, Y or Z errors has occured on one of the qubits.
+    For every measurement basis, two of these three errors flip the outcome.
+    Since the server only measures its own halves, these errors remain independent errors on the qubits of the clients after the GHZ fusion.
+    '''
+    return 2*(1 - fidelity)/3
+
+
+def sample_ghz_outcomes(rng: np.random.Generator,
+                        nr_rounds: int,
+                        nr_clients: int,
+                        fidelity: float,
+                        bases: np.ndarray = None,
+                        ) -> np.ndarray:
+    '''
+    Sample the corrected measurement outcomes of the clients of a GHZ state distributed over depolarising links.
+    Without noise, the parity of the outcomes of the clients is fixed by the number of Y basis measurements when this number is even: 0 if it is a multiple of 4, and 1 otherwise.
+    When the number of Y basis measurements is odd the outcomes are uniformly random. Any strict subset of the outcomes is always uniformly random.
+    On top of this every outcome is flipped independently with probability flip_probability(fidelity).
+    EPR pairs are covered by nr_clients = 2, where Z basis measurements are equivalent to X basis measurements.
+
+    :param rng: numpy random generator to sample from.
+    :param nr_rounds: number of rounds.
+    :param nr_clients: number of clients sharing the GHZ state.
+    :param fidelity: fidelity of the depolarising links.
+    :param bases: (nr_rounds, nr_clients) array with 0 for X and 1 for Y basis measurements. Defaults to all X basis measurements.
+    :returns: (nr_rounds, nr_clients) uint8 array with the outcomes.
+    '''
+    outcomes = rng.integers(0, 2, size = (nr_rounds, nr_clients), dtype = np.uint8)
+
+    if bases is None:
+        nr_Y = np.zeros(nr_rounds, dtype = np.int64)
+    else:
+        nr_Y = np.asarray(bases, dtype = np.int64).sum(axis = 1)
+
+    # Fix the outcome of the last client such that the parity matches the ideal parity
+    correlated = (nr_Y % 2) == 0
+    ideal_parity = ((nr_Y // 2) % 2).astype(np.uint8)
+    parity_others = np.bitwise_xor.reduce(outcomes[:, :-1], axis = 1)
+    outcomes[correlated, -1] = parity_others[correlated] ^ ideal_parity[correlated]
+
+    # Apply the independent flips of the depolarising noise
+    flips = rng.random(size = (nr_rounds, nr_clients)) < flip_probability(fidelity)
+    outcomes ^= flips.astype(np.uint8)
+
+    return outcomes
+
+
+def sample_generation_time(rng: np.random.Generator,
+                           nr_pairs: int,
+                           prob_success: float,
+                           t_cycle: float,
+                           ) -> float:
+    '''
+    Sample the total time it takes to sequentially generate nr_pairs EPR pairs over depolarising links.
+    Every pair takes a geometrically distributed number of cycles of duration t_cycle, so the total number of cycles is nr_pairs plus the number of failed attempts.
+
+    :returns: the total generation time in ns.
+    '''
+    nr_failures = rng.negative_binomial(nr_pairs, prob_success) if prob_success < 1 else 0
+    return float((nr_pairs + nr_failures)*t_cycle)
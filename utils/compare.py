@@ -0,0 +1,157 @@
+from statistics import NormalDist
+
+import numpy as np
+
+from utils.seeding import master_seed
+
+
+def t_quantile(probability: float, degrees_of_freedom: int) -> float:
+    '''
+    Quantile of Student's t distribution, from scipy if it is installed.
+    Without scipy the quantile of the normal distribution is used, which underestimates the width of the confidence intervals for few runs.
+    '''
+    try:
+        from scipy.stats import t
+    except ImportError:
+        return NormalDist().inv_cdf(probability)
+    return float(t.ppf(probability, degrees_of_freedom))
+
+
+def paired_difference(values, reference, confidence: float = 0.95) -> dict:
+    '''
+    Mean of the paired differences values - reference, with a confidence interval based on the t distribution.
+    The runs of both should be paired, i.e. run i of both used the same random numbers where possible, see compare_variants.
+
+    :param values: list with a value per run, e.g. the message lengths of a variant.
+    :param reference: list with the value of the reference in the same runs.
+    :param confidence: confidence level of the interval.
+    :returns: dict with the 'mean' difference, its 'std_error' and confidence interval 'ci', the 'nr_runs', and the 'variance_reduction': the variance of the differences of independent runs divided by that of the paired runs.
+    '''
+    values = np.asarray(values, dtype = float)
+    reference = np.asarray(reference, dtype = float)
+    if values.shape != reference.shape or values.ndim != 1:
+        raise ValueError(f"The values and the reference should have a value for every run, not shapes {values.shape} and {reference.shape}.")
+    nr_runs = len(values)
+    if nr_runs < 2:
+        raise ValueError('At least 2 runs are needed for a confidence interval.')
+
+    differences = values - reference
+    mean = differences.mean()
+    std_error = differences.std(ddof = 1)/np.sqrt(nr_runs)
+    half_width = t_quantile((1 + confidence)/2, nr_runs - 1)*std_error
+
+    # Without pairing the variance of the difference is the sum of the variances
+    paired_variance = differences.var(ddof = 1)
+    independent_variance = values.var(ddof = 1) + reference.var(ddof = 1)
+    return {'mean': mean,
+            'std_error': std_error,
+            'ci': (mean - half_width, mean + half_width),
+            'nr_runs': nr_runs,
+            'variance_reduction': independent_variance/paired_variance if paired_variance > 0 else np.inf}
+
+
+# Labels of the columns of the message lengths of the EPR-based protocols, which hold a value with a simultaneous and with a subsequent server per run
+SERVER_COLUMNS = ['simultaneous', 'subsequent']
+
+
+def message_length_columns(message_lengths) -> dict:
+    '''
+    Split the message lengths of the runs of a protocol into columns with a single value per run.
+    The EPR-based protocols return a pair per run, see SERVER_COLUMNS, the other protocols a single value per run, which is returned as the column ''.
+
+    :returns: dict mapping the label of every column to a (nr_runs,) array.
+    '''
+    values = np.asarray(message_lengths, dtype = float)
+    if values.ndim == 1:
+        return {'': values}
+    if values.ndim == 2 and values.shape[1] == len(SERVER_COLUMNS):
+        return dict(zip(SERVER_COLUMNS, values.T))
+    raise ValueError(f"The message lengths should have a value, or a value per server, for every run, not shape {values.shape}.")
+
+
+def _paired_columns(columns: dict, reference_columns: dict) -> list:
+    '''
+    Pairs of the labels of the columns of a variant and of the reference that are compared: a single column is compared with every column of the other, otherwise columns with the same label are compared.
+    '''
+    if len(reference_columns) == 1:
+        return [(label, next(iter(reference_columns))) for label in columns]
+    if len(columns) == 1:
+        return [(next(iter(columns)), label) for label in reference_columns]
+    return [(label, label) for label in columns if label in reference_columns]
+
+
+def compare_variants(
+        points: list = None,
+        reference: int = 0,
+        fixed: dict = None,
+        seed: int = None,
+        confidence: float = 0.95,
+        workers: int = 1,
+        cache = None,
+        refresh: bool = False,
+        ) -> list:
+    '''
+    Run several variants of the protocols with common random numbers, and compare their message lengths with those of a reference variant, run by run.
+    All variants get the same master seed, so run i of every variant draws its round plan and its choice of verification and estimation rounds from the same streams (see utils.seeding), as does the closed-form engine for its outcomes.
+    The link noise of netsquid is only aligned as far as the variants run the same simulation: netsquid draws its random numbers in the order of the events, so the noise of variants that schedule different events diverges.
+    As far as the variants line up, e.g. the GHZ-based untrusted protocol with combined or separate parameter estimation, which share the whole simulation, their runs are strongly correlated, and the paired differences have a much smaller variance than the difference of independent runs.
+    The EPR-based protocols give a message length with a simultaneous and with a subsequent server, which are compared as separate columns, see message_length_columns.
+
+    Example:
+        compare_variants(sweep_grid({'protocol': ['GHZ_untrusted_comPE', 'GHZ_untrusted_sepPE']}),
+                         fixed = {'nr_clients': 4, 'nr_rounds': 10000, 'nr_verification_rounds': 500, 'nr_estimation_rounds': 500, 'nr_runtimes': 20},
+                         seed = 1)
+
+    :param points: list of variants, as created by utils.sweep.sweep_grid.
+    :param reference: index in points of the variant to compare the others with.
+    :param fixed: dict with parameters that are the same for all variants, see utils.sweep.run_point. The number of runs should be at least 2.
+    :param seed: master seed shared by all variants. If None, a fresh seed is drawn.
+    :param confidence: confidence level of the intervals.
+    :param workers: number of worker processes, see utils.sweep.run_sweep.
+    :param cache: optional ResultCache from utils.cache. Cached variants were run with the same seed, so they can be paired.
+    :param refresh: if True, ignore (and overwrite) the cached results.
+    :returns: list with a (params, columns, differences) triple per variant, in the order of points. Columns are the message lengths per column, see message_length_columns, and differences maps the label of every column to a (reference label, output of paired_difference) pair with the column of the reference it is compared with, or is None for the reference itself.
+    '''
+    if not points or not 0 <= reference < len(points):
+        raise ValueError(f"Please provide the variants, and the index of one of them as reference, not {reference}.")
+
+    # Imported here, as utils.sweep imports the protocols and thereby netsquid, which the statistics above do not need
+    from utils.sweep import run_sweep
+
+    seed = master_seed(seed)
+    results = run_sweep(points, fixed = dict(fixed or {}, seed = seed), workers = workers, cache = cache, refresh = refresh)
+
+    reference_columns = message_length_columns(results[reference][0])
+    comparison = []
+    for index, (message_lengths, _, params) in enumerate(results):
+        columns = message_length_columns(message_lengths)
+        differences = None
+        if index != reference:
+            differences = {label: (reference_label, paired_difference(columns[label], reference_columns[reference_label], confidence))
+                           for label, reference_label in _paired_columns(columns, reference_columns)}
+        comparison.append((params, columns, differences))
+    return comparison
+
+
+def print_comparison(points: list, comparison: list, reference: int = 0, confidence: float = 0.95):
+    '''
+    Print the output of compare_variants as a table, with the mean message length of every column of every variant and its paired difference with the reference.
+    Columns of the EPR-based protocols are labelled with the server, e.g. EPR_trusted (simultaneous).
+    '''
+    from utils.sweep import point_name
+
+    def column_name(point: dict, label: str) -> str:
+        return point_name(point) + (f" ({label})" if label else '')
+
+    print(f"Paired differences with {point_name(points[reference])}, {100*confidence:.0f}% confidence intervals (seed {comparison[0][0].get('seed')}):")
+    for point, (_, columns, differences) in zip(points, comparison):
+        for label, message_lengths in columns.items():
+            line = f"\t {column_name(point, label):40s} mean {np.mean(message_lengths):12.1f}"
+            if differences is not None and label in differences:
+                reference_label, difference = differences[label]
+                low, high = difference['ci']
+                line += (f"   difference {difference['mean']:+10.1f} [{low:+10.1f}, {high:+10.1f}]"
+                         f"   variance reduction {difference['variance_reduction']:8.1f}x")
+                if reference_label:
+                    line += f"   vs {column_name(points[reference], reference_label)}"
+            print(line)
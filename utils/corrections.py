@@ -0,0 +1,113 @@
+from collections import deque
+
+import numpy as np
+
+from utils.bitarray import PackedBits
+
+
+def encode_corrections(first_round: int, outcomes) -> str:
+    '''
+    Encode the measurement outcomes of the server in a range of consecutive rounds as a single message (frame) to a client.
+    The frame has a header with the round range, followed by the outcomes packed 8 per byte and written in hex, e.g. '16:8:a5' for rounds 16 up to 24.
+
+    :param first_round: round number of the first outcome.
+    :param outcomes: sequence of 0s and 1s, one per round.
+    '''
+    outcomes = PackedBits.from_bits([int(outcome) for outcome in outcomes])
+    return f"{first_round}:{len(outcomes)}:{outcomes.data.tobytes().hex()}"
+
+
+def decode_corrections(message: str) -> tuple:
+    '''
+    Decode a frame created by encode_corrections.
+    :returns: first_round, outcomes pair, with outcomes a uint8 array with the outcome of every round in the frame.
+    '''
+    first_round, nr_rounds, data = message.split(':')
+    return int(first_round), PackedBits(np.frombuffer(bytes.fromhex(data), dtype = np.uint8), int(nr_rounds)).unpack()
+
+
+class CorrectionSender:
+    '''
+    Corrections of the server for a single client, sent in frames of rounds_per_frame consecutive rounds instead of a message per round.
+    '''
+    def __init__(self, csocket, rounds_per_frame: int = 1):
+        '''
+        :param csocket: classical socket to the client.
+        :param rounds_per_frame: number of rounds per frame. Should match the client.
+        '''
+        if rounds_per_frame < 1:
+            raise ValueError(f"The number of rounds per frame should be at least 1, not {rounds_per_frame}.")
+        self.csocket = csocket
+        self.rounds_per_frame = rounds_per_frame
+        self.first_round = 0
+        self.outcomes = []
+
+    def add(self, round_nr: int, outcome: int):
+        '''
+        Add the outcome of the next round, and send the frame once it is full.
+        '''
+        if not self.outcomes:
+            self.first_round = round_nr
+        self.outcomes.append(int(outcome))
+        if len(self.outcomes) == self.rounds_per_frame:
+            self.send()
+
+    def send(self):
+        '''
+        Send the outcomes that were added since the last frame, if any. Call at the end of the run to send the last, partial, frame.
+        '''
+        if self.outcomes:
+            self.csocket.send(encode_corrections(self.first_round, self.outcomes))
+            self.outcomes = []
+
+
+class CorrectionWindow:
+    '''
+    Raw outcomes of a client that still wait for the correction of the server.
+    The client adds its outcomes as soon as they are measured, and only receives corrections when more than window rounds are waiting, so it can measure up to window rounds ahead of the corrections.
+    This way the latency of the classical link overlaps with the generation of the next EPR pairs. With a window of 0 the client waits for the correction of every round before starting the next.
+
+    The server sends the corrections in order, in frames of rounds_per_frame rounds (see CorrectionSender), so they are matched with the oldest waiting outcomes.
+    A frame is only complete once the server finished all its rounds, so the client always measures at least rounds_per_frame - 1 rounds ahead.
+    '''
+    def __init__(self, csocket, window: int = 0, rounds_per_frame: int = 1):
+        '''
+        :param csocket: classical socket to the server.
+        :param window: maximum number of rounds that can wait for their correction.
+        :param rounds_per_frame: number of rounds per frame. Should match the server.
+        '''
+        if window < 0:
+            raise ValueError(f"The correction window should be at least 0, not {window}.")
+        if rounds_per_frame < 1:
+            raise ValueError(f"The number of rounds per frame should be at least 1, not {rounds_per_frame}.")
+        self.csocket = csocket
+        self.window = max(window, rounds_per_frame - 1)
+        self.pending = deque()
+
+    def add(self, round_nr: int, outcome: int):
+        '''
+        Add the raw outcome of a round, to be corrected later.
+        '''
+        self.pending.append((round_nr, int(outcome)))
+
+    def receive(self, max_pending: int = None):
+        '''
+        Receive frames of corrections from the server until at most max_pending rounds are waiting. Use as corrected = yield from window.receive().
+        :param max_pending: defaults to the window. Use 0 at the end of the run, to receive all remaining corrections.
+        :returns: list of (round_nr, outcome, m_server) triples of the rounds that were corrected, in order.
+        '''
+        if max_pending is None:
+            max_pending = self.window
+
+        corrected = []
+        while len(self.pending) > max_pending:
+            # Receive the measurement outcomes from the Server
+            message = yield from self.csocket.recv()
+            first_round, m_servers = decode_corrections(message)
+            expected_round_nr = self.pending[0][0]
+            if first_round != expected_round_nr or len(m_servers) > len(self.pending):
+                raise ValueError(f"Received the corrections of rounds {first_round} up to {first_round + len(m_servers)}, while expecting round {expected_round_nr} and at most {len(self.pending)} rounds.")
+            for m_server in m_servers:
+                round_nr, outcome = self.pending.popleft()
+                corrected.append((round_nr, outcome, int(m_server)))
+        return corrected
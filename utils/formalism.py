@@ -0,0 +1,72 @@
+import netsquid as ns
+
+from utils.closedform import _get_parameter
+
+## The quantum state formalisms of netsquid that can be chosen for a simulation
+FORMALISMS = {
+    'KET': ns.QFormalism.KET,
+    'DM': ns.QFormalism.DM,
+    'STAB': ns.QFormalism.STAB,
+}
+
+# Link types whose states and noise are Pauli mixtures of Bell states, which the stabilizer formalism samples from
+STABILIZER_LINK_TYPES = ['perfect', 'depolarise']
+
+# Noise parameters of the quantum devices that are not Pauli channels (amplitude damping and dephasing in memory)
+NON_PAULI_NOISE_PARAMETERS = ['T1', 'T2']
+
+
+def stabilizer_compatible(network_configuration) -> bool:
+    '''
+    Check whether a network can be simulated in the stabilizer formalism.
+    All programs in this repository only use Clifford operations (H, CNOT, S and Z basis measurements), so this only depends on the noise:
+    the links should deliver Pauli mixtures of Bell states, and the quantum devices should have no memory noise, as depolarising gate noise is a Pauli channel.
+
+    :param network_configuration: StackNetworkConfig object with a network.
+    '''
+    for link in network_configuration.links:
+        if link.typ not in STABILIZER_LINK_TYPES:
+            return False
+
+    for stack in network_configuration.stacks:
+        for name in NON_PAULI_NOISE_PARAMETERS:
+            if _get_parameter(stack.qdevice_cfg, name, 0):
+                return False
+
+    return True
+
+
+def select_formalism(formalism: str = None, network_configuration = None) -> str:
+    '''
+    Resolve the formalism option of the protocol functions to the name of a netsquid formalism.
+    With 'auto' the stabilizer formalism is used whenever the network allows it, since its cost grows polynomially in the number of qubits instead of exponentially. Otherwise netsquid's default KET formalism is used.
+    'auto' is opt-in: stabilizer_compatible only checks the configuration, it does not verify that the states squidasm's links deliver are represented exactly in the stabilizer formalism, so compare with 'KET' before relying on it.
+
+    :param formalism: None, 'auto', or one of the keys of FORMALISMS.
+    :param network_configuration: StackNetworkConfig object with a network. Only used for 'auto' and 'STAB'.
+    :returns: key of FORMALISMS, or None to keep netsquid's current formalism (see set_formalism).
+    '''
+    if formalism is None:
+        return None
+
+    if formalism == 'auto':
+        if network_configuration is not None and stabilizer_compatible(network_configuration):
+            return 'STAB'
+        return 'KET'
+
+    if formalism not in FORMALISMS:
+        raise ValueError(f"Unknown formalism '{formalism}', choose 'auto' or one of {list(FORMALISMS)}.")
+
+    if formalism == 'STAB' and network_configuration is not None and not stabilizer_compatible(network_configuration):
+        raise ValueError("The stabilizer formalism requires 'perfect' or 'depolarise' links, and quantum devices without T1 and T2 noise.")
+
+    return formalism
+
+
+def set_formalism(formalism: str = None):
+    '''
+    Set the quantum state formalism of netsquid. This is a global setting, so every worker process should set it before running a simulation.
+    Leaves the current formalism in place if formalism is None.
+    '''
+    if formalism is not None:
+        ns.set_qstate_formalism(FORMALISMS[formalism])
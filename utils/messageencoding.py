@@ -1,5 +1,7 @@
 from math import log2
 
+import numpy as np
+
 def encode_message_to_bits(message: str, total_bits: int) -> list[int]:
     """Encodes a string into a fixed-length list of bits (0s and 1s)."""
     # Convert string to bytes
@@ -43,6 +45,14 @@ def binary_entropy(p: float) -> float:
     if (p < 0) or (p > 0.5): raise ValueError
     return -p*log2(p) - (1-p)*log2(1-p)
 
+def binary_entropy_array(p: np.ndarray) -> np.ndarray:
+    """Vectorised binary_entropy. Where binary_entropy throws an exception (which includes p = 0, as log2(0) is not defined) the result is nan."""
+    p = np.asarray(p, dtype = float)
+    valid = (p > 0) & (p <= 0.5)
+    # Evaluate on a safe value where p is not valid, and mask those afterwards
+    q = np.where(valid, p, 0.25)
+    return np.where(valid, -q*np.log2(q) - (1-q)*np.log2(1-q), np.nan)
+
 def calculate_statistical_correction(nr_total_rounds: int, nr_est_rounds: int, tolerance: float):
     '''
     Calculate the statistical error for the Z or X basis that arises from parameter estimation.
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from importlib.metadata import version, PackageNotFoundError
+from inspect import signature
+
+from netqasm.qlink_compat import EPRRole
+from netqasm.sdk.builder import EntRequestParams
+
+# Version of netqasm the tools below were written and tested against. loop_epr_keep builds on a method of netqasm's Builder that is not part of the documented SDK, which can change between versions
+NETQASM_VERSION = '2.3'
+
+
+@lru_cache
+def _has_builder_method(builder_class: type, method: str, parameter: str = None) -> bool:
+    if not callable(getattr(builder_class, method, None)):
+        return False
+    return parameter is None or parameter in signature(getattr(builder_class, method)).parameters
+
+
+def installed_netqasm_version() -> str:
+    '''
+    Version of the installed netqasm, or None if it is not installed as a package, e.g. when it is imported from a checkout.
+    '''
+    try:
+        return version('netqasm')
+    except PackageNotFoundError:
+        return None
+
+
+def require_netqasm_version(feature: str = None):
+    '''
+    Check that the installed netqasm has the major and minor version of NETQASM_VERSION.
+    :param feature: name of the tool that needs it, for the error message.
+    '''
+    installed = installed_netqasm_version()
+    if installed is not None and installed.split('.')[:2] != NETQASM_VERSION.split('.'):
+        raise RuntimeError(f"{feature or 'This tool'} is pinned to netqasm {NETQASM_VERSION}, but netqasm {installed} is installed.")
+
+
+def require_builder_method(builder, method: str, parameter: str = None, feature: str = None):
+    '''
+    Check that the netqasm builder of a connection has a method, and optionally that it takes a parameter.
+    The tools below build on methods of netqasm's Builder that are not part of the documented SDK, so they raise a clear error on a version of netqasm without them, instead of building wrong subroutines.
+
+    :param builder: the builder of a connection, i.e. connection.builder.
+    :param feature: name of the tool that needs the method, for the error message.
+    '''
+    if not _has_builder_method(type(builder), method, parameter):
+        needed = f"Builder.{method}" + (f" with parameter {parameter}" if parameter else '')
+        raise RuntimeError(f"{feature or 'This tool'} needs {needed}, which netqasm {installed_netqasm_version() or 'unknown'} does not provide. It was written against netqasm {NETQASM_VERSION}.")
+
+
+def loop_epr_keep(epr_socket, create: bool = True):
+    '''
+    Create (or receive) and keep a single EPR pair inside a connection.loop context, i.e. the equivalent of epr_socket.create_keep()[0] or epr_socket.recv_keep()[0].
+    The instructions of a loop body are compiled once, so every iteration writes the results of its EPR pair into the same results array. create_keep only waits until that array is filled, so from the second iteration on it would not wait for the new pair.
+    This resets the results array before every request, like netqasm itself does for requests with a fidelity constraint.
+
+    :param epr_socket: EPR socket to the other node.
+    :param create: whether to create the pair, or to receive it.
+    :returns: the qubit of the EPR pair.
+    '''
+    require_netqasm_version(feature = 'loop_epr_keep')
+    builder = epr_socket.conn.builder
+    require_builder_method(builder, 'sdk_epr_keep', 'reset_results_array', feature = 'loop_epr_keep')
+
+    params = EntRequestParams(
+        remote_node_id = epr_socket.remote_node_id,
+        epr_socket_id = epr_socket.epr_socket_id,
+        number = 1,
+        post_routine = None,
+        sequential = False,
+    )
+    qubits, _ = builder.sdk_epr_keep(role = EPRRole.CREATE if create else EPRRole.RECV, params = params, reset_results_array = True)
+    return qubits[0]
@@ -0,0 +1,31 @@
+"""
+Options that the simulate_rounds and get_number_announced_bits functions of all four protocols in programs/ share.
+They are described here once; the docstrings of the protocol functions only describe the parameters of the protocol itself.
+
+Options of the simulation:
+    print_loop_nrs:         (default False) Print the progress of the rounds, with a default Progress from utils.progress if no progress is given.
+    progress:               (default None) Progress from utils.progress, which reports the rounds done, the simulated and wall time and the ETA, combined over all workers. Get's passed to the server program.
+    rounds_per_flush:       (default 1) GHZ based protocols only. Number of rounds the server and clients queue before flushing to the QNPU. Get's passed to all programs.
+    defer_corrections:      (default False) Whether the server returns its corrections at the end of the run instead of sending them every round. Get's passed to all programs.
+    sequential_fusion:      (default False) GHZ based protocols only. Whether the server fuses every EPR pair into the GHZ state right after generating it, instead of first generating the EPR pairs with all clients. The server then needs 2 qubits instead of nr_clients. Get's passed to the server program.
+    loop_rounds:            (default False) GHZ based protocols only. Whether the server and clients compile the rounds_per_flush rounds of a batch into a single NetQASM loop, instead of repeating the instructions of a round rounds_per_flush times. Get's passed to all programs.
+    correction_window:      (default 0) Number of rounds the clients can measure ahead of the corrections of the server, such that the classical latency overlaps with the generation of the next EPR pairs. Get's passed to the client programs.
+    rounds_per_frame:       (default 1) Number of rounds of which the server sends the corrections to a client in a single message, bit-packed with a header with the round range. The clients then measure at least rounds_per_frame - 1 rounds ahead of the corrections. Get's passed to all programs.
+    instrument:             (default False) Record the wall time, simulated time and netsquid events of every phase of the programs, such as building the subroutines, flushing them and waiting for the corrections, see utils.timing. get_number_announced_bits also records the simulation and the post-processing as a whole, and returns the metrics as a third value. Get's passed to all programs.
+    trace:                  (default False) simulate_rounds only. Keep a span of every phase of the programs, such that the timeline of a run can be written with utils.tracing.write_chrome_trace. Get's passed to all programs.
+    trace_path:             (default None) get_number_announced_bits only. If given, write the timeline of the first run, with a track per node and the simulation and analysis as a whole, to this Chrome trace JSON file, see utils.tracing.
+    engine:                 (default 'squidasm') Simulation engine. Either 'squidasm' to simulate the network, or 'closed_form' to sample the outcomes directly; the latter requires depolarising links and noiseless devices.
+    workers:                (default 1) Number of worker processes to spread the repetitions of the simulation over.
+    seed:                   (default None) Master seed of the simulation, from which independent seeds are derived for every run and chunk of netsquid, the round plan, the closed-form engine and the choice of the verification and estimation rounds, see utils.seeding. If None, a fresh seed is drawn. The seed is returned with the results, so that seeded runs can be replayed exactly.
+    nr_chunks:              (default 1) Number of chunks to split the rounds over. Every chunk is simulated independently, on the pool of workers, and the results are merged before the post-processing.
+    formalism:              (default None) Quantum state formalism of netsquid: 'KET', 'DM' or 'STAB', or None to keep netsquid's current formalism (KET, unless it was set otherwise). With 'auto' the stabilizer formalism is used whenever the noise of the network allows it, see utils.formalism.
+    cache:                  (default None) get_number_announced_bits only. ResultCache from utils.cache. An identical earlier call with the same seed is taken from the cache instead of simulated again. Calls without a seed, or with a trace_path, always run.
+    refresh:                (default False) get_number_announced_bits only. Run the simulation even if the call is in the cache, and overwrite the cached result.
+
+Keys of the output of simulate_rounds that all protocols share, next to the outcomes of the protocol itself:
+    simulation_times:       (nr_runs,) array with the simulated time of every run.
+    seed:                   The master seed of the simulation.
+    round_durations:        squidasm engine only. (nr_runs, nr_rounds) array with the simulated time of every round.
+    phases:                 With instrument only. Dict mapping every node to a list with the metrics of its phases in every run, see utils.timing.PhaseTimer.metrics.
+    trace:                  With trace only. Dict mapping every node to a list with its spans in every run.
+"""
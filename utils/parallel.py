@@ -0,0 +1,171 @@
+from concurrent.futures import ProcessPoolExecutor
+import random
+
+import numpy as np
+import netsquid as ns
+
+from squidasm.squidasm.run.stack.run import run
+
+from utils.bitarray import PackedBits
+from utils.formalism import set_formalism
+from utils.seeding import master_seed, run_seeds
+
+
+def split_evenly(total: int, nr_parts: int) -> list:
+    '''
+    Split total into nr_parts non-negative integers that differ by at most one, the larger ones first.
+    '''
+    return [total // nr_parts + (1 if part < total % nr_parts else 0) for part in range(nr_parts)]
+
+
+def run_seeded(config, programs: dict, seeds: list, formalism: str = None) -> list:
+    '''
+    Run the programs with squidasm's run once for every seed, after seeding netsquid and the random module with it, and setting the quantum state formalism if one is given (see utils.formalism).
+    Every run has its own seed, so a run can be replayed exactly, independent of the other runs and of how the runs are spread over the workers.
+    This is the function executed by every worker of the process pool.
+
+    :param seeds: list with the seed of every run, see utils.seeding.run_seeds.
+    :returns: the output of squidasm's run for all runs, see merge_repetitions.
+    '''
+    set_formalism(formalism)
+
+    outs = []
+    for seed in seeds:
+        ns.set_random_state(seed = seed)
+        random.seed(seed)
+        outs.append(run(config = config, programs = programs, num_times = 1))
+    return merge_repetitions(outs)
+
+
+def merge_repetitions(outs: list) -> list:
+    '''
+    Merge the outputs of several calls of squidasm's run into one, as if all repetitions were run in a single call.
+    The output of run holds, for every node, a list with a result dict per repetition. These lists are concatenated in order.
+    '''
+    return [sum((out[node_nr] for out in outs), []) for node_nr in range(len(outs[0]))]
+
+
+def run_repetitions(config, programs: dict, num_times: int = 1, workers: int = 1, seed: int = None, formalism: str = None) -> list:
+    '''
+    Run the programs num_times times, spreading the repetitions over a pool of worker processes.
+    Every repetition gets its own seed, derived from seed, so the output does not depend on the number of workers. The results are merged back in order, so the output has the same layout as squidasm's run.
+    With a single worker (the default) everything runs in the current process.
+
+    :param config: StackNetworkConfig object with a network.
+    :param programs: dict mapping the node names to the programs to run on them.
+    :param num_times: total number of repetitions.
+    :param workers: number of worker processes.
+    :param seed: master seed from which the seeds of the repetitions are derived, see utils.seeding. If None, a fresh master seed is drawn.
+    :param formalism: quantum state formalism that every worker sets before running, a key of utils.formalism.FORMALISMS. If None, netsquid's current formalism is used.
+    :returns: list with for every node a list of result dicts, one per repetition.
+    '''
+    if workers < 1:
+        raise ValueError('The number of workers should be at least 1.')
+
+    seeds = run_seeds(master_seed(seed), num_times)
+
+    if workers == 1:
+        return run_seeded(config, programs, seeds, formalism = formalism)
+
+    # Never start more workers than there are repetitions. Every worker gets a consecutive part of the seeds, such that the output is in order
+    repetitions_per_worker = [n for n in split_evenly(num_times, workers) if n > 0]
+    starts = np.cumsum([0] + repetitions_per_worker)
+
+    with ProcessPoolExecutor(max_workers = len(repetitions_per_worker)) as executor:
+        futures = [executor.submit(run_seeded, config, programs, seeds[start:start + n], formalism) for start, n in zip(starts, repetitions_per_worker)]
+        outs = [future.result() for future in futures]
+
+    return merge_repetitions(outs)
+
+
+def _merge_chunk_values(values: list):
+    '''
+    Merge the values of a single result key of consecutive chunks of rounds.
+    Numbers (such as the simulation time) are summed, per-round PackedBits, lists and arrays are concatenated, and lists of per-round results (such as the corrections per client) are concatenated element-wise.
+    Dicts (such as the metrics of the phases, see utils.timing) are merged key by key.
+    '''
+    first = values[0]
+    if isinstance(first, dict):
+        keys = list(dict.fromkeys(key for value in values for key in value))
+        return {key: _merge_chunk_values([value[key] for value in values if key in value]) for key in keys}
+    if isinstance(first, PackedBits):
+        return PackedBits.concatenate(values)
+    if isinstance(first, np.ndarray):
+        return np.concatenate(values)
+    if isinstance(first, list):
+        if len(first) > 0 and isinstance(first[0], (list, np.ndarray, PackedBits)):
+            return [_merge_chunk_values([value[i] for value in values]) for i in range(len(first))]
+        return sum(values, [])
+    return sum(values)
+
+
+def _offset_spans(spans: list, offset: float) -> list:
+    '''
+    Shift the simulated time of the (name, start, end) spans of a trace (see utils.timing) by offset ns.
+    '''
+    def shift(read):
+        wall_time, sim_time, events = read
+        return (wall_time, sim_time + offset if sim_time is not None else None, events)
+    return [(name, shift(start), shift(end)) for name, start, end in spans]
+
+
+def _offset_chunk_traces(outs: list) -> list:
+    '''
+    Shift the 'trace' spans of every chunk of rounds by the summed simulation time of the chunks before it in the same repetition, since every chunk starts again at simulated time 0.
+    The simulation time of a chunk is the largest one reported by its nodes.
+    '''
+    offsets = [0]*len(outs[0][0])
+    shifted = []
+    for out in outs:
+        shifted.append([[dict(results, trace = _offset_spans(results['trace'], offsets[run_nr])) if 'trace' in results else results
+                         for run_nr, results in enumerate(node_results)]
+                        for node_results in out])
+        offsets = [offset + max(node_results[run_nr].get('simulation_time', 0) for node_results in out) for run_nr, offset in enumerate(offsets)]
+    return shifted
+
+
+def merge_round_chunks(outs: list) -> list:
+    '''
+    Merge the outputs of squidasm's run for consecutive chunks of rounds into the output of a single long simulation.
+    For every node and repetition the result dicts of the chunks are merged key by key: per-round results are concatenated in chunk order, and the simulation times are summed.
+    The spans of a 'trace' are shifted such that every chunk continues in simulated time where the chunk before it ended.
+    '''
+    outs = _offset_chunk_traces(outs)
+    return [
+        [{key: _merge_chunk_values([out[node_nr][run_nr][key] for out in outs]) for key in outs[0][node_nr][run_nr]}
+         for run_nr in range(len(outs[0][node_nr]))]
+        for node_nr in range(len(outs[0]))
+    ]
+
+
+def run_round_chunks(config, programs_per_chunk: list, num_times: int = 1, workers: int = 1, seed: int = None, formalism: str = None) -> list:
+    '''
+    Run a simulation whose rounds are split over several chunks, every chunk being an independent simulation with its own seed.
+    Since the rounds are independent given the network configuration, the merged output is equivalent to that of a single simulation of all rounds.
+    The chunks are spread over a pool of worker processes. With a single chunk, this is just run_repetitions.
+
+    :param config: StackNetworkConfig object with a network.
+    :param programs_per_chunk: list with for every chunk the dict mapping the node names to the programs to run on them.
+    :param num_times: number of repetitions of every chunk.
+    :param workers: number of worker processes.
+    :param seed: master seed from which the seeds of the runs of every chunk are derived, see utils.seeding. If None, a fresh master seed is drawn.
+    :param formalism: quantum state formalism of the simulation, see run_repetitions.
+    :returns: list with for every node a list of result dicts, one per repetition, with the chunks merged by merge_round_chunks.
+    '''
+    if len(programs_per_chunk) == 1:
+        return run_repetitions(config, programs_per_chunk[0], num_times = num_times, workers = workers, seed = seed, formalism = formalism)
+
+    if workers < 1:
+        raise ValueError('The number of workers should be at least 1.')
+
+    seed = master_seed(seed)
+    seeds = [run_seeds(seed, num_times, chunk_nr) for chunk_nr in range(len(programs_per_chunk))]
+
+    if workers == 1:
+        outs = [run_seeded(config, programs, chunk_seeds, formalism) for programs, chunk_seeds in zip(programs_per_chunk, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers = min(workers, len(programs_per_chunk))) as executor:
+            futures = [executor.submit(run_seeded, config, programs, chunk_seeds, formalism) for programs, chunk_seeds in zip(programs_per_chunk, seeds)]
+            outs = [future.result() for future in futures]
+
+    return merge_round_chunks(outs)
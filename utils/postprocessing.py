@@ -0,0 +1,67 @@
+import numpy as np
+
+from utils.bitarray import PackedBits
+
+
+def _unpack(values) -> np.ndarray:
+    '''
+    Per-round results as a uint8 array.
+    '''
+    if isinstance(values, PackedBits):
+        return values.unpack()
+    return np.asarray(values, dtype = np.uint8)
+
+
+def stack_client_results(out: list, key: str, nr_clients: int, nr_runs: int) -> np.ndarray:
+    '''
+    Stack the per-round results of the clients into a single array.
+    The output of squidasm's run holds, for every node, a list with a result dict per run. The Server is the first node, followed by the clients.
+
+    :param out: output of squidasm's run (or of a sampler with the same layout).
+    :param key: key of the per-round result in the client result dicts, e.g. 'outcomes' or 'bases'. The results can be PackedBits, lists or arrays.
+    :param nr_clients: number of clients to stack.
+    :param nr_runs: number of runs to stack.
+    :returns: (nr_runs, nr_rounds, nr_clients) uint8 array.
+    '''
+    return np.stack([
+        np.stack([_unpack(out[i+1][run_nr][key]) for i in range(nr_clients)], axis = -1)
+        for run_nr in range(nr_runs)
+    ])
+
+
+def parities(outcomes: np.ndarray) -> np.ndarray:
+    '''
+    Parity of the outcomes of all clients, i.e. the XOR over the last (client) axis.
+    '''
+    return np.bitwise_xor.reduce(outcomes, axis = -1)
+
+
+def sample_selections(rng: np.random.Generator, nr_rounds: int, size: int, nr_selections: int = 1) -> np.ndarray:
+    '''
+    Sample nr_selections independent random selections of size distinct rounds out of nr_rounds, e.g. to choose the verification and estimation rounds.
+    The rounds of every selection are in random order, so the first k of them are again a uniformly random selection of k rounds.
+
+    :returns: (nr_selections, size) int64 array with the selected rounds.
+    '''
+    if size > nr_rounds:
+        raise ValueError(f"Can not select {size} out of {nr_rounds} rounds.")
+    selections = np.empty((nr_selections, size), dtype = np.int64)
+    for selection_nr in range(nr_selections):
+        selections[selection_nr] = rng.choice(nr_rounds, size = size, replace = False)
+    return selections
+
+
+def ghz_basis_errors(outcomes: np.ndarray, bases: np.ndarray) -> tuple:
+    '''
+    Determine the errors of GHZ rounds where every client measured in the X (0) or Y (1) basis.
+    If the number of Y measurements is 0 mod 4 the parity of the outcomes should be 0, if it is 2 mod 4 it should be 1.
+    Rounds with an odd number of Y measurements can not be used.
+
+    :param outcomes: (..., nr_clients) array of outcomes.
+    :param bases: (..., nr_clients) array of bases, of the same shape as outcomes.
+    :returns: errors, valid pair of bool arrays with the shape of outcomes without the client axis. An error is only meaningful where valid is True.
+    '''
+    bases_sum = bases.sum(axis = -1, dtype = np.int64) % 4
+    valid = (bases_sum == 0) | (bases_sum == 2)
+    errors = (parities(outcomes) == 1) ^ (bases_sum == 2)
+    return errors, valid
@@ -0,0 +1,177 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing import Manager
+from threading import Thread
+from time import perf_counter
+
+
+class ProgressState(namedtuple('ProgressState', ['rounds_done', 'total_rounds', 'sim_time', 'wall_time'])):
+    '''
+    Snapshot of the progress of a simulation: the number of rounds done out of the total_rounds that are expected, the simulated time in ns and the wall time in s, summed over all runs and workers.
+    '''
+    __slots__ = ()
+
+    @property
+    def fraction(self) -> float:
+        '''
+        Fraction of the expected rounds that is done, or None if no rounds are expected.
+        '''
+        return self.rounds_done/self.total_rounds if self.total_rounds else None
+
+    @property
+    def eta(self) -> float:
+        '''
+        Estimated wall time in s until all expected rounds are done, at the average rate so far, or None if it can not be estimated yet.
+        '''
+        if not self.rounds_done or not self.total_rounds:
+            return None
+        return max(self.total_rounds - self.rounds_done, 0)*self.wall_time/self.rounds_done
+
+
+def print_progress(state: ProgressState):
+    '''
+    Default callback of Progress, printing a single line per report.
+    '''
+    line = f"\t {state.rounds_done}/{state.total_rounds} rounds"
+    if state.fraction is not None:
+        line += f" ({100*state.fraction:.0f}%)"
+    line += f", {state.sim_time*1e-9:.3g} s simulated, {state.wall_time:.1f} s elapsed"
+    if state.eta is not None:
+        line += f", ETA {state.eta:.0f} s"
+    print(line)
+
+
+class Progress:
+    '''
+    Throttled report of the progress of the rounds of a simulation.
+    The server program calls advance after every round (or batch of rounds), which only counts, and at most once per interval seconds the callback is called with a ProgressState.
+    The clock is only read every so many rounds, estimated from the rate so far, so the cost per round is a counter increment and a comparison. Programs without a Progress (the default) skip the reporting altogether.
+
+    A Progress can be shared with worker processes through forward (see below), which combines the reports of all workers into this one, so there is a single display with a single ETA.
+
+    Example:
+        progress = Progress()
+        simulate_rounds(nr_rounds = 10000, nr_runtimes = 10, workers = 4, progress = progress)
+    '''
+    def __init__(self, callback = print_progress, interval: float = 1.0, queue = None):
+        '''
+        :param callback: function called with a ProgressState on every report.
+        :param interval: minimum wall time in s between two reports.
+        :param queue: queue of the worker processes to forward the progress to, instead of calling the callback. Set by forward.
+        '''
+        if interval < 0:
+            raise ValueError(f"The interval should be at least 0, not {interval}.")
+        self.callback = callback
+        self.interval = interval
+        self.queue = queue
+
+        self.rounds_done = 0
+        self.total_rounds = 0
+        self.sim_time = 0.
+        self.start_time = perf_counter()
+
+        # Simulated time of the current run, since netsquid starts every run at 0
+        self._run_sim_time = 0.
+        # Progress that is not forwarded yet
+        self._unsent = [0, 0., 0]
+        self._last_report = self.start_time
+        self._next_check = 1
+
+    def expect(self, nr_rounds: int):
+        '''
+        Add nr_rounds to the total number of rounds that is expected, e.g. nr_rounds*nr_runtimes at the start of a simulation.
+        '''
+        self.total_rounds += nr_rounds
+        self._unsent[2] += nr_rounds
+
+    def start(self):
+        '''
+        Mark the start of a run, in which the simulated time starts again at 0.
+        '''
+        self._run_sim_time = 0.
+
+    def advance(self, nr_rounds: int = 1, sim_time: float = None):
+        '''
+        Count nr_rounds rounds that are done, and report if the interval has passed.
+        :param sim_time: simulated time in ns since the start of the run, e.g. ns.sim_time().
+        '''
+        self.rounds_done += nr_rounds
+        self._unsent[0] += nr_rounds
+        if sim_time is not None:
+            self._unsent[1] += sim_time - self._run_sim_time
+            self.sim_time += sim_time - self._run_sim_time
+            self._run_sim_time = sim_time
+        if self.rounds_done >= self._next_check:
+            self._check()
+
+    def finish(self):
+        '''
+        Mark the end of a run. A forwarding Progress sends what it has not sent yet, such that the total is complete once all runs finished.
+        '''
+        if self.queue is not None:
+            self.report()
+
+    def __setstate__(self, state: dict):
+        # A copy in a worker process measures its rate with its own clock
+        self.__dict__.update(state)
+        self.start_time = self._last_report = perf_counter()
+        self._next_check = self.rounds_done + 1
+
+    def _check(self):
+        now = perf_counter()
+        if now - self._last_report >= self.interval:
+            self.report()
+            self._last_report = now
+        # Read the clock again after about a tenth of an interval, at the rate so far
+        rate = self.rounds_done/max(now - self.start_time, 1e-9)
+        self._next_check = self.rounds_done + max(1, int(rate*self.interval/10))
+
+    def state(self) -> ProgressState:
+        return ProgressState(self.rounds_done, self.total_rounds, self.sim_time, perf_counter() - self.start_time)
+
+    def report(self):
+        '''
+        Call the callback with the current state, or forward the progress since the last report to the Progress of the main process.
+        '''
+        if self.queue is not None:
+            if any(self._unsent):
+                self.queue.put(tuple(self._unsent))
+                self._unsent = [0, 0., 0]
+        elif self.callback is not None:
+            self.callback(self.state())
+
+    def _receive(self, queue):
+        '''
+        Add the progress forwarded by the workers, until None is received.
+        '''
+        for message in iter(queue.get, None):
+            rounds_done, sim_time, total_rounds = message
+            self.total_rounds += total_rounds
+            self.sim_time += sim_time
+            self.advance(rounds_done)
+
+
+@contextmanager
+def forward(progress: Progress = None, workers: int = 1):
+    '''
+    Context that yields a Progress to pass to programs that run on a pool of worker processes, and that combines their progress into the given one.
+    A background thread receives the progress of the workers through a managed queue. Without a progress, with a single worker, or if the progress already forwards, the progress is used as is.
+
+    Example:
+        with forward(progress, workers) as shared:
+            programs = setup_programs(..., progress = shared)
+            run_repetitions(config, programs, num_times = 10, workers = workers)
+    '''
+    if progress is None or workers == 1 or progress.queue is not None:
+        yield progress
+        return
+
+    with Manager() as manager:
+        queue = manager.Queue()
+        receiver = Thread(target = progress._receive, args = (queue,), daemon = True)
+        receiver.start()
+        try:
+            yield Progress(callback = None, interval = progress.interval, queue = queue)
+        finally:
+            queue.put(None)
+            receiver.join()
@@ -0,0 +1,121 @@
+import numpy as np
+
+from utils.bitarray import PackedBits
+from utils.seeding import master_seed, stream_rng
+
+
+class RoundPlan:
+    '''
+    Precomputed plan of the rounds of a protocol: the type of every round (keygeneration or verification) and the measurement basis of every client in every round, drawn from a seed.
+    The plan is generated once, vectorised, and shared read-only between the server, the clients and the post-processing, so a program looks up a round by indexing an array instead of testing membership of a set.
+    The same plan can be reused for repeated runs, and it is serialisable with to_dict, or with pickle.
+
+    Round types are KEYGEN (0) or VERIFICATION (1). Bases are 0 or 1, e.g. X or Y in the GHZ-based untrusted protocol; protocols with a fixed basis use all 0s.
+    '''
+    __slots__ = ('round_types', 'bases', 'seed')
+
+    KEYGEN = 0
+    VERIFICATION = 1
+
+    def __init__(self, round_types: np.ndarray = None, bases: np.ndarray = None, seed: int = None):
+        '''
+        :param round_types: (nr_rounds,) uint8 array with the type of every round.
+        :param bases: (nr_rounds, nr_clients) uint8 array with the basis of every client in every round.
+        :param seed: seed the plan was generated from, if any.
+        '''
+        round_types = np.array(round_types, dtype = np.uint8)
+        bases = np.array(bases, dtype = np.uint8)
+        if round_types.ndim != 1 or bases.ndim != 2 or len(bases) != len(round_types):
+            raise ValueError(f"The round types should have shape (nr_rounds,) and the bases (nr_rounds, nr_clients), not {round_types.shape} and {bases.shape}.")
+        # Read-only, such that the programs can share the arrays
+        round_types.flags.writeable = False
+        bases.flags.writeable = False
+        self.round_types = round_types
+        self.bases = bases
+        self.seed = seed
+
+    @classmethod
+    def generate(cls, nr_rounds: int, nr_clients: int, nr_verification_rounds: int = 0, random_bases: bool = False, seed: int = None) -> 'RoundPlan':
+        '''
+        Draw a plan with nr_verification_rounds verification rounds at uniformly random positions, and optionally uniformly random bases.
+        :param seed: master seed of the experiment, the plan uses its 'round_plan' stream (see utils.seeding). If None, a seed is drawn from fresh entropy, such that the plan can always be regenerated from its seed.
+        '''
+        if not 0 <= nr_verification_rounds <= nr_rounds:
+            raise ValueError(f"The number of verification rounds should be between 0 and the number of rounds, not {nr_verification_rounds}.")
+        seed = master_seed(seed)
+        rng = stream_rng(seed, 'round_plan')
+
+        round_types = np.full(nr_rounds, cls.KEYGEN, dtype = np.uint8)
+        round_types[rng.choice(nr_rounds, size = nr_verification_rounds, replace = False)] = cls.VERIFICATION
+        if random_bases:
+            bases = rng.integers(0, 2, size = (nr_rounds, nr_clients), dtype = np.uint8)
+        else:
+            bases = np.zeros((nr_rounds, nr_clients), dtype = np.uint8)
+        return cls(round_types, bases, seed)
+
+    @property
+    def nr_rounds(self) -> int:
+        return len(self.round_types)
+
+    @property
+    def nr_clients(self) -> int:
+        return self.bases.shape[1]
+
+    def verification_rounds(self) -> np.ndarray:
+        '''
+        :returns: sorted array of the numbers of the verification rounds.
+        '''
+        return np.flatnonzero(self.round_types == self.VERIFICATION)
+
+    def keygen_rounds(self) -> np.ndarray:
+        '''
+        :returns: sorted array of the numbers of the keygeneration rounds.
+        '''
+        return np.flatnonzero(self.round_types == self.KEYGEN)
+
+    def client_bases(self, client_nr: int) -> np.ndarray:
+        '''
+        :returns: (nr_rounds,) array with the bases of a client.
+        '''
+        return self.bases[:, client_nr]
+
+    def chunk(self, start: int, stop: int) -> 'RoundPlan':
+        '''
+        :returns: the plan of rounds start up to stop, numbered from 0, e.g. for a chunk of the rounds that is simulated separately.
+        '''
+        return RoundPlan(self.round_types[start:stop], self.bases[start:stop], self.seed)
+
+    def to_dict(self) -> dict:
+        '''
+        :returns: JSON serialisable dict with the plan, with the round types and bases packed and written in hex.
+        '''
+        return {'seed': self.seed,
+                'nr_rounds': self.nr_rounds,
+                'nr_clients': self.nr_clients,
+                'round_types': PackedBits.from_bits(self.round_types).data.tobytes().hex(),
+                'bases': PackedBits.from_bits(self.bases.ravel()).data.tobytes().hex()}
+
+    @classmethod
+    def from_dict(cls, plan: dict) -> 'RoundPlan':
+        '''
+        Inverse of to_dict.
+        '''
+        nr_rounds, nr_clients = plan['nr_rounds'], plan['nr_clients']
+        round_types = PackedBits(np.frombuffer(bytes.fromhex(plan['round_types']), dtype = np.uint8), nr_rounds).unpack()
+        bases = PackedBits(np.frombuffer(bytes.fromhex(plan['bases']), dtype = np.uint8), nr_rounds*nr_clients).unpack().reshape(nr_rounds, nr_clients)
+        return cls(round_types, bases, plan['seed'])
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        plan = RoundPlan.from_dict(state)
+        self.round_types, self.bases, self.seed = plan.round_types, plan.bases, plan.seed
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, RoundPlan):
+            return NotImplemented
+        return self.seed == other.seed and np.array_equal(self.round_types, other.round_types) and np.array_equal(self.bases, other.bases)
+
+    def __repr__(self) -> str:
+        return f"RoundPlan(nr_rounds = {self.nr_rounds}, nr_clients = {self.nr_clients}, nr_verification_rounds = {len(self.verification_rounds())}, seed = {self.seed})"
@@ -0,0 +1,75 @@
+import numpy as np
+
+# Independent random streams of an experiment, split off from its master seed. The number of a stream is the first element of the spawn key of its seed sequences
+STREAMS = {
+    # The simulation itself, i.e. netsquid and the random module, with a seed per chunk of rounds and per run
+    'netsquid': 0,
+    # The round types and bases of the round plan, see utils.roundplan
+    'round_plan': 1,
+    # The random choice of the estimation rounds in the analysis
+    'selection': 2,
+    # The outcomes sampled by the closed-form engine
+    'closed_form': 3,
+}
+
+
+def master_seed(seed: int = None) -> int:
+    '''
+    The master seed of an experiment, from which the seeds of all its random streams are derived.
+    :param seed: seed given by the user. If None, a seed is drawn from fresh entropy of the operating system, such that it can still be recorded with the results and the experiment replayed.
+    :returns: the master seed.
+    '''
+    if seed is None:
+        return int(np.random.SeedSequence().generate_state(1, dtype = np.uint32)[0])
+    return int(seed)
+
+
+def simulation_seed(simulation: dict) -> int:
+    '''
+    The master seed of a simulation, or None if it has none.
+    A simulation loaded with utils.store_data.load_simulation holds the seed of every run, which should all be the same.
+    '''
+    if simulation.get('seed') is None:
+        return None
+    seeds = np.unique(simulation['seed'])
+    if len(seeds) != 1:
+        raise ValueError(f"The runs of the simulation have different master seeds {seeds.tolist()}, please provide the seed explicitly.")
+    return int(seeds[0])
+
+
+def stream(seed: int, name: str, *indices: int) -> np.random.SeedSequence:
+    '''
+    Seed sequence of a random stream of an experiment, e.g. stream(seed, 'netsquid', chunk_nr, run_nr).
+    Different streams, and different indices within a stream, give independent random numbers, and do not depend on how the work is spread over processes.
+
+    :param seed: master seed of the experiment.
+    :param name: name of the stream, a key of STREAMS.
+    :param indices: optional indices within the stream, such as the number of the chunk and of the run.
+    '''
+    if name not in STREAMS:
+        raise ValueError(f"Unknown random stream '{name}', choose from {list(STREAMS)}.")
+    if seed is None:
+        raise ValueError("Please provide a master seed, see master_seed.")
+    return np.random.SeedSequence(seed, spawn_key = (STREAMS[name], *indices))
+
+
+def stream_rng(seed: int, name: str, *indices: int) -> np.random.Generator:
+    '''
+    Numpy random generator of a random stream, see stream.
+    '''
+    return np.random.default_rng(stream(seed, name, *indices))
+
+
+def stream_seed(seed: int, name: str, *indices: int) -> int:
+    '''
+    32 bit integer seed of a random stream, see stream, for generators that take an int, such as netsquid and the random module.
+    '''
+    return int(stream(seed, name, *indices).generate_state(1, dtype = np.uint32)[0])
+
+
+def run_seeds(seed: int, nr_runs: int, chunk_nr: int = 0) -> list:
+    '''
+    Seeds of netsquid for every run of a chunk of rounds of the simulation.
+    :returns: list of nr_runs ints.
+    '''
+    return [stream_seed(seed, 'netsquid', chunk_nr, run_nr) for run_nr in range(nr_runs)]
@@ -1,5 +1,11 @@
-from os import makedirs
+from os import makedirs, listdir, remove, replace, path as osp
 from pickle import dump, load
+from json import dump as json_dump, load as json_load, dumps, loads
+
+import numpy as np
+
+from utils.bitarray import PackedBits
+from utils.roundplan import RoundPlan
 
 def save_run_to_disk(
         basepath: str = "./results/MessageLengths/",
@@ -36,8 +42,255 @@ def load_from_disk(
         ):
     '''
     Load from file.
-    :returns: message_length, params pair, where message_lengths is a list, and params is a dictionary.
+    :returns: message_lengths, simulation_times, params triple, where message_lengths and simulation_times are lists, and params is a dictionary.
     '''
     with open(basepath + filename, 'rb') as fh:
         loaded = load(fh)
-        return loaded['message_lengths'], loaded['simulation_time'], loaded['params']
\ No newline at end of file
+        # Older files were written with the key 'simulation_time'
+        return loaded['message_lengths'], loaded.get('simulation_times', loaded.get('simulation_time')), loaded['params']
+
+
+#%% Columnar store
+# A dataset is a directory with an index.json file holding the parameters and the segments, and per column one .npy file per segment.
+# Every segment has an id, that is used in the filenames, and a number of runs.
+# Appending runs adds a segment, so existing files are never rewritten. compact_dataset merges the segments again.
+def _read_index(dataset_path: str) -> dict:
+    with open(osp.join(dataset_path, "index.json"), 'r') as fh:
+        return json_load(fh)
+
+
+def _write_index(dataset_path: str, index: dict):
+    # Write to a temporary file first, such that the index always describes complete segments
+    with open(osp.join(dataset_path, "index.json.tmp"), 'w') as fh:
+        json_dump(index, fh, indent = 1, default = str)
+    replace(osp.join(dataset_path, "index.json.tmp"), osp.join(dataset_path, "index.json"))
+
+
+def _pack(values) -> tuple:
+    '''
+    Stack (nested lists of) PackedBits with the same number of bits into a single array of packed bytes.
+    :returns: packed, length pair. If values are not PackedBits, both are None.
+    '''
+    if isinstance(values, PackedBits):
+        return values.data, values.length
+    if isinstance(values, (list, tuple)) and len(values) > 0:
+        parts = [_pack(value) for value in values]
+        lengths = {length for _, length in parts}
+        if None not in lengths and len(lengths) == 1:
+            return np.stack([packed for packed, _ in parts]), lengths.pop()
+    return None, None
+
+
+def _segment_path(dataset_path: str, column: str, segment: int) -> str:
+    return osp.join(dataset_path, f"{column}.{segment:05d}.npy")
+
+
+def append_run(
+        basepath: str = "./results/MessageLengths/",
+        dataset: str = None,
+        message_lengths: list = None,
+        simulation_times: list = None,
+        params: dict = None,
+        rounds: dict = None,
+        ):
+    '''
+    Append the results of a number of runs to a dataset, creating the dataset if it does not exist yet.
+    Every column is stored as a numpy array with the runs along the first axis, so e.g. the message lengths of the EPR-based protocols (two per run) become a (nr_runs, 2) array.
+
+    :param basepath: str specifying the base path of the datasets.
+    :param dataset: name of the dataset, i.e. the directory in basepath.
+    :param message_lengths: list of the message lengths, one entry per run. Can be left out for datasets with only raw round data, see save_simulation.
+    :param simulation_times: list of the simulation runtime for each run.
+    :param params: dict of parameters of the dataset. All runs appended to a dataset should have the same parameters.
+    :param rounds: optional dict mapping column names to raw round data, e.g. a (nr_runs, nr_rounds, nr_clients) array of outcomes, or a list with per run a list of PackedBits per client. PackedBits are stored packed.
+    '''
+    # Check if dataset name provided
+    if not dataset:
+        raise ValueError("Please provide a dataset name.")
+
+    columns = {'simulation_times': np.asarray(simulation_times)}
+    if message_lengths is not None:
+        columns['message_lengths'] = np.asarray(message_lengths)
+    bit_lengths = {}
+    for column, values in (rounds or {}).items():
+        if column in columns:
+            raise ValueError(f"The round data can not be called '{column}'.")
+        packed, length = _pack(values)
+        if length is None:
+            columns[column] = np.asarray(values)
+        else:
+            columns[column] = packed
+            bit_lengths[column] = length
+
+    nr_runs = len(columns['simulation_times'])
+    for column, values in columns.items():
+        if len(values) != nr_runs:
+            raise ValueError(f"Column '{column}' has {len(values)} runs, but there are {nr_runs} simulation times.")
+
+    dataset_path = osp.join(basepath, dataset)
+    makedirs(dataset_path, exist_ok = True)
+
+    ## Check that the runs fit in the dataset
+    if osp.exists(osp.join(dataset_path, "index.json")):
+        index = _read_index(dataset_path)
+        # Compare the parameters as they are stored
+        if loads(dumps(params, default = str)) != index['params']:
+            raise ValueError(f"The parameters do not match those of dataset {dataset}.")
+        if set(columns) != set(index['columns']):
+            raise ValueError(f"The columns {sorted(columns)} do not match those of dataset {dataset}: {sorted(index['columns'])}.")
+        if bit_lengths != index.get('bit_lengths', {}):
+            raise ValueError(f"The numbers of packed bits {bit_lengths} do not match those of dataset {dataset}: {index.get('bit_lengths', {})}.")
+    else:
+        index = {'params': params, 'columns': sorted(columns), 'bit_lengths': bit_lengths, 'segments': []}
+
+    ## Write the new segment, and only then add it to the index
+    segment = max((entry['id'] for entry in index['segments']), default = -1) + 1
+    for column, values in columns.items():
+        np.save(_segment_path(dataset_path, column, segment), values, allow_pickle = False)
+    index['segments'].append({'id': segment, 'nr_runs': nr_runs})
+    _write_index(dataset_path, index)
+
+
+def load_column(
+        basepath: str = "./results/MessageLengths/",
+        dataset: str = None,
+        column: str = 'message_lengths',
+        mmap: bool = True,
+        unpack: bool = True,
+        ) -> np.ndarray:
+    '''
+    Load a single column of a dataset, without reading the other columns.
+    With mmap, a dataset with a single segment is memory-mapped, so only the parts that are used are read from disk. Multiple segments are concatenated in memory; see compact_dataset.
+    Round data that was stored as PackedBits is unpacked along the last axis, unless unpack is False; then the packed bytes are returned (and can still be memory-mapped).
+
+    :returns: numpy array with the runs along the first axis.
+    '''
+    dataset_path = osp.join(basepath, dataset)
+    index = _read_index(dataset_path)
+    if column not in index['columns']:
+        raise ValueError(f"Dataset {dataset} has no column '{column}', only {index['columns']}.")
+
+    segments = [np.load(_segment_path(dataset_path, column, entry['id']), mmap_mode = 'r' if mmap else None) for entry in index['segments']]
+    values = segments[0] if len(segments) == 1 else np.concatenate(segments)
+
+    if unpack and column in index.get('bit_lengths', {}):
+        return np.unpackbits(values, axis = -1, count = index.get('bit_lengths', {})[column])
+    return values
+
+
+def load_dataset(
+        basepath: str = "./results/MessageLengths/",
+        dataset: str = None,
+        columns: list = None,
+        mmap: bool = True,
+        ) -> tuple:
+    '''
+    Load (a selection of the columns of) a dataset.
+    :param columns: list of the columns to load. Defaults to all columns.
+    :returns: columns, params pair, where columns is a dict mapping the column names to numpy arrays, and params is a dictionary.
+    '''
+    index = _read_index(osp.join(basepath, dataset))
+    return {column: load_column(basepath, dataset, column, mmap = mmap) for column in (columns or index['columns'])}, index['params']
+
+
+def list_datasets(basepath: str = "./results/MessageLengths/") -> list:
+    '''
+    :returns: sorted list of the names of the datasets in basepath.
+    '''
+    return sorted(name for name in listdir(basepath) if osp.exists(osp.join(basepath, name, "index.json")))
+
+
+def compact_dataset(
+        basepath: str = "./results/MessageLengths/",
+        dataset: str = None,
+        ):
+    '''
+    Merge all segments of a dataset into a single segment, such that its columns can be memory-mapped.
+    '''
+    dataset_path = osp.join(basepath, dataset)
+    index = _read_index(dataset_path)
+    if len(index['segments']) <= 1:
+        return
+
+    # Write the merged segment under a new id, switch the index to it, and only then remove the old segments
+    segment = max(entry['id'] for entry in index['segments']) + 1
+    for column in index['columns']:
+        np.save(_segment_path(dataset_path, column, segment), load_column(basepath, dataset, column, mmap = False, unpack = False), allow_pickle = False)
+
+    old_segments = index['segments']
+    index['segments'] = [{'id': segment, 'nr_runs': sum(entry['nr_runs'] for entry in old_segments)}]
+    _write_index(dataset_path, index)
+
+    for column in index['columns']:
+        for entry in old_segments:
+            remove(_segment_path(dataset_path, column, entry['id']))
+
+
+def convert_pickle(
+        basepath: str = "./results/MessageLengths/",
+        filename: str = None,
+        dataset_basepath: str = None,
+        ):
+    '''
+    Convert a file written by save_run_to_disk to a dataset in dataset_basepath (defaults to basepath), named after the file without its extension.
+    '''
+    message_lengths, simulation_times, params = load_from_disk(basepath = basepath, filename = filename)
+    append_run(basepath = dataset_basepath or basepath,
+               dataset = osp.splitext(filename)[0],
+               message_lengths = message_lengths,
+               simulation_times = simulation_times,
+               params = params)
+
+
+def save_simulation(
+        basepath: str = "./results/Simulations/",
+        dataset: str = None,
+        simulation: dict = None,
+        params: dict = None,
+        ):
+    '''
+    Append the raw per-round data of a simulation, as returned by simulate_rounds of the protocols, to a dataset.
+    The (nr_runs, nr_rounds, nr_clients) arrays of the simulation are stored packed, per run and client. Other arrays, such as the (nr_runs, nr_rounds) 'round_durations', are stored as they are.
+
+    The RoundPlan 'round_plan' of a simulation, if any, is shared by all its runs, so it is stored with the parameters; simulations with different plans go in different datasets.
+    The master 'seed' of the simulation is stored for every run, so load_simulation returns a (nr_runs,) array of seeds, see utils.seeding.simulation_seed.
+    The metrics of the 'phases' and the spans of the 'trace' of an instrumented simulation are not per-round data, and are not stored.
+
+    :param simulation: dict with the 'simulation_times' of the runs, (nr_runs, nr_rounds, nr_clients) arrays of 0s and 1s, such as 'outcomes' and 'bases', and optionally other per-run arrays and a 'round_plan'.
+    :param params: dict of parameters of the simulation.
+    '''
+    nr_runs = len(simulation['simulation_times'])
+    rounds = {key: [[PackedBits.from_bits(values[run_nr, :, i]) for i in range(values.shape[2])] for run_nr in range(values.shape[0])] if values.ndim == 3 else values
+              for key, values in simulation.items() if key not in ['simulation_times', 'round_plan', 'seed', 'phases', 'trace']}
+    if 'seed' in simulation:
+        # The master seed is stored per run, since a dataset can hold several simulations
+        rounds['seed'] = np.full(nr_runs, simulation['seed'], dtype = np.uint64) if np.ndim(simulation['seed']) == 0 else np.asarray(simulation['seed'], dtype = np.uint64)
+    if simulation.get('round_plan') is not None:
+        params = dict(params or {}, round_plan = simulation['round_plan'].to_dict())
+    append_run(basepath = basepath,
+               dataset = dataset,
+               simulation_times = simulation['simulation_times'],
+               params = params,
+               rounds = rounds)
+
+
+def load_simulation(
+        basepath: str = "./results/Simulations/",
+        dataset: str = None,
+        ) -> tuple:
+    '''
+    Load the raw per-round data of a simulation that was stored with save_simulation.
+    :returns: simulation, params pair, where simulation has the same layout as the output of simulate_rounds, and params is a dictionary.
+    '''
+    columns, params = load_dataset(basepath = basepath, dataset = dataset)
+    packed = _read_index(osp.join(basepath, dataset)).get('bit_lengths', {})
+    simulation = {'simulation_times': np.asarray(columns.pop('simulation_times'))}
+    for key, values in columns.items():
+        if key in packed:
+            # Stored as (nr_runs, nr_clients, nr_rounds)
+            simulation[key] = np.ascontiguousarray(np.swapaxes(values, 1, 2))
+        else:
+            simulation[key] = np.asarray(values)
+    if isinstance(params, dict) and 'round_plan' in params:
+        simulation['round_plan'] = RoundPlan.from_dict(params.pop('round_plan'))
+    return simulation, params
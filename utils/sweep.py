@@ -0,0 +1,182 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from inspect import signature
+from itertools import product
+from time import perf_counter
+
+from programs.EPR_based_trusted_server.functions import get_number_announced_bits as EPR_trusted_length
+from programs.EPR_based_untrusted_server.functions import get_number_announced_bits as EPR_untrusted_length
+from programs.GHZ_based_trusted_server.functions import get_number_announced_bits as GHZ_trusted_length
+from programs.GHZ_based_untrusted_server.functions import get_number_announced_bits as GHZ_untrusted_length
+
+from setup.configuration import star_network, link_cfg, link_typ
+from utils.store_data import append_run
+from utils.progress import Progress, forward
+
+## The protocols that can be swept over: the function calculating the message lengths, whether the protocol is bipartite, and fixed arguments of the function
+PROTOCOLS = {
+    'EPR_trusted': (EPR_trusted_length, True, {}),
+    'EPR_untrusted': (EPR_untrusted_length, True, {}),
+    'GHZ_trusted': (GHZ_trusted_length, False, {}),
+    'GHZ_untrusted_comPE': (GHZ_untrusted_length, False, {'perform_separate_PE': False}),
+    'GHZ_untrusted_sepPE': (GHZ_untrusted_length, False, {'perform_separate_PE': True}),
+}
+
+# Short names of the axes, used in the names of the datasets with the results
+AXIS_NAMES = {
+    'nr_rounds': 'nrRounds',
+    'nr_verification_rounds': 'nrVER',
+    'nr_estimation_rounds': 'nrPE',
+    'nr_clients': 'nrClients',
+    'fidelity': 'fidelity',
+}
+
+
+def sweep_grid(axes: dict) -> list:
+    '''
+    Create the grid of points of a parameter sweep, i.e. the cartesian product of all axes.
+    An axis is a key with a list of values. Axes that should be varied together, such as the number of rounds and the number of verification rounds, are given as a tuple of names with a list of tuples of values.
+
+    Example:
+        sweep_grid({'protocol': ['EPR_trusted', 'GHZ_trusted'],
+                    ('nr_rounds', 'nr_estimation_rounds'): [(1000, 200), (2000, 350)],
+                    'fidelity': [0.95, 0.99]})
+    gives 8 points.
+
+    :param axes: dict mapping the names of the axes to the lists of values.
+    :returns: list of dicts, one per point, mapping the parameter names to their values.
+    '''
+    points = []
+    for values in product(*axes.values()):
+        point = {}
+        for name, value in zip(axes.keys(), values):
+            if isinstance(name, tuple):
+                if len(name) != len(value):
+                    raise ValueError(f"The values {value} do not match the linked axes {name}.")
+                point.update(zip(name, value))
+            else:
+                point[name] = value
+        points.append(point)
+    return points
+
+
+def point_name(point: dict) -> str:
+    '''
+    Name of the dataset with the results of a point of the sweep, e.g. GHZ_trusted_nrRounds1000_nrPE200.
+    '''
+    return point['protocol'] + ''.join(f"_{AXIS_NAMES.get(name, name)}{value}" for name, value in point.items() if name != 'protocol')
+
+
+def point_arguments(point: dict, fixed: dict = None) -> tuple:
+    '''
+    Translate a point of the sweep to a call of the protocol function.
+    The network is a star network with link_typ and link_cfg from setup.configuration, where the fidelity can be changed by the point. The bipartite protocols always run on a network with 2 clients; for them nr_clients is only used for extrapolation.
+    Arguments that the protocol does not take (e.g. the verification rounds of a trusted protocol) are dropped, and nr_runtimes is passed as nr_runs where needed.
+
+    :param point: dict with the protocol and the parameters of the point. See PROTOCOLS for the protocol names.
+    :param fixed: dict with parameters that are the same for all points, such as nr_runtimes or the statistical correction settings.
+    :returns: function, arguments, params triple, where arguments are the keyword arguments of the function, and params holds all parameters of the point.
+    '''
+    params = dict(fixed or {}, **point)
+    protocol = params.pop('protocol')
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Unknown protocol '{protocol}', choose from {list(PROTOCOLS)}.")
+    function, bipartite, protocol_arguments = PROTOCOLS[protocol]
+
+    ## Create the network configuration
+    cfg = dict(params.pop('link_cfg', link_cfg))
+    if 'fidelity' in params:
+        cfg['fidelity'] = params.pop('fidelity')
+    typ = params.pop('link_typ', link_typ)
+    network_configuration = star_network(nr_clients = 2 if bipartite else params.get('nr_clients', 2), link_typ = typ, link_cfg = cfg)
+
+    ## Translate the parameters to the arguments of the protocol function
+    accepted = signature(function).parameters
+    if 'nr_runtimes' in params and 'nr_runtimes' not in accepted:
+        params['nr_runs'] = params.pop('nr_runtimes')
+    arguments = dict({name: value for name, value in params.items() if name in accepted}, network_configuration = network_configuration, **protocol_arguments)
+
+    return function, arguments, dict(params, protocol = protocol, link_typ = typ, link_config = cfg)
+
+
+def _call(function, arguments: dict, progress: Progress = None) -> tuple:
+    '''
+    Call function with the keyword arguments. This is the function executed by every worker of the process pool.
+    The progress is passed to functions that take one; it is not part of the arguments, such that it does not change the key of the cache.
+    '''
+    if progress is not None and 'progress' in signature(function).parameters:
+        arguments = dict(arguments, progress = progress)
+    return function(**arguments)
+
+
+def run_point(point: dict, fixed: dict = None) -> tuple:
+    '''
+    Calculate the message lengths of a single point of the sweep. See point_arguments for the parameters.
+    :returns: message_lengths, simulation_times, params triple, where params holds all parameters of the point.
+    '''
+    function, arguments, params = point_arguments(point, fixed)
+    message_lengths, simulation_times = function(**arguments)
+    return message_lengths, simulation_times, params
+
+
+def run_sweep(points: list, fixed: dict = None, workers: int = 1, basepath: str = None, cache = None, refresh: bool = False, progress: Progress = None) -> list:
+    '''
+    Run all points of a sweep, spreading them over a pool of worker processes, and print the progress.
+    With a single worker (the default) everything runs in the current process.
+    With a cache, points that were calculated before are taken from the cache, and only the other points are run. The cache is only accessed from the current process.
+
+    :param points: list of points, as created by sweep_grid.
+    :param fixed: dict with parameters that are the same for all points, see run_point.
+    :param workers: number of worker processes.
+    :param basepath: if given, the runs of every point are appended to the dataset named point_name in basepath, see utils.store_data.append_run. Cached points are not appended again.
+    :param cache: optional ResultCache from utils.cache.
+    :param refresh: if True, ignore (and overwrite) the cached results.
+    :param progress: optional Progress from utils.progress, which reports the rounds of all points that are run in one display, with a single ETA.
+    :returns: list with a message_lengths, simulation_times, params triple per point, in the order of points.
+    '''
+    if workers < 1:
+        raise ValueError('The number of workers should be at least 1.')
+
+    calls = [point_arguments(point, fixed) for point in points]
+    results = [None]*len(points)
+    start = perf_counter()
+
+    def finish(index: int, result: tuple, cached: bool = False):
+        function, arguments, params = calls[index]
+        if cache is not None and not cached:
+            cache.put(function, arguments, result)
+        results[index] = (*result, params)
+        nr_done = sum(result is not None for result in results)
+        print(f"\t [{nr_done}/{len(points)}] {point_name(points[index])} {'cached' if cached else 'done'}, {perf_counter() - start:.1f} s elapsed")
+        if basepath is not None and not cached:
+            message_lengths, simulation_times = result
+            append_run(basepath = basepath,
+                       dataset = point_name(points[index]),
+                       message_lengths = message_lengths,
+                       simulation_times = simulation_times,
+                       params = params)
+
+    ## Take the points that were calculated before from the cache
+    todo = []
+    for index, (function, arguments, _) in enumerate(calls):
+        if cache is not None and not refresh:
+            found, result = cache.get(function, arguments)
+            if found:
+                finish(index, result, cached = True)
+                continue
+        todo.append(index)
+
+    print(f"Sweep over {len(points)} points ({len(todo)} to run) with {workers} worker(s).")
+    if workers == 1 or len(todo) <= 1:
+        for index in todo:
+            function, arguments, _ = calls[index]
+            finish(index, _call(function, arguments, progress))
+    elif todo:
+        with forward(progress, workers) as shared, ProcessPoolExecutor(max_workers = min(workers, len(todo))) as executor:
+            futures = {executor.submit(_call, *calls[index][:2], shared): index for index in todo}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+
+    if cache is not None:
+        print(f"\t Cache: {cache.stats()}")
+
+    return results
@@ -0,0 +1,113 @@
+from contextlib import nullcontext
+from time import perf_counter
+
+
+def netsquid_event_count():
+    '''
+    Number of events that the simulation engine of netsquid triggered since its last reset, or None if the installed version does not count them.
+    '''
+    from pydynaa import DynAASim
+    return getattr(DynAASim(), 'num_events_triggered', None)
+
+
+class _Phase:
+    '''
+    Context manager that adds the duration of the code it wraps to a phase of a PhaseTimer. One instance per phase, so entering a phase does not allocate.
+    '''
+    __slots__ = ('timer', 'name', 'totals', 'start')
+
+    def __init__(self, timer: 'PhaseTimer', name: str, totals: list):
+        self.timer = timer
+        self.name = name
+        self.totals = totals
+
+    def __enter__(self):
+        self.start = self.timer.read()
+
+    def __exit__(self, *exc_info):
+        end = self.timer.read()
+        totals = self.totals
+        totals[0] += 1
+        for i, (start_value, end_value) in enumerate(zip(self.start, end)):
+            if start_value is not None:
+                totals[i + 1] += end_value - start_value
+        if self.timer.spans is not None:
+            self.timer.spans.append((self.name, self.start, end))
+
+
+class PhaseTimer:
+    '''
+    Wall time, simulated time and number of netsquid events spent in every phase of a program, such as building the subroutine of a round, flushing it to the QNPU or receiving the corrections.
+
+    In a generator program a phase can span a yield, e.g. around yield from connection.flush(). Its wall time then includes the time netsquid spends on the other nodes until the program continues, which is where the simulation itself happens.
+    The phases only add up what they wrap, so the time outside any phase is not counted.
+
+    A disabled timer (the default of the programs) returns the same empty context for every phase, so instrumented code only pays for a method call.
+    With trace, every time a phase is entered is also kept as a span, e.g. to draw the timeline of a run with utils.tracing.
+
+    Example:
+        timer = PhaseTimer.for_netsquid()
+        with timer.phase('flush'):
+            yield from connection.flush()
+        timer.metrics()  # {'flush': {'count': 1, 'wall_time': ..., 'sim_time': ..., 'events': ...}}
+    '''
+    _disabled_phase = nullcontext()
+
+    def __init__(self, enabled: bool = True, sim_clock = None, event_counter = None, trace: bool = False):
+        '''
+        :param enabled: whether to record the phases.
+        :param sim_clock: function returning the simulated time in ns, e.g. ns.sim_time. If None, no simulated time is recorded.
+        :param event_counter: function returning the number of simulation events so far, e.g. netsquid_event_count. If None, or if it returns None, no events are recorded.
+        :param trace: whether to keep a span for every time a phase is entered, see spans. Only used when enabled.
+        '''
+        self.enabled = enabled
+        self.sim_clock = sim_clock
+        self.event_counter = event_counter
+        # List of (name, start, end) triples, with start and end as returned by read
+        self.spans = [] if enabled and trace else None
+        # Per phase the count, wall time, simulated time and events
+        self._totals = {}
+        self._phases = {}
+
+    @classmethod
+    def for_netsquid(cls, enabled: bool = True, trace: bool = False) -> 'PhaseTimer':
+        '''
+        Timer of a program that runs in a netsquid simulation, recording the simulated time and the events of netsquid.
+        '''
+        if not enabled:
+            return cls(enabled = False)
+        import netsquid as ns
+        return cls(sim_clock = ns.sim_time, event_counter = netsquid_event_count, trace = trace)
+
+    def read(self) -> tuple:
+        '''
+        :returns: wall time, simulated time and event count at this moment, the latter two None if they are not recorded.
+        '''
+        return (perf_counter(),
+                self.sim_clock() if self.sim_clock is not None else None,
+                self.event_counter() if self.event_counter is not None else None)
+
+    def phase(self, name: str):
+        '''
+        Context that adds the time spent in it to the phase name.
+        '''
+        if not self.enabled:
+            return self._disabled_phase
+        phase = self._phases.get(name)
+        if phase is None:
+            self._totals[name] = [0, 0., 0., 0]
+            phase = self._phases[name] = _Phase(self, name, self._totals[name])
+        return phase
+
+    def metrics(self) -> dict:
+        '''
+        :returns: dict mapping every phase to a dict with the number of times it was entered ('count'), and the total 'wall_time' in s, 'sim_time' in ns and number of netsquid 'events' spent in it. The latter two are only included when they are recorded.
+        '''
+        metrics = {}
+        for name, (count, wall_time, sim_time, events) in self._totals.items():
+            metrics[name] = {'count': count, 'wall_time': wall_time}
+            if self.sim_clock is not None:
+                metrics[name]['sim_time'] = sim_time
+            if self.event_counter is not None and self.event_counter() is not None:
+                metrics[name]['events'] = events
+        return metrics
@@ -0,0 +1,65 @@
+import json
+
+# Process ids of the two timelines in the trace
+SIM_TIME_PID = 1
+WALL_TIME_PID = 2
+
+
+def chrome_trace(tracks: dict) -> dict:
+    '''
+    Convert the spans of a single run into a Chrome trace, which can be opened in chrome://tracing or https://ui.perfetto.dev.
+    The trace has two timelines, one in simulated time and one in wall time, each with a track per node. Every phase of a program (see utils.timing), such as building a subroutine, flushing it or receiving the corrections, is a span on the track of its node.
+    Every track also gets a 'run' span from the start of its first span to the end of its last one.
+
+    :param tracks: dict mapping every node name (e.g. 'Server', 'C0', ...) to its list of (name, start, end) spans, as kept by a PhaseTimer with trace. Spans without simulated time only appear on the wall time timeline.
+    :returns: dict in the Chrome trace event format.
+    '''
+    spans = [span for node_spans in tracks.values() for span in node_spans]
+    if not spans:
+        raise ValueError('There are no spans to trace, please run the simulation with trace.')
+    wall_origin = min(start[0] for _, start, _ in spans)
+
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': SIM_TIME_PID, 'args': {'name': 'Simulated time'}},
+              {'name': 'process_name', 'ph': 'M', 'pid': WALL_TIME_PID, 'args': {'name': 'Wall time'}}]
+    for tid, (node, node_spans) in enumerate(tracks.items()):
+        for pid in [SIM_TIME_PID, WALL_TIME_PID]:
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': node}})
+            events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'sort_index': tid}})
+        if not node_spans:
+            continue
+
+        first_start = min((start for _, start, _ in node_spans), key = lambda read: read[0])
+        last_end = max((end for _, _, end in node_spans), key = lambda read: read[0])
+        for name, start, end in [('run', first_start, last_end)] + list(node_spans):
+            args = {}
+            if start[2] is not None:
+                args['events'] = end[2] - start[2]
+
+            # Timestamps and durations are in microseconds
+            wall_args = dict(args, sim_time_ns = end[1] - start[1]) if start[1] is not None else args
+            events.append({'name': name, 'cat': node, 'ph': 'X', 'pid': WALL_TIME_PID, 'tid': tid,
+                           'ts': (start[0] - wall_origin)*1e6, 'dur': (end[0] - start[0])*1e6, 'args': wall_args})
+            if start[1] is not None:
+                events.append({'name': name, 'cat': node, 'ph': 'X', 'pid': SIM_TIME_PID, 'tid': tid,
+                               'ts': start[1]*1e-3, 'dur': (end[1] - start[1])*1e-3, 'args': dict(args, wall_time_ms = (end[0] - start[0])*1e3)})
+
+    return {'traceEvents': events, 'displayTimeUnit': 'ns'}
+
+
+def write_chrome_trace(path: str, traces: dict, run_nr: int = 0, extra_tracks: dict = None):
+    '''
+    Write the timeline of a single run of a simulation to a Chrome trace JSON file, see chrome_trace.
+
+    Example:
+        simulation = simulate_rounds(nr_rounds = 100, network_configuration = network_config, trace = True)
+        write_chrome_trace('trace.json', simulation['trace'])
+
+    :param path: path of the JSON file.
+    :param traces: dict mapping every node to a list with its spans in every run, i.e. the 'trace' of the output of simulate_rounds.
+    :param run_nr: the run to write. Note that every run starts again at simulated time 0.
+    :param extra_tracks: optional dict mapping more track names to their spans, such as the simulation and the analysis as a whole.
+    '''
+    tracks = {node: node_traces[run_nr] for node, node_traces in traces.items()}
+    tracks.update(extra_tracks or {})
+    with open(path, 'w') as file:
+        json.dump(chrome_trace(tracks), file)